@@ -0,0 +1,68 @@
+"""Compare /predict (one food per request) with /predict/batch.
+
+Uses the centroids of models/best_model.pkl and a scaler fitted on
+synthetic data, served in-process through FastAPI's TestClient.
+
+Run from the project root:
+    python -m benchmarks.bench_api_batch
+"""
+
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sklearn.preprocessing import MinMaxScaler
+
+from benchmarks.synthetic import synthetic_nutrients
+from nutrimap_app.api_file import app
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.KMeanModel import BEST_MODEL_PATH
+from nutrimap_app.registry import ModelRegistry
+
+N_FOODS = 2_000
+BATCH_SIZES = [1, 100, 1_000]
+FEATURE_COLS = ["fat_g", "satfat_g", "carbs_g", "protein_g", "fiber_g", "energy_kcal_calculated"]
+
+
+def _registry(tmp_dir: Path, df) -> ModelRegistry:
+    with BEST_MODEL_PATH.open("rb") as f:
+        model = pickle.load(f)
+    scaler = MinMaxScaler().fit(df[FEATURE_COLS])
+    InferenceBundle.from_fitted(FEATURE_COLS, scaler, model).save(tmp_dir / "inference_bundle.npz")
+
+    registry = ModelRegistry(tmp_dir / "inference_bundle.npz")
+    registry.load()
+    return registry
+
+
+def main():
+    df = synthetic_nutrients(N_FOODS)
+
+    with tempfile.TemporaryDirectory() as tmp, TestClient(app) as client:
+        app.state.registry = _registry(Path(tmp), df)
+
+        # single-item path: one GET per food
+        rows = df[FEATURE_COLS].to_dict(orient="records")
+        start = time.perf_counter()
+        for row in rows:
+            client.get("/predict", params=row)
+        elapsed = time.perf_counter() - start
+        print(f"GET  /predict       | {len(rows) / elapsed:10,.0f} foods/s | {len(rows) / elapsed:8,.0f} req/s")
+
+        for batch_size in BATCH_SIZES:
+            payloads = [
+                df.iloc[i:i + batch_size][FEATURE_COLS].to_dict(orient="list")
+                for i in range(0, N_FOODS, batch_size)
+            ]
+            start = time.perf_counter()
+            for payload in payloads:
+                client.post("/predict/batch", json=payload)
+            elapsed = time.perf_counter() - start
+            print(f"POST /predict/batch | {N_FOODS / elapsed:10,.0f} foods/s | "
+                  f"{len(payloads) / elapsed:8,.0f} req/s | batch size {batch_size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Frontend API client: per-call requests vs pooled, cached and batched.
+
+Uses a stand-in backend (http.server answering /predict and /predict/batch
+after BACKEND_LATENCY seconds) so only the client side is measured.
+
+Run from the project root:
+    python -m benchmarks.bench_api_client
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+from nutrimap_app.api_client import NUTRIENT_COLS, NutriMapClient
+
+N_FOODS = 50
+BACKEND_LATENCY = 0.02
+SLOW_BACKEND_LATENCY = 2.0
+RESPONSE_WAIT = 0.5
+
+
+class StandInAPI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # like uvicorn, else keep-alive hits delayed ACKs
+    latency = BACKEND_LATENCY
+
+    def _reply(self, body):
+        time.sleep(self.latency)
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply({"prediction": 0})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        n = len(body["fat_g"])
+        self._reply({"prediction": [0] * n, "food_group": ["mixed/other"] * n})
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def _timed(label, fn):
+    start = time.perf_counter()
+    fn()
+    print(f"{label:<45} {(time.perf_counter() - start) * 1e3:8.1f} ms")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    foods = [dict(zip(NUTRIENT_COLS, rng.integers(0, 100, len(NUTRIENT_COLS)).tolist()))
+             for _ in range(N_FOODS)]
+
+    server, url = _serve()
+    print(f"{N_FOODS} foods, stand-in backend latency {BACKEND_LATENCY * 1e3:.0f} ms")
+
+    _timed("requests.get per food (new connection each)",
+           lambda: [requests.get(f"{url}/predict", params=f).json() for f in foods])
+
+    client = NutriMapClient(url)
+    _timed("client.predict per food (pooled session)", lambda: [client.predict(f) for f in foods])
+    client.cache.clear()
+    _timed("client.predict_many (one batch request)", lambda: client.predict_many(foods))
+    _timed("client.predict_many again (cached)", lambda: client.predict_many(foods))
+
+    # slider rerun against a slow backend: wait at most RESPONSE_WAIT
+    StandInAPI.latency = SLOW_BACKEND_LATENCY
+    client.cache.clear()
+
+    def rerun():
+        try:
+            client.submit(foods[:1]).result(timeout=RESPONSE_WAIT)
+        except FutureTimeout:
+            pass
+
+    _timed(f"rerun with a {SLOW_BACKEND_LATENCY:.0f} s backend (non-blocking)", rerun)
+    _timed("rerun, same inputs (shares the pending request)", rerun)
+    time.sleep(SLOW_BACKEND_LATENCY)
+    _timed("rerun once the answer arrived (cached)", rerun)
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
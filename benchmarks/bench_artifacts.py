@@ -0,0 +1,41 @@
+"""Write/read timings of the stage artifact formats (CSV, parquet, feather).
+
+Run from the project root:
+    python -m benchmarks.bench_artifacts
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import synthetic_nutrients
+from nutrimap_app.artifacts import read_frame, write_frame
+
+SIZES = [7_000, 500_000]
+SUFFIXES = [".csv", ".parquet", ".feather"]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in SIZES:
+            df = synthetic_nutrients(n_rows)
+
+            for suffix in SUFFIXES:
+                path = Path(tmp) / f"foods_{n_rows}{suffix}"
+
+                start = time.perf_counter()
+                write_frame(df, path)
+                t_write = time.perf_counter() - start
+
+                start = time.perf_counter()
+                df_read = read_frame(path)
+                t_read = time.perf_counter() - start
+
+                exact = df_read["energy_kcal_calculated"].equals(df["energy_kcal_calculated"])
+                print(f"{n_rows:>8,} rows | {suffix:8} | write {t_write * 1000:8.1f} ms | "
+                      f"read {t_read * 1000:8.1f} ms | {path.stat().st_size / 1e6:6.1f} MB | "
+                      f"dtypes kept {df_read.dtypes.equals(df.dtypes)!s:5} | exact floats {exact}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""clean_food_data: default vs compact=True, all foods (branded included).
+
+Reports the in-memory size of the cleaned frame (deep memory_usage), the
+peak RSS of the run (fresh subprocess per mode, includes reading the raw
+row groups) and the time spent in the duplicate removal stages
+(profiling.profile_pipeline).
+
+Measured with pandas 3.0 on 500k raw rows: frame 27.5 MB -> 18.7 MB
+(1.5x smaller), duplicate removal 1.9x faster. That is short of the 3x
+memory target: pandas 3 already stores the names as Arrow strings in the
+default mode, so only the six float64 -> float32 nutrient columns shrink.
+
+Run from the project root:
+    python -m benchmarks.bench_clean_compact [n_rows]
+"""
+
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_raw
+
+DEFAULT_ROWS = 500_000
+
+# share of the raw rows that are repeated, as in exports merged from several releases
+DUPLICATE_SHARE = 0.1
+
+
+def _run(parquet_path: str, compact: bool, output_path: str):
+    from nutrimap_app import data_prep_marie
+    from nutrimap_app.profiling import profile_pipeline
+
+    with profile_pipeline() as profiler:
+        df = data_prep_marie.clean_food_data(str(Path(parquet_path).parent), output_path,
+                                             include_branded=True,
+                                             compact=compact)
+
+    stages = {row["stage"]: row for row in profiler.report()["stages"]}
+    dedup_s = sum(stages[name]["wall_s"] for name in
+                  ("clean.drop_duplicates_chunk", "clean.drop_duplicates"))
+    print(json.dumps({
+        "compact": compact,
+        "rows": len(df),
+        "frame_mb": df.memory_usage(deep=True).sum() / 1e6,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "dedup_s": dedup_s,
+        "total_s": profiler.report()["total_wall_s"],
+    }))
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = synthetic_raw(n_rows)
+        raw = pd.concat([raw, raw.sample(frac=DUPLICATE_SHARE, random_state=0)], ignore_index=True)
+        parquet_path = str(Path(tmp) / "data.parquet")
+        raw.to_parquet(parquet_path, row_group_size=250_000)
+        del raw
+
+        results = {}
+        for compact in (False, True):
+            out = subprocess.run([
+                sys.executable, "-W", "ignore", "-c",
+                "from benchmarks.bench_clean_compact import _run; "
+                f"_run({parquet_path!r}, {compact}, {str(Path(tmp) / 'out.feather')!r})",
+            ], check=True, capture_output=True, text=True).stdout
+            results[compact] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"{n_rows:,} raw rows + {DUPLICATE_SHARE:.0%} repeated, branded included")
+    print(f"{'mode':<8} {'rows out':>9} {'frame MB':>9} "
+          f"{'peak RSS MB':>12} {'dedup s':>8} {'total s':>8}")
+    for compact, r in results.items():
+        print(f"{'compact' if compact else 'default':<8} {r['rows']:>9,} {r['frame_mb']:>9.1f} "
+              f"{r['peak_rss_mb']:>12.0f} "
+              f"{r['dedup_s']:>8.3f} {r['total_s']:>8.3f}")
+
+    default, compact = results[False], results[True]
+    print(f"frame {default['frame_mb'] / compact['frame_mb']:.1f}x smaller, "
+          f"duplicate removal {default['dedup_s'] / compact['dedup_s']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
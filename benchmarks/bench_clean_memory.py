@@ -0,0 +1,54 @@
+"""Peak memory of clean_food_data, in-memory vs streaming.
+
+Each mode runs in a fresh subprocess so ru_maxrss is the peak of that run
+only.
+
+Run from the project root:
+    python -m benchmarks.bench_clean_memory [n_rows]
+"""
+
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import write_synthetic_parquet
+
+DEFAULT_ROWS = 5_000_000
+
+
+def _run(parquet_path: str, streaming: bool, output_path: str):
+    from nutrimap_app import data_prep_marie
+
+    start = time.perf_counter()
+    df = data_prep_marie.clean_food_data(str(Path(parquet_path).parent), output_path,
+                                         streaming=streaming)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"streaming={streaming!s:5} | {len(df):>9,} rows out | "
+          f"{elapsed:6.2f} s | peak RSS {peak_mb:8.1f} MB")
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        parquet_path = str(Path(tmp) / "data.parquet")
+        write_synthetic_parquet(parquet_path, n_rows)
+        print(f"synthetic parquet: {n_rows:,} rows, "
+              f"{Path(parquet_path).stat().st_size / 1e6:.0f} MB")
+
+        for streaming in (False, True):
+            subprocess.run([
+                sys.executable, "-c",
+                "from benchmarks.bench_clean_memory import _run; "
+                f"_run({parquet_path!r}, {streaming}, {str(Path(tmp) / 'out.csv')!r})",
+            ], check=True)
+
+
+if __name__ == "__main__":
+    main()
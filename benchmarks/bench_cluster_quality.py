@@ -0,0 +1,70 @@
+"""cluster_quality_report vs sklearn's full silhouette_score.
+
+KMeans (k=3) is fitted on n synthetic cleaned-style foods, then:
+- the report (sampled silhouette + one-pass statistics) runs on all rows,
+- silhouette_score runs on all rows only up to FULL_SILHOUETTE_MAX_ROWS
+  (quadratic time), otherwise on that many rows and its time is
+  extrapolated (x (n / rows)^2).
+Peak memory is the tracemalloc peak of each call (numpy allocations are
+traced).
+
+Run from the project root:
+    python -m benchmarks.bench_cluster_quality [n_rows]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+from sklearn.preprocessing import MinMaxScaler
+
+from benchmarks.synthetic import synthetic_nutrients
+from nutrimap_app.cluster_quality import cluster_quality_report, format_report
+
+DEFAULT_ROWS = 500_000
+FULL_SILHOUETTE_MAX_ROWS = 30_000
+
+FEATURE_COLS = ["fat_g", "satfat_g", "carbs_g", "protein_g", "fiber_g", "energy_kcal_calculated"]
+
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+
+    df = synthetic_nutrients(n_rows)
+    nutrients = df[FEATURE_COLS].to_numpy(dtype="float64")
+    X = MinMaxScaler().fit_transform(nutrients)
+    model = KMeans(n_clusters=3, random_state=42).fit(X)
+
+    report, report_s, report_mb = _measure(lambda: cluster_quality_report(
+        X, model.labels_, model.cluster_centers_, FEATURE_COLS,
+        nutrients=nutrients, nutrient_cols=FEATURE_COLS))
+
+    full_rows = min(n_rows, FULL_SILHOUETTE_MAX_ROWS)
+    full_score, full_s, full_mb = _measure(
+        lambda: silhouette_score(X[:full_rows], model.labels_[:full_rows]))
+    full_s_all = full_s * (n_rows / full_rows) ** 2
+
+    print("\n".join(format_report(report)))
+    print()
+    print(f"{'':<34} {'time s':>9} {'peak MB':>9}")
+    print(f"{'cluster_quality_report':<34} {report_s:>9.2f} {report_mb:>9.0f}")
+    print(f"{f'silhouette_score ({full_rows:,})':<34} {full_s:>9.2f} {full_mb:>9.0f}")
+    if full_rows < n_rows:
+        print(f"{f'silhouette_score ({n_rows:,}, est.)':<34} {full_s_all:>9.0f}")
+    print(f"full silhouette on {full_rows:,} rows: {full_score:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""data_prep.clean_food_data loading: sequential read_csv of every column
+(the previous loader) vs load_raw_csvs (thread pool, usecols, explicit
+dtypes, pyarrow engine), as the number of CSV files grows.
+
+Run from the project root:
+    python -m benchmarks.bench_csv_ingest [rows_per_file]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.synthetic import write_synthetic_csvs
+from nutrimap_app.data_prep import COLUMNS_TO_KEEP, load_raw_csvs
+from nutrimap_app.sources import CSV_ENGINE, FOOD_CSV
+
+FILE_COUNTS = [1, 4, 16, 48]
+DEFAULT_ROWS_PER_FILE = 20_000
+
+
+def _sequential(raw_folder: Path) -> pd.DataFrame:
+    frames = []
+    for f in sorted(os.listdir(raw_folder)):
+        df = pd.read_csv(raw_folder / f)
+        df["source_file"] = f
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)[COLUMNS_TO_KEEP + ["source_file"]]
+    return df.rename(columns=FOOD_CSV.renames)
+
+
+def _best_of(fn, repeat=3) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    rows_per_file = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS_PER_FILE
+    print(f"{os.cpu_count()} CPU(s), csv engine {CSV_ENGINE}, {rows_per_file:,} rows per file")
+
+    for n_files in FILE_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_synthetic_csvs(tmp, n_files, rows_per_file)
+
+            old = _sequential(Path(tmp))
+            new = load_raw_csvs(tmp)
+            assert len(old) == len(new)
+            pd.testing.assert_frame_equal(old.drop(columns="source_file"),
+                                          new.drop(columns="source_file"), check_dtype=False)
+
+            t_old = _best_of(lambda: _sequential(Path(tmp)))
+            t_one = _best_of(lambda: load_raw_csvs(tmp, max_workers=1))
+            t_new = _best_of(lambda: load_raw_csvs(tmp))
+
+            print(f"{n_files:>3} files | sequential, all columns {t_old:7.3f} s | "
+                  f"usecols, 1 thread {t_one:7.3f} s | thread pool {t_new:7.3f} s | "
+                  f"speed-up {t_old / t_new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Benchmark assign_food_group (row-wise apply) against assign_food_groups.
+
+Run from the project root:
+    python -m benchmarks.bench_food_groups
+"""
+
+import time
+
+from benchmarks.synthetic import synthetic_nutrients
+from nutrimap_app.category_mapping import assign_food_group, assign_food_groups
+
+SIZES = [7_000, 500_000, 5_000_000]
+
+# df.apply is only timed up to this size, it takes minutes beyond
+MAX_ROWWISE_ROWS = 500_000
+
+
+def main():
+    for n_rows in SIZES:
+        df = synthetic_nutrients(n_rows)
+
+        start = time.perf_counter()
+        vectorized = assign_food_groups(df)
+        t_vec = time.perf_counter() - start
+
+        line = f"{n_rows:>10,} rows | vectorized {t_vec:8.3f} s"
+
+        if n_rows <= MAX_ROWWISE_ROWS:
+            start = time.perf_counter()
+            rowwise = df.apply(assign_food_group, axis=1)
+            t_row = time.perf_counter() - start
+
+            assert (vectorized.astype(str) == rowwise).all()
+            line += f" | row-wise {t_row:8.3f} s | speed-up {t_row / t_vec:6.0f}x"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
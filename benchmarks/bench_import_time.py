@@ -0,0 +1,150 @@
+"""Cold import and artifact load time of the serving path, with regression thresholds.
+
+Imports nutrimap_app.api_file in fresh interpreters under
+`python -X importtime` and reports the median total and the heaviest
+top-level imports. Then, in fresh interpreters again, times
+api_file.preload() on synthetic artifacts of PRELOAD_FOODS foods (model,
+lookup table, similarity index, meal scorer and text index), the work a
+worker does before it serves its first request. Exits with status 1 when
+- the median import time is above IMPORT_BUDGET_MS,
+- the median preload time is above PRELOAD_BUDGET_MS, or
+- a training-only dependency (TRAINING_ONLY) is imported by either.
+
+Run from the project root:
+    python -m benchmarks.bench_import_time
+"""
+
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+MODULE = "nutrimap_app.api_file"
+N_RUNS = 5
+
+# Cold import of the API (fastapi + pydantic + numpy) measured at ~0.5 s on
+# a single CPU, ~2.2 s while it still imported pandas and scikit-learn
+IMPORT_BUDGET_MS = 1_000
+
+# preload() of PRELOAD_FOODS foods measured at ~0.25 s on a single CPU
+# (mostly the name -> row dictionaries of the similarity index and meal scorer)
+PRELOAD_FOODS = 100_000
+PRELOAD_BUDGET_MS = 1_000
+
+TRAINING_ONLY = ("pandas", "sklearn", "scipy", "pyarrow", "fastparquet")
+
+FEATURE_COLS = ["fat_g", "satfat_g", "carbs_g", "protein_g", "fiber_g", "energy_kcal_calculated"]
+
+# Run in a fresh interpreter: preload time in ms, then the training-only modules imported
+_PRELOAD_SCRIPT = """
+import sys, time
+from nutrimap_app import api_file
+start = time.perf_counter()
+api_file.preload(**{paths!r})
+print((time.perf_counter() - start) * 1e3)
+print(",".join(name for name in {training_only!r} if name in sys.modules))
+"""
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _import_times(module: str) -> dict:
+    """Cumulative import time in microseconds of every module imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            times[name] = (int(cumulative), len(indent))
+    return times
+
+
+def _build_artifacts(tmp_dir: Path) -> dict:
+    """Every artifact preload() loads, from synthetic foods; returns the preload() paths."""
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import MinMaxScaler
+
+    from benchmarks.synthetic import synthetic_nutrients
+    from nutrimap_app.inference import InferenceBundle
+    from nutrimap_app.lookup import FoodLookup
+    from nutrimap_app.meal_scoring import MealScorer
+    from nutrimap_app.similarity import FoodSimilarityIndex
+    from nutrimap_app.text_search import FoodTextIndex
+
+    df = synthetic_nutrients(PRELOAD_FOODS)
+    scaler = MinMaxScaler().fit(df[FEATURE_COLS])
+    X_scaled = scaler.transform(df[FEATURE_COLS])
+    model = KMeans(n_clusters=3, random_state=42).fit(X_scaled)
+    df["cluster"] = model.labels_
+
+    paths = {
+        "bundle_path": tmp_dir / "inference_bundle.npz",
+        "lookup_dir": tmp_dir / "food_lookup",
+        "similarity_path": tmp_dir / "similarity_index.npz",
+        "meal_scorer_path": tmp_dir / "meal_scorer.npz",
+        "text_index_path": tmp_dir / "text_index.npz",
+        "store_dir": tmp_dir / "store",
+    }
+    InferenceBundle.from_fitted(FEATURE_COLS, scaler, model).save(paths["bundle_path"])
+    FoodLookup.build(df).save(paths["lookup_dir"])
+    FoodSimilarityIndex.build(df["food_item"], X_scaled).save(paths["similarity_path"])
+    MealScorer.from_frame(df).save(paths["meal_scorer_path"])
+    FoodTextIndex.build(df).save(paths["text_index_path"])
+    return {name: str(path) for name, path in paths.items()}
+
+
+def _preload_time(paths: dict):
+    """preload() time in ms and the training-only modules it imported."""
+    script = _PRELOAD_SCRIPT.format(paths=paths, training_only=TRAINING_ONLY)
+    result = subprocess.run([sys.executable, "-c", script],
+                            capture_output=True, text=True, check=True)
+    elapsed, imported = result.stdout.splitlines()[-2:]
+    return float(elapsed), [name for name in imported.split(",") if name]
+
+
+def main() -> int:
+    runs = [_import_times(MODULE) for _ in range(N_RUNS)]
+    totals = sorted(run[MODULE][0] / 1e3 for run in runs)
+    median = totals[N_RUNS // 2]
+
+    # direct imports of the module, heaviest first (last run)
+    module_depth = runs[-1][MODULE][1]
+    top_level = [(name, us) for name, (us, depth) in runs[-1].items() if depth == module_depth + 2]
+    for name, us in sorted(top_level, key=lambda item: -item[1])[:8]:
+        print(f"  {name:<35} {us / 1e3:8.1f} ms")
+
+    imported = [name for name in TRAINING_ONLY if name in runs[-1]]
+    print(f"import {MODULE}: median {median:.0f} ms over {N_RUNS} runs "
+          f"(budget {IMPORT_BUDGET_MS} ms)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _build_artifacts(Path(tmp))
+        preloads = [_preload_time(paths) for _ in range(N_RUNS)]
+    preload_median = sorted(ms for ms, _ in preloads)[N_RUNS // 2]
+    preload_imported = preloads[-1][1]
+    print(f"api_file.preload() of {PRELOAD_FOODS:,} foods: median {preload_median:.0f} ms "
+          f"over {N_RUNS} runs (budget {PRELOAD_BUDGET_MS} ms)")
+
+    failed = False
+    if median > IMPORT_BUDGET_MS:
+        print(f"FAIL: import time {median:.0f} ms > {IMPORT_BUDGET_MS} ms")
+        failed = True
+    if preload_median > PRELOAD_BUDGET_MS:
+        print(f"FAIL: preload time {preload_median:.0f} ms > {PRELOAD_BUDGET_MS} ms")
+        failed = True
+    if imported:
+        print(f"FAIL: training-only modules imported by the serving path: {imported}")
+        failed = True
+    if preload_imported:
+        print(f"FAIL: training-only modules imported by preload(): {preload_imported}")
+        failed = True
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Adding a few hundred foods: full rebuild vs incremental update.
+
+Full rebuild = read and clean all raw rows from parquet, fit the
+MinMaxScaler and KMeans from scratch (what nutrimap_app.model does when the
+raw data changes).
+Incremental = nutrimap_app.incremental.update_clusters on the new rows
+only, assigning them to the existing centroids or warm-starting a refit;
+"+ save" also queues them in the pending file. The deferred
+nutrimap_app.incremental.apply_updates job, which merges them into the
+clustered data and rebuilds the indexes served from it, is timed on its own.
+
+Run from the project root:
+    python -m benchmarks.bench_incremental
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import MinMaxScaler
+
+from benchmarks.synthetic import synthetic_raw
+from nutrimap_app.artifacts import write_frame
+from nutrimap_app.data_prep_marie import clean_raw_rows
+from nutrimap_app.incremental import apply_updates, update_clusters
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.KMeanModel import FEATURE_COLS
+
+SIZES = [7_000, 100_000]
+N_NEW = 300
+
+
+def _full_build(raw_path):
+    raw = pd.read_parquet(raw_path)
+    df = clean_raw_rows(raw, include_branded=True)
+    df = df.drop(columns=["data_type", "energy_kcal"])
+    scaler = MinMaxScaler().fit(df[FEATURE_COLS])
+    model = KMeans(n_clusters=3, random_state=42).fit(scaler.transform(df[FEATURE_COLS]))
+    return df.assign(cluster=model.labels_), InferenceBundle.from_fitted(FEATURE_COLS, scaler, model)
+
+
+def main():
+    for n_rows in SIZES:
+        new_raw = synthetic_raw(N_NEW, offset=n_rows, seed=1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            paths = {
+                "bundle_path": tmp / "bundle.npz",
+                "clustered_path": tmp / "clusters.parquet",
+                "store_dir": tmp / "store",
+                "model_path": tmp / "best_model.pkl",
+                "pending_path": tmp / "food_updates.parquet",
+            }
+            index_paths = {
+                "lookup_dir": tmp / "food_lookup",
+                "similarity_path": tmp / "similarity_index.npz",
+                "text_index_path": tmp / "text_index.npz",
+                "meal_scorer_path": tmp / "meal_scorer.npz",
+            }
+            raw_path = tmp / "raw.parquet"
+            synthetic_raw(n_rows, seed=0).to_parquet(raw_path)
+
+            start = time.perf_counter()
+            df_clusters, bundle = _full_build(raw_path)
+            t_full = time.perf_counter() - start
+            bundle.save(paths["bundle_path"])
+            write_frame(df_clusters, paths["clustered_path"])
+
+            def run(**kwargs):
+                start = time.perf_counter()
+                update = update_clusters(new_raw, include_branded=True, **paths, **kwargs)
+                return update, (time.perf_counter() - start) * 1e3
+
+            update, t_assign = run(save=False)
+            _, t_assign_saved = run()
+            update_refit, t_refit = run(refit=True, save=False)
+
+            start = time.perf_counter()
+            apply_updates(paths["bundle_path"], paths["clustered_path"], paths["store_dir"],
+                          paths["pending_path"], **index_paths)
+            t_apply = (time.perf_counter() - start) * 1e3
+
+            print(f"{n_rows:>7,} foods + {N_NEW} new | full rebuild {t_full * 1e3:8.1f} ms | "
+                  f"assign {t_assign:6.1f} ms | assign + save {t_assign_saved:6.1f} ms | "
+                  f"apply_updates {t_apply:7.1f} ms | "
+                  f"warm refit {t_refit:7.1f} ms ({update_refit.relabelled} relabelled) | "
+                  f"inertia ratio {update.drift.inertia_ratio:.2f}")
+
+            # new foods far from the training data: twice the fat
+            drifted = new_raw.assign(**{"Total lipid (fat)": new_raw["Total lipid (fat)"] * 2 + 20})
+            report = update_clusters(drifted, include_branded=True, save=False, **paths).drift
+            print(f"{'':>7}   drifted batch: needs_rebuild={report.needs_rebuild} | "
+                  f"{'; '.join(report.reasons)}")
+
+
+if __name__ == "__main__":
+    main()
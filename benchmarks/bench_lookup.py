@@ -0,0 +1,77 @@
+"""Known-food lookup: memory-mapped table vs recomputing group and cluster.
+
+Also reports the private resident memory a worker pays for the table,
+mapped vs read into a dataframe (Linux, RssAnon in /proc/self/status).
+Mapped pages are file-backed and shared by all workers, so they do not
+count.
+
+Run from the project root:
+    python -m benchmarks.bench_lookup
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_nutrients
+from nutrimap_app.artifacts import read_frame, write_frame
+from nutrimap_app.category_mapping import assign_food_group
+from nutrimap_app.lookup import FoodLookup
+
+N_FOODS = 500_000
+N_QUERIES = 2_000
+
+
+def _rss_mb() -> float:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("RssAnon:"):
+            return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    df = synthetic_nutrients(N_FOODS)
+    df["cluster"] = rng.integers(3, size=N_FOODS)
+    centroids = rng.random((3, 6))
+    queries = df["food_item"].to_numpy()[rng.integers(N_FOODS, size=N_QUERIES)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        FoodLookup.build(df).save(Path(tmp) / "lookup")
+        print(f"{N_FOODS:,} foods | table built and saved in {time.perf_counter() - start:.2f} s")
+        write_frame(df, Path(tmp) / "foods.parquet")
+        del df
+
+        rss = _rss_mb()
+        table = FoodLookup.load(Path(tmp) / "lookup")
+        start = time.perf_counter()
+        for name in queries:
+            table.get(name)
+        t_lookup = (time.perf_counter() - start) / N_QUERIES
+        rss_mmap = _rss_mb() - rss
+
+        rss = _rss_mb()
+        foods = read_frame(Path(tmp) / "foods.parquet").set_index("food_item")
+        rss_frame = _rss_mb() - rss
+
+        # what a request does without the table: group rules + nearest centroid
+        start = time.perf_counter()
+        for name in queries[:200]:
+            row = foods.loc[name]
+            assign_food_group(row)
+            x = row[["fat_g", "satfat_g", "carbs_g", "protein_g", "fiber_g",
+                      "energy_kcal_calculated"]].to_numpy(dtype="float64")
+            ((centroids - x) ** 2).sum(axis=1).argmin()
+        t_recompute = (time.perf_counter() - start) / 200
+        del table
+
+    print(f"mmap lookup {t_lookup * 1e6:7.1f} us/food | recompute {t_recompute * 1e6:7.1f} us/food")
+    print(f"private memory: mmap table +{rss_mmap:.1f} MB after {N_QUERIES:,} lookups | "
+          f"dataframe +{rss_frame:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Throughput of MealScorer on random candidate meals.
+
+Run from the project root:
+    python -m benchmarks.bench_meal_scoring
+"""
+
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_nutrients
+from nutrimap_app.meal_scoring import MealScorer
+
+N_FOODS = 500_000
+N_MEALS = 10_000
+ITEMS_PER_MEAL = 4
+
+
+def main():
+    rng = np.random.default_rng(0)
+    df = synthetic_nutrients(N_FOODS)
+
+    start = time.perf_counter()
+    scorer = MealScorer.from_frame(df)
+    print(f"{N_FOODS:,} foods | scorer built in {time.perf_counter() - start:.2f} s")
+
+    names = df["food_item"].to_numpy()
+    meals = [
+        list(zip(names[rng.integers(N_FOODS, size=ITEMS_PER_MEAL)],
+                 rng.uniform(20, 250, ITEMS_PER_MEAL)))
+        for _ in range(N_MEALS)
+    ]
+
+    start = time.perf_counter()
+    scorer.score_many(meals)
+    elapsed = time.perf_counter() - start
+    print(f"score_many     | {N_MEALS / elapsed:12,.0f} meals/s (by name)")
+
+    # planner workload: candidates already resolved to row ids
+    meal_ids = np.repeat(np.arange(N_MEALS), ITEMS_PER_MEAL)
+    rows = rng.integers(N_FOODS, size=N_MEALS * ITEMS_PER_MEAL)
+    grams = rng.uniform(20, 250, N_MEALS * ITEMS_PER_MEAL)
+    start = time.perf_counter()
+    scorer.percent_ri(scorer.totals_from_rows(meal_ids, rows, grams, N_MEALS))
+    elapsed = time.perf_counter() - start
+    print(f"row ids        | {N_MEALS / elapsed:12,.0f} meals/s")
+
+    start = time.perf_counter()
+    for meal in meals[:1_000]:
+        scorer.score(meal)
+    elapsed = time.perf_counter() - start
+    print(f"score (1 by 1) | {1_000 / elapsed:12,.0f} meals/s")
+
+
+if __name__ == "__main__":
+    main()
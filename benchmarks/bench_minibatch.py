@@ -0,0 +1,74 @@
+"""MiniBatchKMeans (streamed from parquet) vs full-batch KMeans.
+
+Reports inertia and silhouette parity on the ~7k non-branded subset and
+training time / peak memory of the streamed engine as the file grows. The
+peak is measured per run (profiling.profile_pipeline resets it on Linux),
+as the rise above the memory in use when the run starts.
+
+Run from the project root:
+    python -m benchmarks.bench_minibatch
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+
+from benchmarks.synthetic import write_synthetic_parquet
+from nutrimap_app.KMeanModel import FEATURE_COLS, build_minibatch_kmeans_model
+from nutrimap_app.profiling import profile_pipeline, stage
+
+PARITY_ROWS = 650_000  # ~7k rows once branded foods and incomplete rows are dropped
+SCALING_ROWS = [250_000, 500_000, 1_000_000]
+
+
+def _parity(tmp: Path):
+    path = tmp / "parity.parquet"
+    write_synthetic_parquet(path, PARITY_ROWS, row_group_size=50_000)
+
+    mb_model, df = build_minibatch_kmeans_model(
+        file_path=path, include_branded=False, save_model=False, save_data=False,
+        return_frame=True)
+    X = ((df[FEATURE_COLS] - df[FEATURE_COLS].min()) /
+         (df[FEATURE_COLS].max() - df[FEATURE_COLS].min())).to_numpy()
+
+    full = KMeans(n_clusters=3, random_state=42).fit(X)
+    mb_labels = mb_model.predict(X)
+
+    print(f"parity on {len(X):,} non-branded rows")
+    print(f"  KMeans          inertia {full.inertia_:10.2f} | "
+          f"silhouette {silhouette_score(X, full.labels_):.4f}")
+    print(f"  MiniBatchKMeans inertia {-mb_model.score(X):10.2f} | "
+          f"silhouette {silhouette_score(X, mb_labels):.4f}")
+
+
+def _scaling(tmp: Path):
+    for n_rows in SCALING_ROWS:
+        path = tmp / f"raw_{n_rows}.parquet"
+        write_synthetic_parquet(path, n_rows, row_group_size=100_000)
+
+        with profile_pipeline() as profiler:
+            start = time.perf_counter()
+            with stage("bench.minibatch"):
+                build_minibatch_kmeans_model(
+                    file_path=path, include_branded=True, save_model=False, save_data=False)
+            elapsed = time.perf_counter() - start
+        run, label_pass = profiler.stages["bench.minibatch"], profiler.stages["minibatch.label_pass"]
+        trained = label_pass.rows_out
+        peak = (f"peak RSS +{run.peak_rss_delta_mb:7.1f} MB "
+                f"(label pass +{label_pass.peak_rss_delta_mb:6.1f} MB)"
+                if profiler.report()["peak_rss_per_stage"] else "peak RSS n/a (needs Linux)")
+        print(f"{n_rows:>10,} raw rows | {trained:>10,} trained | {elapsed:6.2f} s | {peak}")
+        path.unlink()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        _parity(Path(tmp))
+        _scaling(Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Per-stage profile of the pipeline on synthetic data, for CI.
+
+Writes a synthetic raw parquet file, then runs clean_food_data,
+scale_food_data and build_kmeans_model inside profiling.profile_pipeline
+and prints wall time, CPU time, peak RSS delta and rows in/out per stage.
+The JSON report (and, with --cpu-profile, a cProfile/pyinstrument dump) is
+written to --report.
+
+Run from the project root:
+    python -m benchmarks.bench_pipeline_profile [--rows N] [--report PATH]
+                                                [--cpu-profile cprofile]
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.synthetic import write_synthetic_parquet
+from nutrimap_app import data_prep_marie
+from nutrimap_app.KMeanModel import build_kmeans_model
+from nutrimap_app.profiling import profile_pipeline
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_REPORT = "pipeline_profile.json"
+
+
+def _print_report(report: dict):
+    print(f"{'stage':<32} {'calls':>6} {'wall s':>9} {'cpu s':>9} "
+          f"{'peak +MB':>9} {'rows in':>11} {'rows out':>11}")
+    for row in report["stages"]:
+        rows_in = "" if row["rows_in"] is None else f"{row['rows_in']:,}"
+        rows_out = "" if row["rows_out"] is None else f"{row['rows_out']:,}"
+        print(f"{row['stage']:<32} {row['calls']:>6} {row['wall_s']:>9.3f} {row['cpu_s']:>9.3f} "
+              f"{row['peak_rss_delta_mb']:>9.1f} {rows_in:>11} {rows_out:>11}")
+    print(f"total {report['total_wall_s']:.3f} s "
+          f"(peak RSS per stage: {'yes' if report['peak_rss_per_stage'] else 'process peak only'})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--report", default=DEFAULT_REPORT)
+    parser.add_argument("--cpu-profile", choices=["cprofile", "pyinstrument"])
+    parser.add_argument("--in-memory", action="store_true",
+                        help="clean without streaming the row groups")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        parquet_path = str(Path(tmp) / "data.parquet")
+        write_synthetic_parquet(parquet_path, args.rows)
+        cleaned_path = str(Path(tmp) / "cleaned.feather")
+        scaled_path = str(Path(tmp) / "scaled.feather")
+
+        with profile_pipeline(args.report, cpu_profile=args.cpu_profile) as profiler:
+            df_clean = data_prep_marie.clean_food_data(tmp, cleaned_path,
+                                                       streaming=not args.in_memory)
+            scaled_df = data_prep_marie.scale_food_data(cleaned_path, scaled_path)
+            build_kmeans_model(df_clean=df_clean, scaled_df=scaled_df,
+                               save_model=False, save_data=False)
+
+    print(f"synthetic parquet: {args.rows:,} rows")
+    _print_report(profiler.report())
+    print(f"report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
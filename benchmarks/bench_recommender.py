@@ -0,0 +1,44 @@
+"""Latency of MealRecommender.recommend at 500k candidate foods.
+
+Run from the project root:
+    python -m benchmarks.bench_recommender
+"""
+
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_nutrients
+from nutrimap_app.meal_scoring import MealScorer
+from nutrimap_app.recommender import MealRecommender
+
+N_FOODS = 500_000
+N_REQUESTS = 200
+
+
+def main():
+    rng = np.random.default_rng(0)
+    df = synthetic_nutrients(N_FOODS)
+
+    start = time.perf_counter()
+    recommender = MealRecommender(MealScorer.from_frame(df))
+    n_shortlisted = len(recommender.candidates())
+    print(f"{N_FOODS:,} foods | shortlists built in {time.perf_counter() - start:.2f} s "
+          f"({n_shortlisted:,} candidates)")
+
+    names = df["food_item"].to_numpy()
+    for food_groups in (None, ["nonstarchy_veg", "legumes_pulses", "grain_starch"]):
+        latencies = []
+        for _ in range(N_REQUESTS):
+            meal = list(zip(names[rng.integers(N_FOODS, size=2)], rng.uniform(50, 150, 2)))
+            start = time.perf_counter()
+            recommender.recommend(meal, kcal_budget=800, food_groups=food_groups, k=5)
+            latencies.append(time.perf_counter() - start)
+
+        latencies = np.array(latencies) * 1e3
+        print(f"groups={food_groups} | p50 {np.percentile(latencies, 50):6.2f} ms | "
+              f"p99 {np.percentile(latencies, 99):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
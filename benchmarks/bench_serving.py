@@ -0,0 +1,181 @@
+"""Load test of the production serving profile: 1 worker vs several.
+
+Starts gunicorn with nutrimap_app/gunicorn_conf.py on synthetic artifacts
+(a bundle with the centroids of models/best_model.pkl and a 500k-food
+lookup table, in a temporary directory), waits for /ready, then drives it
+with a stand-in client: CLIENT_THREADS keep-alive connections sending
+/predict/batch and /lookup requests for DURATION seconds.
+
+Run from the project root:
+    python -m benchmarks.bench_serving [n_workers]
+"""
+
+import http.client
+import json
+import multiprocessing
+import os
+import pickle
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from nutrimap_app import api_file
+
+# Directory of the synthetic artifacts, set by main() for the server processes
+ARTIFACTS_ENV = "BENCH_SERVING_DIR"
+
+N_FOODS = 500_000
+BATCH_SIZE = 100
+CLIENT_THREADS = 8
+DURATION = 10.0
+FEATURE_COLS = ["fat_g", "satfat_g", "carbs_g", "protein_g", "fiber_g", "energy_kcal_calculated"]
+
+# gunicorn target: the API, preloaded from the synthetic artifacts
+app = api_file.app
+if os.environ.get(ARTIFACTS_ENV):
+    _dir = Path(os.environ[ARTIFACTS_ENV])
+    api_file.preload(
+        bundle_path=_dir / "inference_bundle.npz",
+        lookup_dir=_dir / "food_lookup",
+        similarity_path=_dir / "missing",
+        meal_scorer_path=_dir / "missing",
+        text_index_path=_dir / "missing",
+        store_dir=_dir / "missing",
+    )
+
+
+def _build_artifacts(tmp_dir: Path):
+    from sklearn.preprocessing import MinMaxScaler
+
+    from benchmarks.synthetic import synthetic_nutrients
+    from nutrimap_app.inference import InferenceBundle
+    from nutrimap_app.KMeanModel import BEST_MODEL_PATH
+    from nutrimap_app.lookup import FoodLookup
+
+    df = synthetic_nutrients(N_FOODS)
+    with BEST_MODEL_PATH.open("rb") as f:
+        model = pickle.load(f)
+    scaler = MinMaxScaler().fit(df[FEATURE_COLS])
+    bundle = InferenceBundle.from_fitted(FEATURE_COLS, scaler, model)
+    bundle.save(tmp_dir / "inference_bundle.npz")
+
+    df["cluster"] = bundle.predict(df[FEATURE_COLS].to_numpy())
+    FoodLookup.build(df).save(tmp_dir / "food_lookup")
+    return df
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port: int, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/ready")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"server on port {port} not ready after {timeout} s")
+
+
+def _memory_mb(master_pid: int) -> tuple:
+    """(private, proportional) resident MB of the master and its workers."""
+    pids = [master_pid]
+    for task in Path(f"/proc/{master_pid}/task").iterdir():
+        pids += [int(p) for p in (task / "children").read_text().split()]
+
+    private = pss = 0
+    for pid in pids:
+        for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+            key, *value = line.split()
+            if key in ("Private_Clean:", "Private_Dirty:"):
+                private += int(value[0])
+            elif key == "Pss:":
+                pss += int(value[0])
+    return private / 1024, pss / 1024
+
+
+def _client(port, requests, stop, latencies):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    i = 0
+    while not stop.is_set():
+        method, path, body = requests[i % len(requests)]
+        start = time.perf_counter()
+        conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        if response.status == 200:
+            latencies.append(time.perf_counter() - start)
+        i += 1
+
+
+def _load_test(port, requests) -> tuple:
+    stop = threading.Event()
+    latencies = [[] for _ in range(CLIENT_THREADS)]
+    threads = [threading.Thread(target=_client, args=(port, requests[t::CLIENT_THREADS], stop, latencies[t]))
+               for t in range(CLIENT_THREADS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies = np.concatenate([np.asarray(l) for l in latencies]) * 1e3
+    return len(latencies) / DURATION, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    n_workers = int(sys.argv[1]) if len(sys.argv) > 1 else max(2, multiprocessing.cpu_count())
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = _build_artifacts(Path(tmp))
+
+        requests = []
+        for _ in range(200):
+            batch = df.iloc[rng.integers(N_FOODS, size=BATCH_SIZE)]
+            requests.append(("POST", "/predict/batch", json.dumps(batch[FEATURE_COLS].to_dict(orient="list"))))
+            name = df["food_item"].iat[rng.integers(N_FOODS)]
+            requests.append(("GET", "/lookup?" + f"food_item={name}".replace(" ", "%20"), None))
+
+        print(f"{os.cpu_count()} CPU(s) | {CLIENT_THREADS} client connections | {DURATION:.0f} s per run")
+        baseline = None
+        for workers in (1, n_workers):
+            port = _free_port()
+            env = {**os.environ, ARTIFACTS_ENV: tmp, "NUTRIMAP_PRELOAD": "0",
+                   "WEB_CONCURRENCY": str(workers), "PORT": str(port)}
+            server = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", "benchmarks.bench_serving:app",
+                 "-c", "nutrimap_app/gunicorn_conf.py", "--log-level", "warning"],
+                env=env,
+            )
+            try:
+                _wait_ready(port)
+                private, pss = _memory_mb(server.pid)
+                throughput, p50, p99 = _load_test(port, requests)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+
+            baseline = baseline or throughput
+            print(f"{workers} worker(s) | {throughput:8,.0f} req/s ({throughput / baseline:4.2f}x) | "
+                  f"p50 {p50:6.2f} ms | p99 {p99:7.2f} ms | "
+                  f"memory: private {private:6.1f} MB, proportional {pss:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Top-k similar-food query latency, KD-tree vs brute-force scan.
+
+Run from the project root:
+    python -m benchmarks.bench_similarity
+"""
+
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_nutrients
+from nutrimap_app.similarity import FoodSimilarityIndex
+
+SIZES = [7_000, 500_000]
+N_QUERIES = 1_000
+K = 10
+
+
+def main():
+    rng = np.random.default_rng(0)
+
+    for n_rows in SIZES:
+        df = synthetic_nutrients(n_rows)
+        X = df.drop(columns="food_item").to_numpy()
+        X = (X - X.min(axis=0)) / (X.max(axis=0) - X.min(axis=0))
+
+        start = time.perf_counter()
+        index = FoodSimilarityIndex.build(df["food_item"], X)
+        t_build = time.perf_counter() - start
+
+        queries = df["food_item"].to_numpy()[rng.integers(n_rows, size=N_QUERIES)]
+
+        start = time.perf_counter()
+        for name in queries:
+            index.query_food(name, K)
+        t_tree = (time.perf_counter() - start) / N_QUERIES
+
+        start = time.perf_counter()
+        for name in queries[:100]:
+            x = index.points[index._rows[name]]
+            dist = ((index.points - x) ** 2).sum(axis=1)
+            np.argpartition(dist, K + 1)[:K + 1]
+        t_scan = (time.perf_counter() - start) / 100
+
+        print(f"{n_rows:>8,} foods | build {t_build:6.2f} s | "
+              f"KD-tree {t_tree * 1e3:7.3f} ms/query | brute force {t_scan * 1e3:7.3f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
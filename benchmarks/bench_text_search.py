@@ -0,0 +1,42 @@
+"""Typeahead latency of FoodTextIndex vs a pandas str.contains scan.
+
+Run from the project root:
+    python -m benchmarks.bench_text_search
+"""
+
+import time
+
+from benchmarks.synthetic import synthetic_food_names, synthetic_nutrients
+from nutrimap_app.text_search import FoodTextIndex
+
+SIZES = [7_000, 500_000]
+QUERIES = ["greek yogurt", "greek yog", "chiken", "olive", "peanut butter unsalted", "bro"]
+
+
+def main():
+    for n_rows in SIZES:
+        df = synthetic_nutrients(n_rows)
+        df["food_item"] = synthetic_food_names(n_rows)
+
+        start = time.perf_counter()
+        index = FoodTextIndex.build(df)
+        t_build = time.perf_counter() - start
+        print(f"{n_rows:,} foods | build {t_build:.2f} s")
+
+        for query in QUERIES:
+            start = time.perf_counter()
+            for _ in range(20):
+                results = index.search(query, limit=10)
+            t_index = (time.perf_counter() - start) / 20
+
+            start = time.perf_counter()
+            df["food_item"].str.contains(query, case=False, regex=False)
+            t_scan = time.perf_counter() - start
+
+            top = results[0]["food_item"] if results else "-"
+            print(f"  {query!r:26} index {t_index * 1e3:7.2f} ms | "
+                  f"str.contains {t_scan * 1e3:7.1f} ms | top: {top}")
+
+
+if __name__ == "__main__":
+    main()
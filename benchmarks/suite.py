@@ -0,0 +1,304 @@
+"""Benchmark suite on synthetic data, compared against a stored baseline.
+
+Every case runs on data from benchmarks.synthetic, generated with fixed
+seeds, so the suite is reproducible and needs neither the private raw data
+nor a network connection or a GPU:
+- clean        data_prep_marie.clean_food_data on a raw parquet file of
+               n rows (98.5% branded foods, USDA-like NaN rates),
+- scale        data_prep_marie.scale_food_data on the cleaned file,
+- food_groups  category_mapping.assign_food_groups on n cleaned-style foods,
+- kmeans       KMeanModel.build_kmeans_model (k=3) on n cleaned-style foods,
+- api_predict  GET /predict latency and POST /predict/batch time, through
+               FastAPI's TestClient (does not depend on n, run once).
+
+All results are times (lower is better), the best of --repeat runs
+(latency percentiles: over all requests of all runs).
+They are stored as {"case[n_rows].metric": value} together with the
+library versions and platform, in benchmarks/baselines/<name>.json.
+
+Run from the project root:
+    python -m benchmarks.suite                    # run and compare with the baseline
+    python -m benchmarks.suite --save-baseline    # run and store as the new baseline
+    python -m benchmarks.suite --cases clean kmeans --sizes 10000 1000000 10000000
+
+Baselines are only comparable on the same machine: regenerate the stored
+one (--save-baseline) when the hardware changes.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_nutrients, write_synthetic_parquet
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+DEFAULT_REPEAT = 5
+
+# current / baseline above this is reported as a regression
+DEFAULT_TOLERANCE = 1.3
+
+FEATURE_COLS = ["fat_g", "satfat_g", "carbs_g", "protein_g", "fiber_g", "energy_kcal_calculated"]
+
+API_REQUESTS = 500
+API_BATCH_SIZE = 1_000
+
+
+class Case(NamedTuple):
+    run: Callable
+    sized: bool
+
+
+def _best_time(fn: Callable, repeat: int) -> float:
+    # the minimum, like timeit: the least disturbed by other processes
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+# -------------------------------------------------------
+# Cases: (workdir, n_rows, repeat) -> {metric: seconds}
+# -------------------------------------------------------
+
+def _raw_folder(workdir: Path, n_rows: int) -> str:
+    """Folder holding a synthetic data.parquet of n_rows rows."""
+    folder = workdir / f"raw_{n_rows}"
+    path = folder / "data.parquet"
+    if not path.exists():
+        folder.mkdir(parents=True, exist_ok=True)
+        write_synthetic_parquet(path, n_rows)
+    return str(folder)
+
+
+def _cleaned_file(workdir: Path, n_rows: int) -> str:
+    from nutrimap_app import data_prep_marie
+
+    path = workdir / f"cleaned_{n_rows}.feather"
+    if not path.exists():
+        data_prep_marie.clean_food_data(_raw_folder(workdir, n_rows), str(path))
+    return str(path)
+
+
+def bench_clean(workdir: Path, n_rows: int, repeat: int) -> Dict[str, float]:
+    from nutrimap_app import data_prep_marie
+
+    raw_folder = _raw_folder(workdir, n_rows)
+    output_path = str(workdir / "clean_out.feather")
+    return {
+        "streaming_s": _best_time(
+            lambda: data_prep_marie.clean_food_data(raw_folder, output_path, streaming=True), repeat),
+        "in_memory_s": _best_time(
+            lambda: data_prep_marie.clean_food_data(raw_folder, output_path, streaming=False), repeat),
+    }
+
+
+def bench_scale(workdir: Path, n_rows: int, repeat: int) -> Dict[str, float]:
+    from nutrimap_app.data_prep_marie import scale_food_data
+
+    cleaned_path = _cleaned_file(workdir, n_rows)
+    output_path = str(workdir / "scaled_out.feather")
+    return {"time_s": _best_time(lambda: scale_food_data(cleaned_path, output_path), repeat)}
+
+
+def bench_food_groups(workdir: Path, n_rows: int, repeat: int) -> Dict[str, float]:
+    from nutrimap_app.category_mapping import assign_food_groups
+
+    df = synthetic_nutrients(n_rows)
+    return {"time_s": _best_time(lambda: assign_food_groups(df), repeat)}
+
+
+def bench_kmeans(workdir: Path, n_rows: int, repeat: int) -> Dict[str, float]:
+    from sklearn.preprocessing import MinMaxScaler
+
+    from nutrimap_app.KMeanModel import build_kmeans_model
+
+    df = synthetic_nutrients(n_rows)
+    scaled = df.copy()
+    scaled[FEATURE_COLS] = MinMaxScaler().fit_transform(df[FEATURE_COLS])
+    return {"time_s": _best_time(
+        lambda: build_kmeans_model(k=3, df_clean=df, scaled_df=scaled,
+                                   save_model=False, save_data=False), repeat)}
+
+
+def bench_api_predict(workdir: Path, n_rows: int, repeat: int) -> Dict[str, float]:
+    from fastapi.testclient import TestClient
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import MinMaxScaler
+
+    from nutrimap_app import api_file
+    from nutrimap_app.inference import InferenceBundle
+
+    df = synthetic_nutrients(10_000)
+    scaler = MinMaxScaler().fit(df[FEATURE_COLS])
+    model = KMeans(n_clusters=3, random_state=42).fit(scaler.transform(df[FEATURE_COLS]))
+    bundle_path = workdir / "inference_bundle.npz"
+    InferenceBundle.from_fitted(FEATURE_COLS, scaler, model).save(bundle_path)
+
+    # only the model: the other artifacts point at files that do not exist
+    missing = workdir / "missing"
+    api_file.preload(bundle_path=bundle_path, lookup_dir=missing, similarity_path=missing,
+                     meal_scorer_path=missing, text_index_path=missing, store_dir=missing)
+    try:
+        with TestClient(api_file.app) as client:
+            rows = df[FEATURE_COLS].head(API_REQUESTS).to_dict(orient="records")
+            latencies = []
+            for _ in range(repeat):
+                for row in rows:
+                    start = time.perf_counter()
+                    client.get("/predict", params=row).raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+
+            payload = df[FEATURE_COLS].head(API_BATCH_SIZE).to_dict(orient="list")
+            batch_s = _best_time(
+                lambda: client.post("/predict/batch", json=payload).raise_for_status(), repeat)
+    finally:
+        api_file._preloaded = None
+
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)) * 1e3,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1e3,
+        f"batch_{API_BATCH_SIZE}_ms": batch_s * 1e3,
+    }
+
+
+CASES = {
+    "clean": Case(bench_clean, sized=True),
+    "scale": Case(bench_scale, sized=True),
+    "food_groups": Case(bench_food_groups, sized=True),
+    "kmeans": Case(bench_kmeans, sized=True),
+    "api_predict": Case(bench_api_predict, sized=False),
+}
+
+
+# -------------------------------------------------------
+# Running, storing and comparing
+# -------------------------------------------------------
+
+def environment() -> dict:
+    import pandas
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def run_suite(cases: List[str], sizes: List[int], repeat: int = DEFAULT_REPEAT) -> Dict[str, float]:
+    """Run the cases and return {"case[n_rows].metric": value}."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        for name in cases:
+            case = CASES[name]
+            for n_rows in (sizes if case.sized else [None]):
+                label = f"{name}[{n_rows}]" if case.sized else name
+                print(f"running {label} ...", file=sys.stderr, flush=True)
+                for metric, value in case.run(workdir, n_rows, repeat).items():
+                    results[f"{label}.{metric}"] = round(value, 6)
+    return results
+
+
+def compare(current: Dict[str, float], baseline: Dict[str, float],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[dict]:
+    """One row per metric: baseline, current, ratio and status."""
+    rows = []
+    for key in sorted(current.keys() | baseline.keys()):
+        now, before = current.get(key), baseline.get(key)
+        ratio = now / before if now is not None and before else None
+        if now is None or before is None:
+            status = "new" if before is None else "missing"
+        elif ratio > tolerance:
+            status = "REGRESSION"
+        elif ratio < 1 / tolerance:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append({"metric": key, "baseline": before, "current": now,
+                     "ratio": None if ratio is None else round(ratio, 3), "status": status})
+    return rows
+
+
+def format_comparison(rows: List[dict]) -> str:
+    def fmt(value):
+        return "" if value is None else f"{value:.4g}"
+
+    lines = [f"{'metric':<40} {'baseline':>10} {'current':>10} {'ratio':>7}  status"]
+    for row in rows:
+        lines.append(f"{row['metric']:<40} {fmt(row['baseline']):>10} {fmt(row['current']):>10} "
+                     f"{fmt(row['ratio']):>7}  {row['status']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the NutriMap benchmark suite on synthetic data.")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES,
+                        help="rows per sized case (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--baseline", default="default",
+                        help="baseline name, stored as benchmarks/baselines/NAME.json")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this run as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="slow-down ratio reported as a regression (default: %(default)s)")
+    parser.add_argument("--report", metavar="PATH",
+                        help="also write the results and the comparison as JSON")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with status 1 when a metric regressed")
+    args = parser.parse_args()
+
+    results = run_suite(args.cases, args.sizes, args.repeat)
+    run = {"environment": environment(), "sizes": args.sizes, "repeat": args.repeat,
+           "results": results}
+    baseline_path = BASELINE_DIR / f"{args.baseline}.json"
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(run, indent=2) + "\n")
+        for key, value in results.items():
+            print(f"{key:<40} {value:>10.4g}")
+        print(f"baseline written to {baseline_path}")
+        return
+
+    rows = []
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text())
+        if baseline["environment"] != run["environment"]:
+            print("note: the baseline was recorded in a different environment:\n"
+                  f"  {baseline['environment']}", file=sys.stderr)
+        # only compare the cases and sizes run this time
+        labels = {key.rsplit(".", 1)[0] for key in results}
+        stored = {key: value for key, value in baseline["results"].items()
+                  if key.rsplit(".", 1)[0] in labels}
+        rows = compare(results, stored, args.tolerance)
+        print(format_comparison(rows))
+    else:
+        print(f"no baseline at {baseline_path}, run with --save-baseline first")
+        for key, value in results.items():
+            print(f"{key:<40} {value:>10.4g}")
+
+    if args.report:
+        Path(args.report).write_text(json.dumps({**run, "comparison": rows}, indent=2) + "\n")
+
+    if args.fail_on_regression and any(row["status"] == "REGRESSION" for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
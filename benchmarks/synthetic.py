@@ -0,0 +1,233 @@
+"""Synthetic USDA-like nutrient data for benchmarks.
+
+The real raw_data/data.parquet is private, so benchmarks run on randomly
+generated foods with plausible macro compositions (per 100 g).
+
+A raw parquet file (data_prep_marie.COLUMNS_TO_KEEP plus filler columns,
+USDA-like NaN rates and branded share) can be written from the command
+line, e.g. to run the pipeline without the private data:
+    python -m benchmarks.synthetic raw_data/data.parquet --rows 1000000
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Raw file sizes the benchmark suite is meant to cover
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def synthetic_nutrients(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a cleaned-style nutrient dataframe.
+
+    Columns match the output of data_prep_marie.clean_food_data():
+    food_item, fat_g, satfat_g, carbs_g, protein_g, fiber_g,
+    energy_kcal_calculated.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of foods to generate.
+    seed : int
+        Seed for the random generator.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+
+    rng = np.random.default_rng(seed)
+
+    # dry matter per 100 g, split into fat / carbs / protein
+    solids = rng.uniform(2, 100, n_rows)
+    shares = rng.dirichlet([0.4, 1.0, 0.7], n_rows)
+
+    fat = (solids * shares[:, 0]).round(2)
+    carbs = (solids * shares[:, 1]).round(2)
+    protein = (solids * shares[:, 2]).round(2)
+    satfat = (fat * rng.uniform(0.05, 0.7, n_rows)).round(2)
+    fiber = (carbs * rng.uniform(0, 0.4, n_rows)).round(2)
+
+    df = pd.DataFrame({
+        "food_item": [f"food {i}" for i in range(n_rows)],
+        "fat_g": fat,
+        "satfat_g": satfat,
+        "carbs_g": carbs,
+        "protein_g": protein,
+        "fiber_g": fiber,
+    })
+    df["energy_kcal_calculated"] = (fat * 9 + carbs * 4 + protein * 4).round(1)
+
+    return df
+
+
+# Extra raw columns that clean_food_data never uses, to mimic the width of
+# the real USDA export
+_EXTRA_COLUMNS = [f"Nutrient {i}" for i in range(20)]
+
+
+def _raw_chunk(n_rows: int, offset: int, branded_share: float, rng) -> pd.DataFrame:
+    df = synthetic_nutrients(n_rows, seed=int(rng.integers(2**31)))
+
+    raw = pd.DataFrame({
+        "food_item": [f"food {i}" for i in range(offset, offset + n_rows)],
+        "Energy": (df["energy_kcal_calculated"] * rng.uniform(0.9, 1.1, n_rows)).round(0),
+        "data_type": np.where(rng.random(n_rows) < branded_share,
+                              "branded_food", "foundation_food"),
+        "Total lipid (fat)": df["fat_g"],
+        "Fatty acids, total saturated": df["satfat_g"],
+        "Carbohydrate, by difference": df["carbs_g"],
+        "Protein": df["protein_g"],
+        "Fiber, total dietary": df["fiber_g"],
+    })
+
+    # NaN rates roughly like the USDA data: sat fat and fiber are often
+    # missing, the macros rarely
+    nan_rates = {
+        "Total lipid (fat)": 0.02,
+        "Carbohydrate, by difference": 0.02,
+        "Protein": 0.01,
+        "Fatty acids, total saturated": 0.15,
+        "Fiber, total dietary": 0.2,
+    }
+    for col, rate in nan_rates.items():
+        raw.loc[rng.random(n_rows) < rate, col] = np.nan
+
+    for col in _EXTRA_COLUMNS:
+        raw[col] = rng.random(n_rows)
+
+    return raw
+
+
+def synthetic_raw(n_rows: int, offset: int = 0, branded_share: float = 0.0,
+                  seed: int = 0) -> pd.DataFrame:
+    """Raw USDA-like rows (the schema data_prep_marie reads), named
+    "food {offset}" ... "food {offset + n_rows - 1}"."""
+    return _raw_chunk(n_rows, offset, branded_share, np.random.default_rng(seed))
+
+
+def write_synthetic_parquet(path, n_rows: int,
+                            branded_share: float = 0.985,
+                            row_group_size: int = 500_000,
+                            seed: int = 0):
+    """
+    Write a raw USDA-like parquet file (the schema data_prep_marie reads).
+
+    The file is written one row group at a time, so generating 10M rows
+    does not need 10M rows in memory.
+
+    Parameters
+    ----------
+    path : str or Path
+        Output parquet file.
+    n_rows : int
+        Total number of foods.
+    branded_share : float
+        Share of rows with data_type == "branded_food".
+    row_group_size : int
+        Rows per parquet row group.
+    seed : int
+        Seed for the random generator.
+    """
+
+    import fastparquet
+
+    rng = np.random.default_rng(seed)
+
+    for offset in range(0, n_rows, row_group_size):
+        chunk = _raw_chunk(min(row_group_size, n_rows - offset), offset, branded_share, rng)
+        fastparquet.write(str(path), chunk, append=offset > 0)
+
+
+# Extra columns of the food-composition CSV exports read by data_prep.py
+_CSV_EXTRA_COLUMNS = ["Cholesterol", "Sodium", "Water", "Vitamin A", "Vitamin B1",
+                      "Vitamin B12", "Vitamin C", "Vitamin D", "Vitamin E", "Calcium",
+                      "Copper", "Iron", "Magnesium", "Manganese", "Phosphorus",
+                      "Potassium", "Selenium", "Zinc", "Nutrition Density"]
+
+
+def write_synthetic_csvs(folder, n_files: int, rows_per_file: int, seed: int = 0):
+    """
+    Write n_files CSV exports with the schema data_prep.py reads ("food",
+    "Caloric Value", "Fat", ...), one per region/food group.
+
+    Returns
+    -------
+    list of Path
+        The files written.
+    """
+
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    paths = []
+    for i in range(n_files):
+        df = synthetic_nutrients(rows_per_file, seed=int(rng.integers(2**31)))
+        csv = pd.DataFrame({
+            "food": synthetic_food_names(rows_per_file, seed=int(rng.integers(2**31))),
+            "Caloric Value": df["energy_kcal_calculated"].round(0),
+            "Fat": df["fat_g"],
+            "Saturated Fats": df["satfat_g"],
+            "Carbohydrates": df["carbs_g"],
+            "Sugars": (df["carbs_g"] * rng.uniform(0, 0.6, rows_per_file)).round(2),
+            "Protein": df["protein_g"],
+            "Dietary Fiber": df["fiber_g"],
+        })
+        for col in _CSV_EXTRA_COLUMNS:
+            csv[col] = rng.random(rows_per_file).round(3)
+
+        path = folder / f"FOOD-DATA-GROUP{i + 1}.csv"
+        csv.to_csv(path)
+        paths.append(path)
+    return paths
+
+
+_NAME_WORDS = {
+    "base": ["yogurt", "milk", "cheese", "chicken", "beef", "pork", "salmon", "tuna",
+             "egg", "bread", "rice", "pasta", "oats", "apple", "banana", "orange",
+             "carrot", "broccoli", "spinach", "potato", "lentils", "chickpeas",
+             "beans", "almonds", "walnuts", "butter", "olive oil", "chocolate",
+             "cookies", "cereal", "tofu", "quinoa", "peanut butter", "hummus"],
+    "style": ["greek", "plain", "whole", "lowfat", "nonfat", "organic", "raw",
+              "cooked", "roasted", "baked", "fried", "canned", "dried", "frozen",
+              "unsweetened", "sweetened", "smoked", "grilled", "salted", "unsalted"],
+    "extra": ["with skin", "without salt", "vanilla", "strawberry", "honey",
+              "ready-to-eat", "enriched", "boneless", "skinless", "in water"],
+}
+
+
+def synthetic_food_names(n_rows: int, seed: int = 0) -> np.ndarray:
+    """USDA-style food names, e.g. "Yogurt, greek, nonfat, vanilla"."""
+
+    rng = np.random.default_rng(seed)
+    base = rng.choice(_NAME_WORDS["base"], n_rows)
+    style = rng.choice(_NAME_WORDS["style"], n_rows)
+    extra = rng.choice(_NAME_WORDS["extra"], n_rows)
+    brand = rng.integers(0, 50_000, n_rows)
+
+    return np.array([
+        f"{b.capitalize()}, {s}, {e} ({k})"
+        for b, s, e, k in zip(base, style, extra, brand)
+    ], dtype=object)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic raw USDA-like parquet file.")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=SIZES[1])
+    parser.add_argument("--branded-share", type=float, default=0.985)
+    parser.add_argument("--row-group-size", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_synthetic_parquet(args.path, args.rows, branded_share=args.branded_share,
+                            row_group_size=args.row_group_size, seed=args.seed)
+    print(f"{args.rows:,} rows written to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,24 @@ This module:
 - Tries several values of k and computes clustering quality metrics.
 - Selects the best model based on the silhouette score.
 - Adds the chosen cluster labels to the cleaned dataframe.
-- Optionally saves the clustered dataframe and the trained model to disk.
+- Optionally saves the clustered dataframe and the trained model to disk,
+  and publishes the model as a new version of the model store
+  (model_store.py).
 """
 
 from __future__ import annotations
 
+import os
 import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Iterable, Tuple
+from typing import Iterable, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import (
     silhouette_score,
     calinski_harabasz_score,
@@ -24,7 +31,25 @@ from sklearn.metrics import (
 )
 
 # Import your existing data preparation functions
-from nutrimap_app.data_prep_marie import clean_food_data, scale_food_data
+from nutrimap_app.artifacts import FrameWriter, artifact_format, write_frame
+from nutrimap_app.cluster_quality import (
+    CLUSTER_QUALITY_PATH,
+    QualityReport,
+    cluster_quality_report,
+    save_report,
+)
+from nutrimap_app.data_prep_marie import clean_food_data, scale_food_data, iter_clean_chunks, PARQUET_PATH
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.model_store import (
+    BUNDLE_ARTIFACT,
+    MODEL_ARTIFACT,
+    DataHasher,
+    ModelStore,
+    _temp_path,
+    data_hash,
+    replace_atomically,
+)
+from nutrimap_app.profiling import stage
 
 
 # Default paths (adjust if your project structure is different)
@@ -33,7 +58,25 @@ MODELS_DIR = PROJECT_ROOT / "models"
 DATA_DIR = PROJECT_ROOT / "data/processed"
 
 BEST_MODEL_PATH = MODELS_DIR / "best_model.pkl"
-CLUSTERED_DATA_PATH = DATA_DIR / "food_with_clusters.csv"
+BUNDLE_PATH = MODELS_DIR / "inference_bundle.npz"
+CLUSTERED_DATA_PATH = DATA_DIR / "food_with_clusters.parquet"
+CLUSTERED_CSV_PATH = DATA_DIR / "food_with_clusters.csv"
+SWEEP_METRICS_PATH = DATA_DIR / "kmeans_sweep.csv"
+
+# Model features, in the column order of the cleaned data
+FEATURE_COLS = [
+    "fat_g",
+    "satfat_g",
+    "carbs_g",
+    "protein_g",
+    "fiber_g",
+    "energy_kcal_calculated",
+]
+
+# Model selection defaults
+K_VALUES = range(2, 11)
+SEEDS = (0, 1, 2)
+SILHOUETTE_SAMPLE_SIZE = 10_000
 
 
 def _prepare_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -52,12 +95,168 @@ def _prepare_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
     return df_clean, scaled_df
 
 
+# Feature matrix of the running sweep, set once per worker process
+_SWEEP_X = None
+
+
+def _init_sweep_worker(X: np.ndarray):
+    global _SWEEP_X
+    _SWEEP_X = X
+
+
+def _evaluate_k(k: int, seed: int, silhouette_sample_size: int) -> dict:
+    """Fit one KMeans on the worker's feature matrix and score it."""
+    from threadpoolctl import threadpool_limits
+
+    X = _SWEEP_X
+
+    # One BLAS/OpenMP thread per worker, the pool provides the parallelism
+    with threadpool_limits(limits=1):
+        model = KMeans(n_clusters=k, random_state=seed, n_init=1)
+        labels = model.fit_predict(X)
+
+        sample_size = min(silhouette_sample_size, len(X))
+        return {
+            "k": k,
+            "seed": seed,
+            "inertia": model.inertia_,
+            # O(sample_size²) instead of O(n²)
+            "silhouette": silhouette_score(X, labels, sample_size=sample_size,
+                                           random_state=seed),
+            # O(n·k), cheap enough for the full data
+            "calinski_harabasz": calinski_harabasz_score(X, labels),
+            "davies_bouldin": davies_bouldin_score(X, labels),
+        }
+
+
+def sweep_kmeans(
+    X,
+    k_values: Iterable[int] = K_VALUES,
+    seeds: Iterable[int] = SEEDS,
+    silhouette_sample_size: int = SILHOUETTE_SAMPLE_SIZE,
+    n_jobs: Optional[int] = None,
+) -> pd.DataFrame:
+    """Fit KMeans for every (k, seed) pair in parallel and score each fit.
+
+    Parameters
+    ----------
+    X : array-like
+        Scaled feature matrix.
+    k_values : iterable of int
+        Numbers of clusters to try.
+    seeds : iterable of int
+        Random states to try for each k.
+    silhouette_sample_size : int
+        Rows sampled for the silhouette score (which is quadratic in the
+        number of rows). Calinski-Harabasz and Davies-Bouldin use all rows.
+    n_jobs : int, optional
+        Worker processes, defaults to the number of CPUs.
+
+    Returns
+    -------
+    metrics : pd.DataFrame
+        One row per (k, seed) with inertia, silhouette, calinski_harabasz
+        and davies_bouldin.
+    """
+
+    X = np.ascontiguousarray(X, dtype="float64")
+    tasks = [(k, seed) for k in k_values for seed in seeds]
+    n_jobs = n_jobs or os.cpu_count()
+
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks)),
+                             initializer=_init_sweep_worker,
+                             initargs=(X,)) as pool:
+        futures = [pool.submit(_evaluate_k, k, seed, silhouette_sample_size)
+                   for k, seed in tasks]
+        rows = [f.result() for f in futures]
+
+    return pd.DataFrame(rows)
+
+
+def select_best_k(metrics: pd.DataFrame) -> Tuple[int, int]:
+    """Return the (k, seed) with the highest silhouette score."""
+    best = metrics.loc[metrics["silhouette"].idxmax()]
+    return int(best["k"]), int(best["seed"])
+
+
+def report_metrics(report: dict) -> dict:
+    """The metrics of a cluster quality report kept in a model store manifest."""
+    return {
+        "n_rows": report["n_rows"],
+        "inertia_per_row": report["inertia_per_row"],
+        "silhouette": report["silhouette"]["estimate"],
+        "silhouette_ci": [report["silhouette"]["ci_low"], report["silhouette"]["ci_high"]],
+        "calinski_harabasz": report["calinski_harabasz"],
+    }
+
+
+def _save_model(model, bundle: InferenceBundle, k: int, seed: int, features_hash: str,
+                metrics: dict, promote: bool, model_path=None, bundle_path=None,
+                store: Optional[ModelStore] = None, parent: Optional[str] = None) -> dict:
+    """Publish the model and its bundle as a new version of the model store.
+
+    With promote, they are also written to model_path and bundle_path
+    (BEST_MODEL_PATH and BUNDLE_PATH by default; renamed into place, so
+    readers never see half a file) and the version is served. Otherwise
+    they only go to the store: the served files are left untouched.
+    parent is the version the model was derived from (e.g. refitted from).
+    """
+    store = store if store is not None else ModelStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        if promote:
+            model_path = Path(model_path if model_path is not None else BEST_MODEL_PATH)
+            bundle_path = Path(bundle_path if bundle_path is not None else BUNDLE_PATH)
+        else:
+            model_path, bundle_path = Path(tmp) / BEST_MODEL_PATH.name, Path(tmp) / BUNDLE_PATH.name
+        replace_atomically(model_path, lambda path: path.write_bytes(pickle.dumps(model)))
+        replace_atomically(bundle_path, bundle.save)
+
+        manifest = store.publish(
+            {MODEL_ARTIFACT: model_path, BUNDLE_ARTIFACT: bundle_path},
+            k=k,
+            seed=seed,
+            data_hash=features_hash,
+            metrics=metrics,
+            parent=parent,
+        )
+    if promote:
+        store.promote(manifest["version"])
+    print(f"Model version {manifest['version']} {'promoted' if promote else 'stored, not promoted'}")
+    return manifest
+
+
 def build_kmeans_model(
     random_state: int = 42,
+    k: Optional[int] = 3,
     save_model: bool = True,
     save_data: bool = True,
+    export_csv: bool = False,
+    df_clean: Optional[pd.DataFrame] = None,
+    scaled_df: Optional[pd.DataFrame] = None,
+    promote: bool = True,
 ):
-    """Build a fixed 3‑cluster KMeans model.
+    """Build a KMeans model, with k=3 by default.
+
+    With k=None, sweep_kmeans() tries K_VALUES x SEEDS in parallel and the
+    (k, seed) with the best silhouette score is refitted on all rows; the
+    metrics table is saved to SWEEP_METRICS_PATH when save_data is True.
+
+    The clustered dataframe is saved as parquet (CLUSTERED_DATA_PATH); with
+    export_csv=True a CSV copy is written to CLUSTERED_CSV_PATH as well.
+    Its quality report (sampled silhouette, per-cluster statistics, see
+    cluster_quality) is saved next to it, to CLUSTER_QUALITY_PATH.
+
+    With save_model, the model is written to BEST_MODEL_PATH and
+    BUNDLE_PATH and published as a new version of the model store, with
+    the report metrics in its manifest, and that version is served.
+    With promote=False the version is only stored, to be promoted later
+    (python -m nutrimap_app.model_store promote VERSION): nothing that is
+    served is written, neither the model files nor the clustered data and
+    its report.
+
+    df_clean and scaled_df can be passed in when the caller already has
+    them (e.g. model.build_all); otherwise they are built with
+    _prepare_data().
 
     Returns
     -------
@@ -67,47 +266,199 @@ def build_kmeans_model(
         Cleaned dataframe with an added `cluster` column.
     """
 
-    df_clean, scaled_df = _prepare_data()
+    if df_clean is None or scaled_df is None:
+        df_clean, scaled_df = _prepare_data()
 
     # Features: all scaled numeric columns except the identifier
     X = scaled_df.drop(columns=["food_item"], errors="ignore")
 
-    # Fixed k=3
-    k = 3
-    model = KMeans(n_clusters=k, random_state=random_state)
-    labels = model.fit_predict(X)
+    if k is None:
+        with stage("kmeans.sweep", rows_in=len(X)):
+            metrics = sweep_kmeans(X)
+        k, random_state = select_best_k(metrics)
+        print(metrics.sort_values(["k", "seed"]).to_string(index=False))
+        if save_data:
+            write_frame(metrics, SWEEP_METRICS_PATH)
+
+    with stage("kmeans.fit", rows_in=len(X)) as s:
+        model = KMeans(n_clusters=k, random_state=random_state)
+        labels = model.fit_predict(X)
+        s.rows_out = len(labels)
 
     # Attach clusters
     df_with_clusters = df_clean.copy()
     df_with_clusters["cluster"] = labels
 
+    nutrients = df_clean[X.columns].to_numpy(dtype="float64")
+    if save_model or save_data:
+        with stage("kmeans.quality", rows_in=len(X)):
+            report = cluster_quality_report(
+                X.to_numpy(dtype="float64"), labels, model.cluster_centers_, X.columns,
+                nutrients=nutrients, nutrient_cols=X.columns,
+            )
+
     # Save outputs
     if save_model:
-        MODELS_DIR.mkdir(parents=True, exist_ok=True)
-        with BEST_MODEL_PATH.open("wb") as f:
-            pickle.dump(model, f)
+        with stage("kmeans.save_model", rows_in=len(df_clean)):
+            # Same MinMax fit as scale_food_data, kept so the API can go from raw
+            # grams to a cluster label without refitting
+            scaler = MinMaxScaler().fit(df_clean[X.columns])
+            bundle = InferenceBundle.from_fitted(X.columns, scaler, model)
+            _save_model(model, bundle, k, random_state, data_hash(nutrients),
+                        report_metrics(report), promote)
+
+    if save_data and promote:
+        with stage("kmeans.write_data", rows_in=len(df_with_clusters)):
+            write_frame(df_with_clusters, CLUSTERED_DATA_PATH)
+            if export_csv:
+                write_frame(df_with_clusters, CLUSTERED_CSV_PATH)
+            save_report(report, CLUSTER_QUALITY_PATH)
+
+    return model, df_with_clusters
+
+
+def build_minibatch_kmeans_model(
+    k: int = 3,
+    random_state: int = 42,
+    batch_size: int = 4096,
+    n_epochs: int = 3,
+    include_branded: bool = True,
+    file_path: str = PARQUET_PATH,
+    save_model: bool = True,
+    save_data: bool = True,
+    promote: bool = True,
+    return_frame: bool = False,
+):
+    """Train MiniBatchKMeans out of core, straight from the raw parquet.
+
+    The data is never held in memory as a whole: every pass streams row
+    groups through data_prep_marie.iter_clean_chunks().
+    - Pass 1 fits the MinMaxScaler incrementally (partial_fit).
+    - The next n_epochs passes feed scaled mini-batches of batch_size rows
+      to MiniBatchKMeans.partial_fit.
+    - A last pass assigns every row to its cluster, writes the labelled
+      row group to the clustered data file and adds it to the quality
+      report (cluster_quality.QualityReport) and the data hash.
+
+    Memory is bounded by one row group and time grows linearly with the
+    number of rows. Duplicates are only removed within each row group.
+    The model, the clustered rows and their quality report are saved, and
+    the model published, as in build_kmeans_model (promote=False only
+    stores the model version).
+
+    Returns
+    -------
+    model : MiniBatchKMeans
+        The fitted model.
+    df_with_clusters : pd.DataFrame or None
+        With return_frame, the cleaned rows with an added `cluster`
+        column (the whole data in memory); otherwise None.
+    """
+
+    def chunks():
+        for chunk in iter_clean_chunks(file_path, include_branded=include_branded):
+            yield chunk[["food_item"] + FEATURE_COLS]
+
+    # Pass 1: MinMax bounds over all rows
+    with stage("minibatch.scaler_pass"):
+        scaler = MinMaxScaler()
+        for chunk in chunks():
+            if len(chunk):
+                scaler.partial_fit(chunk[FEATURE_COLS])
+
+    # Passes 2..: incremental KMeans on scaled mini-batches
+    with stage("minibatch.fit_epochs"):
+        model = MiniBatchKMeans(n_clusters=k, random_state=random_state, batch_size=batch_size)
+        for _ in range(n_epochs):
+            for chunk in chunks():
+                X = scaler.transform(chunk[FEATURE_COLS])
+                for start in range(0, len(X), batch_size):
+                    batch = X[start:start + batch_size]
+                    # the first call initialises the k centroids from its batch
+                    if len(batch) >= k or hasattr(model, "cluster_centers_"):
+                        model.partial_fit(batch)
+
+    # Last pass: labels for every row, using plain arrays; each labelled
+    # chunk is written next to the clustered data and renamed over it once
+    # the model is saved
+    write_data = save_data and promote
+    data_tmp = _temp_path(CLUSTERED_DATA_PATH.parent, f".{CLUSTERED_DATA_PATH.name}.") \
+        if write_data else None
+    try:
+        with stage("minibatch.label_pass") as s:
+            bundle = InferenceBundle.from_fitted(FEATURE_COLS, scaler, model)
+            quality = QualityReport(bundle.centroids, FEATURE_COLS, nutrient_cols=FEATURE_COLS)
+            hasher = DataHasher()
+            labelled, inertia, n_rows = [], 0.0, 0
+            writer = (FrameWriter(data_tmp, fmt=artifact_format(CLUSTERED_DATA_PATH))
+                      if write_data else None)
+            for chunk in chunks():
+                nutrients = chunk[FEATURE_COLS].to_numpy(dtype="float64")
+                X_scaled = bundle.transform(nutrients)
+                labels, sq_distances = bundle.assign_scaled(X_scaled)
+                chunk = chunk.assign(cluster=labels)
+
+                quality.update(X_scaled, labels, nutrients)
+                hasher.update(nutrients)
+                inertia += sq_distances.sum()
+                n_rows += len(chunk)
+                if writer is not None:
+                    writer.write(chunk)
+                if return_frame:
+                    labelled.append(chunk)
+            if writer is not None:
+                writer.close()
+            bundle.inertia_per_row = inertia / max(n_rows, 1)
+            s.rows_out = n_rows
+
+        if save_model or save_data:
+            with stage("minibatch.quality", rows_in=n_rows):
+                report = quality.result()
+
+        # Save outputs
+        if save_model:
+            with stage("minibatch.save_model"):
+                _save_model(model, bundle, k, random_state, hasher.hexdigest(),
+                            report_metrics(report), promote)
 
-    if save_data:
-        DATA_DIR.mkdir(parents=True, exist_ok=True)
-        df_with_clusters.to_csv(CLUSTERED_DATA_PATH, index=False)
+        if write_data:
+            with stage("minibatch.write_data", rows_in=n_rows):
+                os.replace(data_tmp, CLUSTERED_DATA_PATH)
+                save_report(report, CLUSTER_QUALITY_PATH)
+    finally:
+        if data_tmp is not None and data_tmp.exists():
+            data_tmp.unlink()
 
+    df_with_clusters = pd.concat(labelled) if return_frame else None
     return model, df_with_clusters
 
 
 def kmeanModel(
     random_state: int = 42,
+    k: Optional[int] = 3,
     save_model: bool = True,
     save_data: bool = True,
+    export_csv: bool = False,
+    df_clean: Optional[pd.DataFrame] = None,
+    scaled_df: Optional[pd.DataFrame] = None,
+    promote: bool = True,
 ):
     return build_kmeans_model(
         random_state=random_state,
+        k=k,
         save_model=save_model,
         save_data=save_data,
+        export_csv=export_csv,
+        df_clean=df_clean,
+        scaled_df=scaled_df,
+        promote=promote,
     )
 
 
 if __name__ == "__main__":
     model, df_clusters = build_kmeans_model()
-    print("KMeans clustering completed with k=3.")
+    print(f"KMeans clustering completed with k={model.n_clusters}.")
     print("Model saved to:", BEST_MODEL_PATH)
+    print("Inference bundle saved to:", BUNDLE_PATH)
     print("Clustered data saved to:", CLUSTERED_DATA_PATH)
+    print("Cluster quality report saved to:", CLUSTER_QUALITY_PATH)
@@ -0,0 +1,190 @@
+"""HTTP client for the NutriMap API, used by the Streamlit frontend.
+
+- one pooled requests.Session (keep-alive connections, retries on
+  connection errors), meant to be created once per process,
+- predictions memoized on the nutrient values, with a TTL and LRU eviction,
+- several foods are sent as one POST /predict/batch (split into requests
+  of at most MAX_BATCH_SIZE foods); foods already cached are not sent
+  again,
+- submit() runs a request on a small thread pool and returns a Future, so
+  a UI can keep showing the last result while a slow backend answers.
+  Identical requests in flight share one Future.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+NUTRIENT_COLS = ["fat_g", "satfat_g", "carbs_g", "protein_g", "fiber_g"]
+
+# Predictions do not change between model releases, a few minutes is safe
+CACHE_TTL = 300.0
+CACHE_SIZE = 4096
+
+# Maximum number of foods accepted by /predict/batch (api_file.MAX_BATCH_SIZE)
+MAX_BATCH_SIZE = 10_000
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (3.05, 30.0)
+POOL_SIZE = 8
+
+Key = Tuple[float, ...]
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire after `ttl` seconds.
+
+    When full, the least recently used entry is evicted.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Key, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Key):
+        """Cached value, or None when missing or expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Key, value) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+def nutrient_key(food: Mapping[str, float]) -> Key:
+    """Cache key of a food: its nutrient values, rounded."""
+    return tuple(round(float(food[col]), 3) for col in NUTRIENT_COLS)
+
+
+class NutriMapClient:
+    """Pooled, cached and batching client for /predict/batch.
+
+    Parameters
+    ----------
+    base_url : str
+        API root, e.g. "http://localhost:8000".
+    cache_size, cache_ttl : int, float
+        LRU size and time-to-live (seconds) of the prediction cache.
+    timeout : float or (float, float)
+        requests timeout, (connect, read).
+    """
+
+    def __init__(self, base_url: str, cache_size: int = CACHE_SIZE,
+                 cache_ttl: float = CACHE_TTL, timeout=TIMEOUT, pool_size: int = POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache = TTLCache(cache_size, cache_ttl)
+
+        retry = Retry(total=2, connect=2, read=0, backoff_factor=0.2,
+                      allowed_methods=None, status_forcelist=[502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="nutrimap-api")
+        self._pending: Dict[Tuple[Key, ...], Future] = {}
+        # re-entrant: a Future that is already done runs _forget inside submit
+        self._pending_lock = threading.RLock()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    # ---------------------------------------------------
+    # Blocking calls
+    # ---------------------------------------------------
+
+    def predict_many(self, foods: Sequence[Mapping[str, float]]) -> List[dict]:
+        """
+        Cluster and food group of several foods, in as few requests as the
+        API's batch limit allows (one per MAX_BATCH_SIZE uncached foods).
+
+        Parameters
+        ----------
+        foods : sequence of mappings
+            Nutrients per 100 g (NUTRIENT_COLS) of every food.
+
+        Returns
+        -------
+        list of dict
+            {"prediction": int, "food_group": str} per food, in order.
+        """
+        keys = [nutrient_key(food) for food in foods]
+        results = [self.cache.get(key) for key in keys]
+
+        missing = list(dict.fromkeys(key for key, result in zip(keys, results) if result is None))
+        if not missing:
+            return results
+
+        fetched = {}
+        for start in range(0, len(missing), MAX_BATCH_SIZE):
+            batch = missing[start:start + MAX_BATCH_SIZE]
+            payload = {col: [key[j] for key in batch] for j, col in enumerate(NUTRIENT_COLS)}
+            response = self.session.post(f"{self.base_url}/predict/batch",
+                                         json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            body = response.json()
+
+            for key, prediction, food_group in zip(batch, body["prediction"], body["food_group"]):
+                fetched[key] = {"prediction": prediction, "food_group": food_group}
+                self.cache.put(key, fetched[key])
+
+        return [result if result is not None else fetched[key]
+                for key, result in zip(keys, results)]
+
+    def predict(self, food: Mapping[str, float]) -> dict:
+        """Cluster and food group of one food."""
+        return self.predict_many([food])[0]
+
+    # ---------------------------------------------------
+    # Non-blocking calls
+    # ---------------------------------------------------
+
+    def cached(self, foods: Sequence[Mapping[str, float]]) -> Optional[List[dict]]:
+        """Results of foods that are all cached, else None (no request)."""
+        results = [self.cache.get(nutrient_key(food)) for food in foods]
+        return None if any(result is None for result in results) else results
+
+    def submit(self, foods: Sequence[Mapping[str, float]]) -> Future:
+        """predict_many() on the thread pool; identical calls in flight share a Future."""
+        request_key = tuple(nutrient_key(food) for food in foods)
+        with self._pending_lock:
+            future = self._pending.get(request_key)
+            if future is None:
+                future = self._executor.submit(self.predict_many, list(foods))
+                self._pending[request_key] = future
+                future.add_done_callback(lambda _: self._forget(request_key))
+            return future
+
+    def _forget(self, request_key) -> None:
+        with self._pending_lock:
+            self._pending.pop(request_key, None)
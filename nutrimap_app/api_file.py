@@ -1,21 +1,365 @@
-from fastapi import FastAPI
-import pickle
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+# Serving imports and artifacts need NumPy only: every index is saved by the
+# pipeline as plain arrays, none is unpickled or read with pandas.
+# See benchmarks/bench_import_time.py.
+from nutrimap_app.category_mapping import FOOD_GROUPS, food_group_codes
+from nutrimap_app.json_utils import json_safe
+from nutrimap_app.lookup import FoodLookup, LOOKUP_DIR, lookup_files
+from nutrimap_app.meal_scoring import MealScorer, MEAL_SCORER_PATH
+from nutrimap_app.recommender import MealRecommender
+from nutrimap_app.model_store import ModelStore, STORE_DIR
+from nutrimap_app.registry import ModelRegistry, BUNDLE_PATH
+from nutrimap_app.similarity import FoodSimilarityIndex, SIMILARITY_INDEX_PATH
+from nutrimap_app.text_search import FoodTextIndex, TEXT_INDEX_PATH
+
+logger = logging.getLogger(__name__)
+
+# Set to "1" (see gunicorn_conf.py) to load the artifacts at import time
+PRELOAD_ENV = "NUTRIMAP_PRELOAD"
+
+# Seconds between checks for a new model on disk (bundle file or promoted version)
+RELOAD_INTERVAL = 30
+
+# Maximum number of foods accepted by /predict/batch
+MAX_BATCH_SIZE = 10_000
+
+# Maximum number of neighbours returned by /similar
+MAX_SIMILAR = 100
+
+# Maximum number of matches returned by /search
+MAX_SEARCH_RESULTS = 50
+
+# Maximum number of suggestions returned by /meal/recommend
+MAX_RECOMMENDATIONS = 50
+
+
+class NutrientBatch(BaseModel):
+    """Columnar batch of foods, one list per nutrient (per 100 g)."""
+    fat_g: List[float]
+    satfat_g: List[float]
+    carbs_g: List[float]
+    protein_g: List[float]
+    fiber_g: List[float]
+    energy_kcal_calculated: Optional[List[float]] = None
+
+
+class MealItem(BaseModel):
+    food_item: str
+    grams: float = Field(gt=0, allow_inf_nan=False)
+
+
+class Meal(BaseModel):
+    items: List[MealItem]
+
+
+class RecommendRequest(Meal):
+    kcal_budget: Optional[float] = Field(default=None, gt=0, allow_inf_nan=False)
+    food_groups: Optional[List[str]] = None
+    k: int = 5
+
+
+async def _watch_model(registry: ModelRegistry, interval: float = RELOAD_INTERVAL):
+    # An error must not end the task: hot reload would stay off in this worker
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(registry.reload_if_changed)
+        except Exception:
+            logger.exception("Model reload check failed, retrying in %s s", interval)
+
+
+def load_artifacts(bundle_path=BUNDLE_PATH,
+                   lookup_dir=LOOKUP_DIR,
+                   similarity_path=SIMILARITY_INDEX_PATH,
+                   meal_scorer_path=MEAL_SCORER_PATH,
+                   text_index_path=TEXT_INDEX_PATH,
+                   store_dir=STORE_DIR) -> dict:
+    """Load everything the endpoints serve; missing artifacts are None.
+
+    The model is the promoted version of the model store in store_dir,
+    or the bundle at bundle_path while none is promoted.
+    """
+    registry = ModelRegistry(bundle_path, ModelStore(store_dir))
+    registry.reload_if_changed()
+
+    # Memory-mapped, so every worker shares the same pages
+    lookup = None
+    if all(path.exists() for path in lookup_files(lookup_dir)):
+        lookup = FoodLookup.load(lookup_dir)
+
+    similarity = None
+    if Path(similarity_path).exists():
+        similarity = FoodSimilarityIndex.load(similarity_path)
+
+    meal_scorer = recommender = None
+    if Path(meal_scorer_path).exists():
+        meal_scorer = MealScorer.load(meal_scorer_path)
+        recommender = MealRecommender(meal_scorer)
+
+    text_index = None
+    if Path(text_index_path).exists():
+        text_index = FoodTextIndex.load(text_index_path)
+
+    return {
+        "registry": registry,
+        "lookup": lookup,
+        "similarity": similarity,
+        "meal_scorer": meal_scorer,
+        "recommender": recommender,
+        "text_index": text_index,
+    }
+
+
+def preload(**paths) -> dict:
+    """Load the artifacts now, in the importing process.
+
+    Under gunicorn --preload this runs in the master before the workers are
+    forked, so they start with the artifacts already in (copy-on-write
+    shared) memory instead of each loading its own copy.
+    """
+    global _preloaded
+    _preloaded = load_artifacts(**paths)
+    return _preloaded
+
+
+def _warmup(state) -> None:
+    """Run every loaded artifact once, so the first request is not the slow one."""
+    if state.registry.is_loaded:
+        state.registry.predict(np.zeros((1, len(state.registry.current.bundle.feature_cols))))
+    if state.lookup is not None and len(state.lookup):
+        state.lookup.get(state.lookup.name(0))
+    if state.similarity is not None and len(state.similarity):
+        state.similarity.query_food(state.similarity.food_items[0], 1)
+    if state.recommender is not None:
+        state.recommender.recommend([], k=1)
+    if state.text_index is not None:
+        state.text_index.search("a", 1)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+
+    # Load the artifacts once (or reuse the preloaded ones), all requests share them
+    artifacts = _preloaded if _preloaded is not None else load_artifacts()
+    for name, value in artifacts.items():
+        setattr(app.state, name, value)
+
+    await asyncio.to_thread(_warmup, app.state)
+    app.state.ready = True
+
+    watcher = asyncio.create_task(_watch_model(app.state.registry))
+    yield
+    watcher.cancel()
+
+
+_preloaded = None
+if os.environ.get(PRELOAD_ENV) == "1":
+    preload()
 
-#from package_folder.iris import my_prediction_function
 
 # FastAPI instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Validation errors echo the rejected input, which can be NaN or inf
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+    return JSONResponse(status_code=422,
+                        content={"detail": json_safe(jsonable_encoder(exc.errors()))})
 
 # Root endpoint
 @app.get("/")
 def root():
     return {'greeting':"hello"}
 
+# Readiness probe: 200 only once the artifacts are loaded and warmed up
+@app.get("/ready")
+def ready(request: Request):
+    state = request.app.state
+    if not getattr(state, "ready", False):
+        raise HTTPException(status_code=503, detail="Warming up")
+
+    return {
+        "ready": True,
+        "model": state.registry.is_loaded,
+        "model_version": state.registry.model_version,
+        "lookup": state.lookup is not None,
+        "similarity": state.similarity is not None,
+        "meal_scorer": state.meal_scorer is not None,
+        "text_index": state.text_index is not None,
+    }
+
 # Prediction endpoint
 @app.get("/predict")
-def predict(sepal_length, sepal_width, petal_length, petal_width):
-    # Use the function in our package to run the prediction
-    prediction = my_prediction_function(sepal_length, sepal_width, petal_length, petal_width)
+def predict(request: Request,
+            fat_g: float,
+            satfat_g: float,
+            carbs_g: float,
+            protein_g: float,
+            fiber_g: float,
+            energy_kcal_calculated: Optional[float] = None):
+    if energy_kcal_calculated is None:
+        energy_kcal_calculated = round(fat_g * 9 + carbs_g * 4 + protein_g * 4, 1)
+
+    nutrients = {
+        "fat_g": fat_g,
+        "satfat_g": satfat_g,
+        "carbs_g": carbs_g,
+        "protein_g": protein_g,
+        "fiber_g": fiber_g,
+        "energy_kcal_calculated": energy_kcal_calculated,
+    }
+    if not np.isfinite(list(nutrients.values())).all():
+        raise HTTPException(status_code=422, detail="Nutrient values must be finite numbers")
+
+    try:
+        prediction = request.app.state.registry.predict_columns(nutrients)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
     # Return prediction
     return {"prediction": int(prediction[0])}
+
+
+# Batch prediction endpoint
+@app.post("/predict/batch")
+def predict_batch(request: Request, batch: NutrientBatch):
+    columns = batch.model_dump(exclude_none=True)
+
+    n_rows = len(batch.fat_g)
+    if n_rows > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413,
+                            detail=f"Batch too large: {n_rows} > {MAX_BATCH_SIZE} foods")
+    if any(len(values) != n_rows for values in columns.values()):
+        raise HTTPException(status_code=422, detail="All nutrient lists must have the same length")
+
+    columns = {col: np.asarray(values, dtype="float64") for col, values in columns.items()}
+    if "energy_kcal_calculated" not in columns:
+        columns["energy_kcal_calculated"] = np.round(
+            columns["fat_g"] * 9 +
+            columns["carbs_g"] * 4 +
+            columns["protein_g"] * 4,
+            1,
+        )
+    if not all(np.isfinite(values).all() for values in columns.values()):
+        raise HTTPException(status_code=422, detail="Nutrient values must be finite numbers")
+
+    # One scaling + prediction call for the whole matrix
+    try:
+        clusters = request.app.state.registry.predict_columns(columns)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "prediction": clusters.tolist(),
+        "food_group": np.asarray(FOOD_GROUPS)[food_group_codes(columns)].tolist(),
+    }
+
+
+# Precomputed cluster and food group of a known food
+@app.get("/lookup")
+def lookup(request: Request, food_item: str):
+    table = request.app.state.lookup
+    if table is None:
+        raise HTTPException(status_code=503,
+                            detail=f"No lookup table found at {LOOKUP_DIR}; "
+                                   "rebuild it with nutrimap_app.model")
+
+    try:
+        return table.get(food_item)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+# Nutritionally closest foods
+@app.get("/similar")
+def similar(request: Request, food_item: str, k: int = 5):
+    index = request.app.state.similarity
+    if index is None:
+        raise HTTPException(status_code=503,
+                            detail=f"No similarity index found at {SIMILARITY_INDEX_PATH}; "
+                                   "rebuild it with nutrimap_app.model")
+    if not 1 <= k <= MAX_SIMILAR:
+        raise HTTPException(status_code=422, detail=f"k must be between 1 and {MAX_SIMILAR}")
+
+    try:
+        matches = index.query_food(food_item, k)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown food_item: {food_item}")
+
+    return {
+        "food_item": food_item,
+        "similar": [{"food_item": name, "distance": dist} for name, dist in matches],
+    }
+
+
+# Typeahead search on food names
+@app.get("/search")
+def search(request: Request, q: str, limit: int = 10):
+    index = request.app.state.text_index
+    if index is None:
+        raise HTTPException(status_code=503,
+                            detail=f"No text index found at {TEXT_INDEX_PATH}; "
+                                   "rebuild it with nutrimap_app.model")
+    if not 1 <= limit <= MAX_SEARCH_RESULTS:
+        raise HTTPException(status_code=422,
+                            detail=f"limit must be between 1 and {MAX_SEARCH_RESULTS}")
+
+    return {"query": q, "results": index.search(q, limit)}
+
+
+# Nutrient totals of a plate against the EFSA reference intakes
+@app.post("/meal/score")
+def meal_score(request: Request, meal: Meal):
+    scorer = request.app.state.meal_scorer
+    if scorer is None:
+        raise HTTPException(status_code=503,
+                            detail=f"No meal scorer found at {MEAL_SCORER_PATH}; "
+                                   "rebuild it with nutrimap_app.model")
+
+    try:
+        return scorer.score([(item.food_item, item.grams) for item in meal.items])
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+# Foods that close the gap between a plate and the EFSA reference intakes
+@app.post("/meal/recommend")
+def meal_recommend(request: Request, body: RecommendRequest):
+    recommender = request.app.state.recommender
+    if recommender is None:
+        raise HTTPException(status_code=503,
+                            detail=f"No meal scorer found at {MEAL_SCORER_PATH}; "
+                                   "rebuild it with nutrimap_app.model")
+    if not 1 <= body.k <= MAX_RECOMMENDATIONS:
+        raise HTTPException(status_code=422,
+                            detail=f"k must be between 1 and {MAX_RECOMMENDATIONS}")
+    unknown = sorted(set(body.food_groups or ()) - set(FOOD_GROUPS))
+    if unknown:
+        raise HTTPException(status_code=422,
+                            detail=f"Unknown food groups {unknown}, expected some of {FOOD_GROUPS}")
+
+    try:
+        suggestions = recommender.recommend(
+            [(item.food_item, item.grams) for item in body.items],
+            kcal_budget=body.kcal_budget,
+            food_groups=body.food_groups,
+            k=body.k,
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+    return {"suggestions": suggestions}
@@ -0,0 +1,174 @@
+"""Reading and writing the dataframes passed between pipeline stages.
+
+The format is picked from the file suffix:
+- .feather / .arrow : Arrow IPC, read memory-mapped (default for stages)
+- .parquet          : compressed columnar file
+- .csv              : text export, kept for people opening files by hand
+
+Feather and parquet keep the dtypes and the full float precision, CSV does
+not, so stages should only hand each other the columnar formats.
+
+FrameWriter writes a dataframe that arrives in chunks, without holding
+it in memory as a whole.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+FORMATS = {
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".parquet": "parquet",
+    ".csv": "csv",
+}
+
+
+def artifact_format(path) -> str:
+    """Return the artifact format ("feather", "parquet" or "csv") of a path."""
+    suffix = Path(path).suffix.lower()
+    if suffix not in FORMATS:
+        raise ValueError(f"Unsupported artifact format '{suffix}' for {path}, "
+                         f"expected one of {sorted(FORMATS)}")
+    return FORMATS[suffix]
+
+
+def write_frame(df: pd.DataFrame, path, fmt: Optional[str] = None) -> Path:
+    """
+    Save a dataframe to path, in the format given by its suffix.
+
+    The index is not stored (same as to_csv(index=False) before).
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Dataframe to save.
+    path : str or Path
+        Output file (.feather, .arrow, .parquet or .csv).
+    fmt : {"feather", "parquet", "csv"}, optional
+        Format for a path without the format suffix, e.g. the temporary
+        file of model_store.replace_atomically.
+
+    Returns
+    -------
+    Path
+        The written path.
+    """
+
+    path = Path(path)
+    fmt = fmt or artifact_format(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if fmt == "feather":
+        # uncompressed so reads can be memory-mapped without decoding
+        df.reset_index(drop=True).to_feather(path, compression="uncompressed")
+    elif fmt == "parquet":
+        df.to_parquet(path, engine="pyarrow", index=False)
+    else:
+        df.to_csv(path, index=False)
+
+    return path
+
+
+class FrameWriter:
+    """
+    Write a dataframe chunk by chunk, in the format given by the suffix.
+
+    The file holds the chunks in order, as write_frame() of their
+    concatenation would (without the index). All chunks must have the
+    columns and dtypes of the first one.
+
+        with FrameWriter(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path, fmt: Optional[str] = None):
+        self.path = Path(path)
+        # fmt for a path without the format suffix (e.g. a temporary file)
+        self.format = fmt or artifact_format(self.path)
+        self.n_rows = 0
+        self._schema: Optional[pa.Schema] = None
+        self._writer = None
+        self._columns = None
+        self._empty: Optional[pd.DataFrame] = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        if not len(df):
+            # an empty object column has no type yet: wait for rows
+            if self._columns is None:
+                self._empty = df
+            return
+        if self._columns is None:
+            self._open(df)
+        self.n_rows += len(df)
+
+        if self.format == "csv":
+            df[self._columns].to_csv(self.path, mode="a", header=False, index=False)
+            return
+        table = pa.Table.from_pandas(df[self._columns], schema=self._schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def _open(self, df: pd.DataFrame) -> None:
+        self._columns = list(df.columns)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.format == "csv":
+            df.head(0).to_csv(self.path, index=False)
+            return
+        self._schema = pa.Schema.from_pandas(df, preserve_index=False)
+        if self.format == "parquet":
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        else:
+            # uncompressed, as write_frame, so reads can be memory-mapped
+            self._writer = ipc.new_file(self.path, self._schema,
+                                        options=ipc.IpcWriteOptions(compression=None))
+
+    def close(self) -> Path:
+        """Finish the file; only empty chunks give an empty file with their columns."""
+        if self._columns is None and self._empty is not None:
+            self._open(self._empty)
+            if self.format != "csv":
+                self._writer.write_table(pa.Table.from_pandas(self._empty, preserve_index=False))
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        return self.path
+
+    def __enter__(self) -> "FrameWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_frame(path, columns=None) -> pd.DataFrame:
+    """
+    Load a dataframe written by write_frame().
+
+    Parameters
+    ----------
+    path : str or Path
+        Input file (.feather, .arrow, .parquet or .csv).
+    columns : list of str, optional
+        Only read these columns.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+
+    path = Path(path)
+    fmt = artifact_format(path)
+
+    if fmt == "feather":
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        return table.to_pandas()
+    if fmt == "parquet":
+        table = pq.read_table(path, columns=columns, memory_map=True)
+        return table.to_pandas()
+    return pd.read_csv(path, usecols=columns)
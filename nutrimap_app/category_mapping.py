@@ -1,6 +1,33 @@
 
 import numpy as np
-import pandas as pd
+
+# Every label assign_food_group() can return, in rule-cascade order
+FOOD_GROUPS = [
+    "oils_fats",
+    "nuts_seeds",
+    "dairy_lean",
+    "dairy_fatty",
+    "legumes_pulses",
+    "eggs",
+    "fish_seafood",
+    "poultry",
+    "meat_red",
+    "sweets_snacks",
+    "fruit_sweet",
+    "nonstarchy_veg",
+    "starchy_veg",
+    "grain_starch",
+    "mixed/other",
+]
+
+NUTRIENT_COLUMNS = [
+    "energy_kcal_calculated",
+    "protein_g",
+    "carbs_g",
+    "fiber_g",
+    "fat_g",
+    "satfat_g",
+]
 
 def assign_food_group(row):
     """
@@ -167,4 +194,129 @@ def assign_food_group(row):
     # ------------------------
     # 11) Fallback
     # ------------------------
-    return "mixed/other"
\ No newline at end of file
+    return "mixed/other"
+
+
+def _n_rows(columns):
+    """Number of rows of a DataFrame or of a mapping of nutrient columns."""
+    if hasattr(columns, "index"):
+        return len(columns.index)
+    present = [col for col in NUTRIENT_COLUMNS if col in columns]
+    return len(columns[present[0]]) if present else 0
+
+
+def _column(df, name):
+    """Return a nutrient column as float64, 0.0 when the column is missing
+    (same default as row.get in assign_food_group)."""
+    if name not in df:
+        return np.zeros(_n_rows(df), dtype="float64")
+    values = df[name]
+    if hasattr(values, "to_numpy"):
+        import pandas as pd
+        return pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    return np.asarray(values, dtype="float64")
+
+
+def food_group_codes(columns):
+    """
+    Vectorized version of assign_food_group, as codes into FOOD_GROUPS.
+
+    The rule cascade of assign_food_group is evaluated as NumPy boolean
+    masks and resolved with first-match priority (np.select), so the result
+    is identical to df.apply(assign_food_group, axis=1), NaNs included.
+    Needs NumPy only, so the API can use it without importing pandas.
+
+    Parameters
+    ----------
+    columns : pandas.DataFrame or mapping of str -> array-like
+        Foods with the columns listed in NUTRIENT_COLUMNS (per 100 g).
+        Missing columns are treated as 0.
+
+    Returns
+    -------
+    numpy.ndarray of int8
+        Index of every food's group in FOOD_GROUPS.
+    """
+
+    kcal    = _column(columns, "energy_kcal_calculated")
+    protein = _column(columns, "protein_g")
+    carbs   = _column(columns, "carbs_g")
+    fiber   = _column(columns, "fiber_g")
+    fat     = _column(columns, "fat_g")
+    satfat  = _column(columns, "satfat_g")
+
+    # Safe denominators (np.maximum keeps NaN like max() does)
+    kcal_safe = np.maximum(kcal, 1e-6)
+    Fshare = 9 * fat / kcal_safe
+
+    dairy_candidate = (protein >= 3) & (carbs >= 3) & (satfat >= 1.5)
+
+    canned_legume = (
+        (protein >= 5) & (protein <= 12) &
+        (carbs >= 10) & (carbs <= 25) &
+        (fiber >= 3) &
+        (fat < 10) &
+        (kcal >= 60) & (kcal <= 180)
+    )
+    dried_legume = (
+        (protein >= 15) &
+        (carbs >= 30) &
+        (fiber >= 10) &
+        (fat < 15) &
+        (kcal >= 250)
+    )
+
+    protein_food_candidate = (protein >= 15) & (carbs < 5)
+
+    # (condition, label) in the same order as the if-chain above
+    rules = [
+        ((fat >= 80) | (Fshare >= 0.85), "oils_fats"),
+        ((fat >= 40) & (fat < 80) & (protein >= 10) & (fiber >= 5), "nuts_seeds"),
+        (dairy_candidate & (fat < 5) & (satfat < 3) & (kcal <= 120), "dairy_lean"),
+        (dairy_candidate & ((fat >= 15) | (satfat >= 5) | (kcal >= 200)), "dairy_fatty"),
+        (dairy_candidate & (fat <= 8) & (kcal <= 150), "dairy_lean"),
+        (dairy_candidate, "dairy_fatty"),
+        (canned_legume | dried_legume, "legumes_pulses"),
+        (protein_food_candidate &
+         (fat >= 8) & (fat <= 12) & (satfat >= 2) & (satfat <= 4) &
+         (kcal >= 130) & (kcal <= 180), "eggs"),
+        (protein_food_candidate & (fat <= 15) & (satfat <= 3) & (kcal <= 180), "fish_seafood"),
+        (protein_food_candidate & (fat <= 10) & (satfat <= 4), "poultry"),
+        (protein_food_candidate & ((fat > 10) | (satfat > 4)), "meat_red"),
+        ((carbs >= 20) & (kcal >= 250), "sweets_snacks"),
+        ((carbs >= 8) & (fat < 5) & (fiber >= 1.5) & (kcal < 120), "fruit_sweet"),
+        ((kcal < 80) & (carbs < 15) & (fiber >= 2), "nonstarchy_veg"),
+        ((carbs >= 15) & (carbs <= 30) & (kcal >= 60) & (kcal <= 130) & (fiber >= 2), "starchy_veg"),
+        ((carbs >= 45) & (fat < 10) & (kcal >= 200), "grain_starch"),
+    ]
+
+    return np.select(
+        [cond for cond, _ in rules],
+        [FOOD_GROUPS.index(label) for _, label in rules],
+        default=FOOD_GROUPS.index("mixed/other"),
+    ).astype("int8")
+
+
+def assign_food_groups(df):
+    """
+    Vectorized version of assign_food_group for a whole dataframe
+    (food_group_codes as a categorical Series).
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Foods with the columns listed in NUTRIENT_COLUMNS (per 100 g).
+        Missing columns are treated as 0.
+
+    Returns
+    -------
+    pandas.Series
+        Categorical series (categories FOOD_GROUPS) aligned on df.index.
+    """
+    import pandas as pd
+
+    return pd.Series(
+        pd.Categorical.from_codes(food_group_codes(df), categories=FOOD_GROUPS),
+        index=df.index,
+        name="food_group",
+    )
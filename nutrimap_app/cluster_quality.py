@@ -0,0 +1,489 @@
+"""Cluster quality of a trained model, cheap enough to check every retrain.
+
+silhouette_score on all rows is O(n²) in time and memory, which rules it
+out at 500k foods. This module reports instead:
+- a sampled silhouette with a confidence interval: n_repeats independent
+  uniform samples of sample_size rows, each scored with silhouette_samples
+  (pairwise distances computed in chunks of at most WORKING_MEMORY_MB),
+  the estimate being the mean of the repeats and the interval a Student t
+  interval over them,
+- per-cluster statistics from one pass over the rows, in chunks of
+  CHUNK_ROWS: size, nutrient means, and the distribution of the distance to
+  the centroid (mean, std, min, max, and p50/p90/p99 from a fixed-bin
+  histogram),
+- inertia per row and the Calinski-Harabasz score, from the same pass.
+
+Memory is bounded by one chunk of rows plus the silhouette sample, and time
+is linear in the number of rows. QualityReport builds the same report from
+rows fed chunk by chunk, for data that is never in memory as a whole.
+
+The report is written as JSON next to the clustered data
+(CLUSTER_QUALITY_PATH) by KMeanModel when it saves the clustered data, or
+on demand:
+    python -m nutrimap_app.cluster_quality
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from nutrimap_app.json_utils import json_safe
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = PROJECT_ROOT / "data/processed"
+
+CLUSTER_QUALITY_PATH = DATA_DIR / "cluster_quality.json"
+
+SILHOUETTE_SAMPLE_SIZE = 5_000
+SILHOUETTE_REPEATS = 5
+CONFIDENCE = 0.95
+
+# Rows per chunk of the statistics pass
+CHUNK_ROWS = 100_000
+
+# Upper bound (MB) of one block of pairwise distances in the silhouette
+WORKING_MEMORY_MB = 64
+
+# Bins of the distance-to-centroid histogram of every cluster
+DISTANCE_BINS = 512
+
+DISTANCE_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _silhouette_summary(samples, sample_size: int, confidence: float) -> dict:
+    """Mean silhouette of every (X, labels) sample, and a t interval over them."""
+    from scipy import stats
+    from sklearn import config_context
+    from sklearn.metrics import silhouette_samples
+
+    scores = []
+    for X_sample, labels_sample in samples:
+        if len(np.unique(labels_sample)) < 2:
+            scores.append(np.nan)
+            continue
+        with config_context(working_memory=WORKING_MEMORY_MB):
+            scores.append(float(silhouette_samples(X_sample, labels_sample).mean()))
+
+    scores = np.asarray(scores)
+    n_repeats = len(scores)
+    estimate = float(np.mean(scores))
+    if n_repeats > 1:
+        half_width = float(stats.t.ppf((1 + confidence) / 2, n_repeats - 1)
+                           * np.std(scores, ddof=1) / np.sqrt(n_repeats))
+    else:
+        half_width = 0.0
+
+    return {
+        "estimate": estimate,
+        "ci_low": estimate - half_width,
+        "ci_high": estimate + half_width,
+        "confidence": confidence,
+        "sample_size": sample_size,
+        "n_repeats": n_repeats,
+        "repeats": [float(s) for s in scores],
+    }
+
+
+def sampled_silhouette(
+    X: np.ndarray,
+    labels: np.ndarray,
+    sample_size: int = SILHOUETTE_SAMPLE_SIZE,
+    n_repeats: int = SILHOUETTE_REPEATS,
+    confidence: float = CONFIDENCE,
+    random_state: int = 0,
+) -> dict:
+    """
+    Silhouette score estimated on random samples, with a confidence interval.
+
+    Parameters
+    ----------
+    X : numpy.ndarray
+        Scaled feature matrix.
+    labels : numpy.ndarray
+        Cluster of every row.
+    sample_size : int
+        Rows per sample (all rows when there are fewer).
+    n_repeats : int
+        Independent samples; the interval is computed over their scores.
+    confidence : float
+        Coverage of the interval.
+
+    Returns
+    -------
+    dict
+        estimate, ci_low, ci_high, confidence, sample_size, n_repeats and
+        the score of every repeat. NaN when there are fewer than 2
+        clusters.
+    """
+    rng = np.random.default_rng(random_state)
+    sample_size = min(sample_size, len(X))
+    # the whole data set is one exact score, repeating it adds nothing
+    n_repeats = 1 if sample_size == len(X) else n_repeats
+
+    def samples():
+        for _ in range(n_repeats):
+            idx = rng.choice(len(X), size=sample_size, replace=False)
+            yield X[idx], labels[idx]
+
+    return _silhouette_summary(samples(), sample_size, confidence)
+
+
+class SilhouetteSampler:
+    """
+    The samples of sampled_silhouette, drawn from rows seen chunk by chunk.
+
+    Every row gets one random key per repeat, and each repeat keeps the
+    sample_size rows with the smallest keys: a uniform sample without
+    replacement of all the rows seen, whatever their number (bottom-k
+    sampling). Memory is n_repeats samples, whatever the number of rows.
+    """
+
+    def __init__(self, sample_size: int = SILHOUETTE_SAMPLE_SIZE,
+                 n_repeats: int = SILHOUETTE_REPEATS, random_state: int = 0):
+        self.sample_size = sample_size
+        self.n_repeats = n_repeats
+        self.n_rows = 0
+        self._rng = np.random.default_rng(random_state)
+        self._keys = [np.empty(0)] * n_repeats
+        self._X = [None] * n_repeats
+        self._labels = [np.empty(0, dtype="int64")] * n_repeats
+
+    def update(self, X: np.ndarray, labels: np.ndarray) -> None:
+        X = np.asarray(X, dtype="float64")
+        labels = np.asarray(labels, dtype="int64")
+        self.n_rows += len(X)
+        for r in range(self.n_repeats):
+            keys = np.concatenate([self._keys[r], self._rng.random(len(X))])
+            X_all = X if self._X[r] is None else np.concatenate([self._X[r], X])
+            labels_all = np.concatenate([self._labels[r], labels])
+            if len(keys) > self.sample_size:
+                keep = np.argpartition(keys, self.sample_size - 1)[:self.sample_size]
+                keys, X_all, labels_all = keys[keep], X_all[keep], labels_all[keep]
+            self._keys[r], self._X[r], self._labels[r] = keys, X_all, labels_all
+
+    def result(self, confidence: float = CONFIDENCE) -> dict:
+        """sampled_silhouette() of the rows seen so far."""
+        sample_size = min(self.sample_size, self.n_rows)
+        # every repeat holds all the rows: one exact score
+        n_repeats = 1 if sample_size == self.n_rows else self.n_repeats
+        if not self.n_rows:
+            return _silhouette_summary([], 0, confidence)
+        return _silhouette_summary(zip(self._X[:n_repeats], self._labels[:n_repeats]),
+                                   sample_size, confidence)
+
+
+def _histogram_quantile(counts: np.ndarray, edges: np.ndarray, q: float) -> float:
+    """Quantile q of a histogram, interpolated linearly inside its bin."""
+    total = counts.sum()
+    if total == 0:
+        return float("nan")
+    cumulative = np.cumsum(counts)
+    i = int(np.searchsorted(cumulative, q * total))
+    before = cumulative[i - 1] if i else 0
+    inside = (q * total - before) / counts[i] if counts[i] else 0.0
+    return float(edges[i] + inside * (edges[i + 1] - edges[i]))
+
+
+class ClusterStatistics:
+    """
+    The sums behind cluster_statistics, accumulated chunk by chunk.
+
+    Parameters
+    ----------
+    centroids : numpy.ndarray
+        Model centroids, in the scaled space.
+    nutrient_cols : sequence of str
+        Names of the nutrient columns passed to update().
+    """
+
+    def __init__(self, centroids: np.ndarray, nutrient_cols: Sequence[str] = ()):
+        self.centroids = np.asarray(centroids, dtype="float64")
+        self.nutrient_cols = list(nutrient_cols)
+        k, n_features = self.centroids.shape
+
+        # scaled features lie in [0, 1], so no distance is above sqrt(n_features);
+        # rows outside the training range go to the last bin
+        self.max_distance = np.sqrt(n_features)
+        self.edges = np.linspace(0.0, self.max_distance, DISTANCE_BINS + 1)
+
+        self.n_rows = 0
+        self.sizes = np.zeros(k, dtype="int64")
+        self.feature_sums = np.zeros((k, n_features))
+        self.sq_norm_sums = np.zeros(k)
+        self.dist_sums = np.zeros(k)
+        self.dist_sq_sums = np.zeros(k)
+        self.dist_min = np.full(k, np.inf)
+        self.dist_max = np.zeros(k)
+        self.histograms = np.zeros((k, DISTANCE_BINS), dtype="int64")
+        self.nutrient_sums = np.zeros((k, len(self.nutrient_cols)))
+
+    def update(self, X: np.ndarray, labels: np.ndarray,
+               nutrients: Optional[np.ndarray] = None) -> None:
+        """Add a chunk of rows: scaled features, clusters and optional nutrients."""
+        X = np.asarray(X, dtype="float64")
+        labels = np.asarray(labels, dtype="int64")
+        k, n_features = self.centroids.shape
+        self.n_rows += len(X)
+
+        self.sizes += np.bincount(labels, minlength=k)
+        for j in range(n_features):
+            self.feature_sums[:, j] += np.bincount(labels, weights=X[:, j], minlength=k)
+        self.sq_norm_sums += np.bincount(labels, weights=(X ** 2).sum(axis=1), minlength=k)
+
+        distances = np.sqrt(((X - self.centroids[labels]) ** 2).sum(axis=1))
+        self.dist_sums += np.bincount(labels, weights=distances, minlength=k)
+        self.dist_sq_sums += np.bincount(labels, weights=distances ** 2, minlength=k)
+        np.minimum.at(self.dist_min, labels, distances)
+        np.maximum.at(self.dist_max, labels, distances)
+
+        bins = np.minimum((distances / self.max_distance * DISTANCE_BINS).astype("int64"),
+                          DISTANCE_BINS - 1)
+        self.histograms += np.bincount(labels * DISTANCE_BINS + bins,
+                                       minlength=k * DISTANCE_BINS).reshape(k, DISTANCE_BINS)
+
+        if nutrients is not None:
+            nutrients = np.asarray(nutrients, dtype="float64")
+            for j in range(len(self.nutrient_cols)):
+                self.nutrient_sums[:, j] += np.bincount(labels, weights=nutrients[:, j],
+                                                        minlength=k)
+
+    def result(self) -> dict:
+        """cluster_statistics() of the rows seen so far."""
+        n_rows, sizes = self.n_rows, self.sizes
+
+        # Within / between dispersion around the cluster means (as sklearn does)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self.feature_sums / sizes[:, None]
+            within = float((self.sq_norm_sums - sizes * (means ** 2).sum(axis=1))[sizes > 0].sum())
+            overall_mean = self.feature_sums.sum(axis=0) / max(n_rows, 1)
+            between = float((sizes * ((means - overall_mean) ** 2).sum(axis=1))[sizes > 0].sum())
+            n_used = int((sizes > 0).sum())
+            calinski_harabasz = (between / (n_used - 1)) / (within / (n_rows - n_used)) \
+                if n_used > 1 and n_rows > n_used and within > 0 else float("nan")
+
+            dist_mean = self.dist_sums / sizes
+            dist_std = np.sqrt(np.maximum(self.dist_sq_sums / sizes - dist_mean ** 2, 0))
+            nutrient_means = self.nutrient_sums / sizes[:, None]
+
+        clusters = []
+        for j in range(len(sizes)):
+            cluster = {
+                "cluster": j,
+                "size": int(sizes[j]),
+                "share": float(sizes[j] / n_rows) if n_rows else float("nan"),
+            }
+            if sizes[j]:
+                cluster.update({
+                    "distance_mean": float(dist_mean[j]),
+                    "distance_std": float(dist_std[j]),
+                    "distance_min": float(self.dist_min[j]),
+                    **{f"distance_p{round(q * 100)}":
+                       _histogram_quantile(self.histograms[j], self.edges, q)
+                       for q in DISTANCE_QUANTILES},
+                    "distance_max": float(self.dist_max[j]),
+                    "nutrient_means": {col: float(value)
+                                       for col, value in zip(self.nutrient_cols, nutrient_means[j])},
+                })
+            clusters.append(cluster)
+
+        return {
+            "n_rows": int(n_rows),
+            "inertia_per_row": float(self.dist_sq_sums.sum() / n_rows) if n_rows else float("nan"),
+            "calinski_harabasz": float(calinski_harabasz),
+            "clusters": clusters,
+        }
+
+
+def cluster_statistics(
+    X: np.ndarray,
+    labels: np.ndarray,
+    centroids: np.ndarray,
+    nutrients: Optional[np.ndarray] = None,
+    nutrient_cols: Sequence[str] = (),
+    chunk_rows: int = CHUNK_ROWS,
+) -> dict:
+    """
+    Per-cluster statistics, inertia and Calinski-Harabasz in one pass.
+
+    Parameters
+    ----------
+    X : numpy.ndarray
+        Scaled feature matrix (values in [0, 1] for the training rows).
+    labels : numpy.ndarray
+        Cluster of every row, 0 .. len(centroids) - 1.
+    centroids : numpy.ndarray
+        Model centroids, in the scaled space.
+    nutrients : numpy.ndarray, optional
+        Unscaled nutrient values of every row, averaged per cluster.
+    nutrient_cols : sequence of str
+        Names of the nutrients columns.
+
+    Returns
+    -------
+    dict
+        n_rows, inertia_per_row, calinski_harabasz and a "clusters" list.
+    """
+    statistics = ClusterStatistics(centroids, nutrient_cols)
+    for start in range(0, len(X), chunk_rows):
+        statistics.update(X[start:start + chunk_rows], labels[start:start + chunk_rows],
+                          None if nutrients is None else nutrients[start:start + chunk_rows])
+    return statistics.result()
+
+
+def _report(statistics: dict, silhouette: dict, n_clusters: int, feature_cols,
+            elapsed_s: dict) -> dict:
+    return {
+        "n_rows": statistics["n_rows"],
+        "n_clusters": n_clusters,
+        "features": [str(col) for col in feature_cols],
+        "silhouette": silhouette,
+        "inertia_per_row": statistics["inertia_per_row"],
+        "calinski_harabasz": statistics["calinski_harabasz"],
+        "clusters": statistics["clusters"],
+        "elapsed_s": {name: round(t, 3) for name, t in elapsed_s.items()},
+    }
+
+
+def cluster_quality_report(
+    X: np.ndarray,
+    labels: np.ndarray,
+    centroids: np.ndarray,
+    feature_cols: Sequence[str],
+    nutrients: Optional[np.ndarray] = None,
+    nutrient_cols: Sequence[str] = (),
+    sample_size: int = SILHOUETTE_SAMPLE_SIZE,
+    n_repeats: int = SILHOUETTE_REPEATS,
+    random_state: int = 0,
+) -> dict:
+    """
+    Sampled silhouette and per-cluster statistics of a clustering.
+
+    See sampled_silhouette and cluster_statistics for the parameters.
+    """
+    X = np.asarray(X, dtype="float64")
+    labels = np.asarray(labels, dtype="int64")
+
+    start = time.perf_counter()
+    statistics = cluster_statistics(X, labels, np.asarray(centroids, dtype="float64"),
+                                    nutrients, nutrient_cols)
+    t_statistics = time.perf_counter() - start
+
+    start = time.perf_counter()
+    silhouette = sampled_silhouette(X, labels, sample_size, n_repeats, random_state=random_state)
+    t_silhouette = time.perf_counter() - start
+
+    return _report(statistics, silhouette, len(centroids), feature_cols,
+                   {"statistics": t_statistics, "silhouette": t_silhouette})
+
+
+class QualityReport:
+    """
+    cluster_quality_report() of rows that are never in memory together.
+
+    Feed the clustered rows chunk by chunk to update(), then call
+    result(). Memory is the statistics sums plus the silhouette samples.
+
+    Parameters
+    ----------
+    centroids : numpy.ndarray
+        Model centroids, in the scaled space.
+    feature_cols : sequence of str
+        Names of the features.
+    nutrient_cols : sequence of str
+        Names of the nutrient columns passed to update().
+    """
+
+    def __init__(self, centroids: np.ndarray, feature_cols: Sequence[str],
+                 nutrient_cols: Sequence[str] = (),
+                 sample_size: int = SILHOUETTE_SAMPLE_SIZE,
+                 n_repeats: int = SILHOUETTE_REPEATS, random_state: int = 0):
+        self.feature_cols = list(feature_cols)
+        self.statistics = ClusterStatistics(centroids, nutrient_cols)
+        self.silhouette = SilhouetteSampler(sample_size, n_repeats, random_state)
+        self._elapsed = {"statistics": 0.0, "silhouette": 0.0}
+
+    def update(self, X: np.ndarray, labels: np.ndarray,
+               nutrients: Optional[np.ndarray] = None) -> None:
+        """Add a chunk of rows: scaled features, clusters and optional nutrients."""
+        start = time.perf_counter()
+        self.statistics.update(X, labels, nutrients)
+        self._elapsed["statistics"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.silhouette.update(X, labels)
+        self._elapsed["silhouette"] += time.perf_counter() - start
+
+    def result(self) -> dict:
+        start = time.perf_counter()
+        silhouette = self.silhouette.result()
+        elapsed = dict(self._elapsed, silhouette=self._elapsed["silhouette"]
+                       + time.perf_counter() - start)
+        return _report(self.statistics.result(), silhouette, len(self.statistics.centroids),
+                       self.feature_cols, elapsed)
+
+
+def report_for_frame(df_with_clusters, bundle, **kwargs) -> dict:
+    """
+    Report of clustered foods (food_with_clusters) against their model.
+
+    Parameters
+    ----------
+    df_with_clusters : pandas.DataFrame
+        Unscaled nutrients (bundle.feature_cols) and a `cluster` column.
+    bundle : InferenceBundle
+        Scaler and centroids of the model.
+    """
+    nutrients = df_with_clusters[bundle.feature_cols].to_numpy(dtype="float64")
+    return cluster_quality_report(
+        bundle.transform(nutrients),
+        df_with_clusters["cluster"].to_numpy(),
+        bundle.centroids,
+        bundle.feature_cols,
+        nutrients=nutrients,
+        nutrient_cols=bundle.feature_cols,
+        **kwargs,
+    )
+
+
+def save_report(report: dict, path=CLUSTER_QUALITY_PATH) -> Path:
+    """Write the report as JSON; undefined metrics (NaN) are written as null."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(json_safe(report), indent=2, allow_nan=False))
+    return path
+
+
+def format_report(report: dict) -> List[str]:
+    """Human-readable summary lines."""
+    s = report["silhouette"]
+    lines = [
+        f"{report['n_rows']:,} rows, {report['n_clusters']} clusters",
+        f"silhouette {s['estimate']:.3f} "
+        f"({s['confidence']:.0%} CI {s['ci_low']:.3f} .. {s['ci_high']:.3f}, "
+        f"{s['n_repeats']} x {s['sample_size']:,} rows)",
+        f"inertia per row {report['inertia_per_row']:.4f}, "
+        f"Calinski-Harabasz {report['calinski_harabasz']:.1f}",
+    ]
+    for c in report["clusters"]:
+        if c["size"]:
+            lines.append(f"  cluster {c['cluster']}: {c['size']:>9,} rows ({c['share']:.1%}), "
+                         f"distance mean {c['distance_mean']:.3f} "
+                         f"p90 {c['distance_p90']:.3f} max {c['distance_max']:.3f}")
+        else:
+            lines.append(f"  cluster {c['cluster']}: empty")
+    return lines
+
+
+if __name__ == "__main__":
+    from nutrimap_app.artifacts import read_frame
+    from nutrimap_app.inference import InferenceBundle
+    from nutrimap_app.KMeanModel import BUNDLE_PATH, CLUSTERED_DATA_PATH
+
+    report = report_for_frame(read_frame(CLUSTERED_DATA_PATH), InferenceBundle.load(BUNDLE_PATH))
+    print("\n".join(format_report(report)))
+    print("Report saved to:", save_report(report))
@@ -1,52 +1,71 @@
-import os
-from pathlib import Path
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
+
+from nutrimap_app.artifacts import write_frame
+from nutrimap_app.data_prep_marie import scale_food_data as _scale_food_data
+from nutrimap_app.sources import FOOD_CSV, PROJECT_ROOT, read_source
 
 # -------------------------------------------------------
 # CONSTANT: Columns to keep in the cleaned dataset
+# (declared by the source schema, see sources.FOOD_CSV)
 # -------------------------------------------------------
-COLUMNS_TO_KEEP = [
-    "food",
-    "Caloric Value",
-    "Fat",
-    "Saturated Fats",
-    "Carbohydrates",
-    "Sugars",
-    "Protein",
-    "Dietary Fiber"
-]
-RENAME_COLUMNS = {
-    "Caloric Value": "energy_kcal",
-    "Fat": "fat_g",
-    "Saturated Fats": "satfat_g",
-    "Carbohydrates": "carbs_g",
-    "Sugars": "sugars_g",
-    "Protein": "protein_g",
-    "Dietary Fiber": "fiber_g"
-}
+COLUMNS_TO_KEEP = FOOD_CSV.raw_columns
+
+# The food name keeps its raw "food" column name in foods_cleaned (the
+# consumers of this dataset read it), the nutrients get canonical names
+FOOD_COLUMN = "food"
 
 # -------------------------------------------------------
 # Default paths
 # -------------------------------------------------------
-RAW_FOLDER = "../raw_data"
-CLEANED_PATH = "../data/processed/foods_cleaned.csv"
-SCALED_PATH = "../data/processed/foods_scaled.csv"
+RAW_FOLDER = FOOD_CSV.path
+CLEANED_PATH = PROJECT_ROOT / "data/processed/foods_cleaned.feather"
+SCALED_PATH = PROJECT_ROOT / "data/processed/foods_scaled.feather"
+
+# -------------------------------------------------------
+# Loading the raw CSV files
+# -------------------------------------------------------
+
+def load_raw_csvs(raw_folder: str = RAW_FOLDER, max_workers=None) -> pd.DataFrame:
+    """
+    Read every CSV file of raw_folder concurrently and combine them.
+
+    Each file is read on a thread pool with only COLUMNS_TO_KEEP and
+    explicit dtypes (pyarrow engine), then all files are concatenated
+    once (see sources.read_source).
+
+    Parameters
+    ----------
+    raw_folder : str or Path
+        Directory containing the raw CSV files.
+    max_workers : int, optional
+        Number of files read at the same time; defaults to the
+        ThreadPoolExecutor default (CPU count + 4, at most 32).
+
+    Returns
+    -------
+    pandas.DataFrame
+        COLUMNS_TO_KEEP of all files under their canonical names
+        (food_item, energy_kcal, ...; see sources.FOOD_CSV), in file name
+        order, plus a categorical `source_file` column with the file name
+        of every row.
+    """
+    return read_source(FOOD_CSV, raw_folder, max_workers=max_workers)
 
 # -------------------------------------------------------
 # Function for data cleaning
 # -------------------------------------------------------
 
 def clean_food_data(raw_folder: str = RAW_FOLDER,
-                    output_path: str = CLEANED_PATH):
+                    output_path: str = CLEANED_PATH,
+                    max_workers=None):
     """
     End-to-end function cleaning nutrition data.
 
     Steps performed:
-    Load all CSV files from the raw_folder.
-    Merge them into one combined DataFrame.
-    Select only the relevant nutrient columns.
-    ename the selected columns for consistency.
+    Load all CSV files from the raw_folder, in parallel (see load_raw_csvs),
+    keeping only the relevant nutrient columns.
+    Rename the nutrient columns (energy_kcal, fat_g, ...); the name column
+    stays `food`.
     Remove duplicate rows.
     Save the cleaned dataset to output_path.
 
@@ -55,7 +74,11 @@ def clean_food_data(raw_folder: str = RAW_FOLDER,
     raw_folder : str or Path
         Directory containing the raw CSV files.
     output_path : str or Path
-        File path where the processed dataset will be saved.
+        File path where the processed dataset will be saved. The format
+        follows the suffix (.feather, .parquet, or .csv as a text export),
+        see artifacts.write_frame().
+    max_workers : int, optional
+        Number of CSV files read at the same time.
 
     Returns
     -------
@@ -63,31 +86,11 @@ def clean_food_data(raw_folder: str = RAW_FOLDER,
        cleaned dataframe
     """
 
-    raw_folder = Path(raw_folder)
-
     # ---------------------------------------------------
     # Load all CSV files and merge into df
     # ---------------------------------------------------
-    files = [f for f in os.listdir(raw_folder) if f.endswith(".csv")]
-    if not files:
-        raise ValueError(f"No CSV files found in folder: {raw_folder}")
-
-    df_list = []
-    for f in files:
-        file_path = raw_folder / f
-        df_temp = pd.read_csv(file_path)
-        df_temp["source_file"] = f
-        df_list.append(df_temp)
-
-    df = pd.concat(df_list, ignore_index=True)
-
-    # ---------------------------------------------------
-    # select columns and rename
-    # ---------------------------------------------------
-
-    df_clean = df[COLUMNS_TO_KEEP].copy()
-
-    df_clean = df_clean.rename(columns=RENAME_COLUMNS)
+    df = load_raw_csvs(raw_folder, max_workers=max_workers)
+    df_clean = df.drop(columns="source_file").rename(columns={"food_item": FOOD_COLUMN})
 
     # ---------------------------------------------------
     # Drop duplicates and NaN Checke
@@ -99,9 +102,7 @@ def clean_food_data(raw_folder: str = RAW_FOLDER,
     # Save output
     # ---------------------------------------------------
 
-    output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df_clean.to_csv(output_path, index=False)
+    write_frame(df_clean, output_path)
 
     return df_clean
 
@@ -111,43 +112,13 @@ def clean_food_data(raw_folder: str = RAW_FOLDER,
 
 def scale_food_data(input_clean_path: str = CLEANED_PATH,
                     output_scaled_path: str = SCALED_PATH):
-
     """
-    Scale numeric nutrient features in the cleaned dataset using MinMaxScaler (0–1).
-
-    Steps performed:
-    Load the cleaned dataset from input_clean_path.
-    Identify all numeric features except the “food” column.
-    Apply MinMax scaling to normalize numeric values to the range 0–1.
-    Save the scaled dataset to output_scaled_path.
-
-    Parameters
-    ----------
-    input_clean_path : str or Path
-        File path to the cleaned dataset created by clean_food_data().
-        This is the dataset that will be scaled.
-
-    output_scaled_path : str or Path
-        File path where the scaled dataset will be saved.
+    Scale the numeric nutrient columns of the cleaned dataset to 0–1, the
+    same way as data_prep_marie.scale_food_data.
 
     Returns
     -------
     pandas.DataFrame
         A scaled version of the cleaned dataset.
     """
-
-    df_clean = pd.read_csv(input_clean_path)
-
-    scaler = MinMaxScaler()
-
-    numeric_cols = df_clean.select_dtypes(include=["float64", "int64"]).columns
-    feature_cols = [col for col in numeric_cols if col != "food"]
-
-    df_scaled = df_clean.copy()
-    df_scaled[feature_cols] = scaler.fit_transform(df_clean[feature_cols])
-
-    output_scaled_path = Path(output_scaled_path)
-    output_scaled_path.parent.mkdir(parents=True, exist_ok=True)
-    df_scaled.to_csv(output_scaled_path, index=False)
-
-    return df_scaled
+    return _scale_food_data(input_clean_path, output_scaled_path)
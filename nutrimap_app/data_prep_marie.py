@@ -1,160 +1,383 @@
-import os
 from pathlib import Path
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
+
+from nutrimap_app.artifacts import read_frame, write_frame
+from nutrimap_app.profiling import stage, timed_iter
+from nutrimap_app.sources import PROJECT_ROOT, USDA_PARQUET, iter_source, read_source, to_canonical
 import numpy as np
 
 # -------------------------------------------------------
 # CONSTANT: Columns to keep in the cleaned dataset
+# (declared by the source schema, see sources.USDA_PARQUET)
 # -------------------------------------------------------
-COLUMNS_TO_KEEP = [
+COLUMNS_TO_KEEP = USDA_PARQUET.raw_columns
+RENAME_COLUMNS = USDA_PARQUET.renames
+
+"""the cols_required are mandatory for modelling, in case they are NaN they are dropped
+CAVE: there will reamain NaNs in fibre and saturated fats!"""
+COLS_REQUIRED = [
     "food_item",
-    "Energy",
-    "data_type",
-    "Total lipid (fat)",
-    "Fatty acids, total saturated",
-    "Carbohydrate, by difference",
-    "Protein",
-    "Fiber, total dietary"
+    "energy_kcal_calculated",
+    "fat_g",
+    "carbs_g",
+    "protein_g",
+    "fiber_g",
+    "satfat_g"
+]
+
+# Nutrient columns after renaming, stored as float32 in compact mode
+NUTRIENT_COLS = [
+    "fat_g",
+    "satfat_g",
+    "carbs_g",
+    "protein_g",
+    "fiber_g",
 ]
-RENAME_COLUMNS = {
-    "Energy": "energy_kcal",
-    "Total lipid (fat)": "fat_g",
-    "Fatty acids, total saturated": "satfat_g",
-    "Carbohydrate, by difference": "carbs_g",
-    "Protein": "protein_g",
-    "Fiber, total dietary": "fiber_g"
-}
+
+# Multiplier of the row hash in _row_hashes (64-bit golden ratio)
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
 
 # -------------------------------------------------------
 # Default paths
 # -------------------------------------------------------
-RAW_FOLDER = "raw_data"
-CLEANED_PATH = "data/processed/foods_cleaned_marie.csv"
-SCALED_PATH = "data/processed/foods_scaled_marie.csv"
+RAW_FOLDER = USDA_PARQUET.path.parent
+PARQUET_PATH = USDA_PARQUET.path
+CLEANED_PATH = PROJECT_ROOT / "data/processed/foods_cleaned_marie.feather"
+SCALED_PATH = PROJECT_ROOT / "data/processed/foods_scaled_marie.feather"
 
 # -------------------------------------------------------
-# Function for data cleaning
+# Cleaning steps applied to each chunk of the raw data
 # -------------------------------------------------------
 
-def clean_food_data(raw_folder: str = RAW_FOLDER,
-                    output_path: str = CLEANED_PATH):
+def _compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """float32 nutrients and Arrow-backed food names."""
+    df = df.astype({col: "float32" for col in NUTRIENT_COLS + ["energy_kcal_calculated"]})
+    if df["food_item"].dtype == object:
+        # pandas < 3 reads strings as Python objects
+        df["food_item"] = df["food_item"].astype("string[pyarrow]")
+    return df
+
+
+def _energy_and_impute_inplace(df: pd.DataFrame) -> None:
     """
-    End-to-end function cleaning nutrition data.
+    Compact-mode version of the energy_kcal_calculated and zero-imputation
+    steps: one buffer for the energy and boolean masks for the imputation,
+    instead of full-size results from every operator and np.where.
+
+    Runs before the float32 downcast, so the rounded energy is the same as
+    in the default mode.
+    """
+    energy = df["fat_g"].to_numpy(dtype="float64") * 9
+    # scaling by 4 is exact, so these sums round exactly like
+    # fat * 9 + carbs * 4 + protein * 4, without a temporary per term
+    energy /= 4
+    energy += df["carbs_g"].to_numpy(dtype="float64")
+    energy += df["protein_g"].to_numpy(dtype="float64")
+    energy *= 4
+    df["energy_kcal_calculated"] = np.round(energy, 1, out=energy)
+
+    df.loc[(df["fat_g"] < 3) & df["satfat_g"].isna(), "satfat_g"] = 0
+    df.loc[(df["carbs_g"] < 5) & df["fiber_g"].isna(), "fiber_g"] = 0
 
-    Steps performed:
-    Load all CSV files from the raw_folder.
-    Merge them into one combined DataFrame.
-    Select only the relevant nutrient columns.
-    ename the selected columns for consistency.
-    Remove duplicate rows.
-    Save the cleaned dataset to output_path.
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    One uint64 per row of COLS_REQUIRED (name and nutrients).
+
+    Every row is packed as its six float32 nutrients plus the int64 code of
+    its name (pd.factorize), i.e. four 64-bit words, which are mixed into a
+    single uint64. Equal rows (at float32 precision) get equal hashes.
+    """
+    nutrient_cols = [col for col in COLS_REQUIRED if col != "food_item"]
+    codes, _ = pd.factorize(df["food_item"])
+
+    packed = np.empty((len(df), 8), dtype="float32")
+    packed[:, :6] = df[nutrient_cols].to_numpy(dtype="float32")
+    # -0.0 + 0.0 == +0.0: equal values must have equal bytes
+    packed[:, :6] += np.float32(0)
+    packed[:, 6:].view("int64")[:, 0] = codes
+
+    words = packed.view("uint64")
+    hashes = np.zeros(len(df), dtype="uint64")
+    for j in range(words.shape[1]):
+        hashes ^= words[:, j]
+        hashes *= _HASH_MULTIPLIER
+        hashes ^= hashes >> np.uint64(29)
+    return hashes
+
+
+def _drop_duplicates_hashed(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    drop_duplicates() on COLS_REQUIRED (name and nutrients) of a compact
+    frame, through one 64-bit hash per row.
+
+    Only the hash column goes through the duplicate hash table, instead of
+    the string and float columns one by one. A row whose hash is unique
+    has no duplicate; the few rows sharing a hash are then compared on
+    their actual values, so a hash collision never drops a distinct food.
+    """
+    if len(df) == 0:
+        return df
+
+    candidates = pd.Series(_row_hashes(df)).duplicated(keep=False).to_numpy()
+    duplicate = np.zeros(len(df), dtype=bool)
+    # exact duplicates share their hash, so they are all among the candidates
+    duplicate[candidates] = df[candidates].duplicated(subset=COLS_REQUIRED).to_numpy()
+    return df[~duplicate]
+
+
+def _clean_chunk(df_chunk: pd.DataFrame, start: int = 0,
+                 include_branded: bool = False, compact: bool = False) -> pd.DataFrame:
+    """
+    Row-wise cleaning steps for one chunk of raw rows.
+
+    Selects and renames the columns, removes branded foods, adds
+    energy_kcal_calculated, imputes likely-zero NaNs and drops rows with
+    missing required values. All of these steps only look at a single row,
+    so running them per chunk gives the same rows as running them on the
+    whole file.
 
     Parameters
     ----------
-    raw_folder : str or Path
-        Directory containing the raw CSV files.
-    output_path : str or Path
-        File path where the processed dataset will be saved.
+    df_chunk : pandas.DataFrame
+        Raw rows (at least COLUMNS_TO_KEEP).
+    start : int
+        Number of kept rows in the chunks before this one. Used to keep the
+        same index as a single pass over the whole file.
+    include_branded : bool
+        Keep the branded foods (~500k rows instead of ~7k).
+    compact : bool
+        Store the nutrients as float32 and the names as Arrow strings,
+        drop data_type and energy_kcal after the branded filter, and
+        compute the energy and imputations in place.
 
     Returns
     -------
     pandas.DataFrame
-       cleaned dataframe
+        Cleaned chunk, still including data_type and energy_kcal unless
+        compact is True.
     """
 
-    raw_folder = Path(raw_folder)
-
     # ---------------------------------------------------
-    # Load parquet file
+    # select columns and rename, remove branded foods
+    # from the dataset 500k ->7k
     # ---------------------------------------------------
-    file_path = "../raw_data/data.parquet"
-    df = pd.read_parquet(file_path, engine="fastparquet")
+    with stage("clean.select_filter", rows_in=len(df_chunk)) as s:
+        df_clean = to_canonical(df_chunk, USDA_PARQUET, filtered=not include_branded)
+        s.rows_out = len(df_clean)
 
+    return _clean_canonical(df_clean, start, compact)
+
+
+def _clean_canonical(df_clean: pd.DataFrame, start: int = 0,
+                     compact: bool = False) -> pd.DataFrame:
+    """
+    The steps of _clean_chunk after column selection and the branded
+    filter, for a chunk of the canonical table (see sources.iter_source).
+    """
+    df_clean = df_clean.set_axis(pd.RangeIndex(start, start + len(df_clean)))
+
+    if compact:
+        with stage("clean.compact", rows_in=len(df_clean)) as s:
+            # data_type and energy_kcal are only needed up to the branded filter
+            df_clean = df_clean.drop(columns=["data_type", "energy_kcal"])
+            _energy_and_impute_inplace(df_clean)
+            # dropna before the downcast, so only the kept rows are converted
+            df_clean = _compact_dtypes(df_clean.dropna(subset=COLS_REQUIRED))
+            s.rows_out = len(df_clean)
+
+    else:
+        with stage("clean.energy_impute", rows_in=len(df_clean)) as s:
+            # ---------------------------------------------------
+            # add column with energy in kcal calculated
+            # ---------------------------------------------------
+            df_clean["energy_kcal_calculated"] = (
+                df_clean["fat_g"] * 9 +
+                df_clean["carbs_g"] * 4 +
+                df_clean["protein_g"] * 4
+            ).round(1)
+
+            # ---------------------------------------------------
+            # replace NaN in sat fat column with 0 where likely 0
+            # ---------------------------------------------------
+
+            df_clean["satfat_g"] = np.where(
+            (df_clean["fat_g"] < 3) &
+            (df_clean["satfat_g"].isna()),
+            0,
+            df_clean["satfat_g"]
+            )
+
+            # ---------------------------------------------------
+            # replace NaN in fiber column with 0 where likely 0
+            # ---------------------------------------------------
+
+            df_clean["fiber_g"] = np.where(
+            (df_clean["carbs_g"] < 5) &
+            (df_clean["fiber_g"].isna()),
+            0,
+            df_clean["fiber_g"]
+            )
+            s.rows_out = len(df_clean)
 
     # ---------------------------------------------------
-    # select columns and rename
+    # drop NaN (per row, so it commutes with the global
+    # drop_duplicates done on the concatenated chunks)
     # ---------------------------------------------------
+    with stage("clean.dropna", rows_in=len(df_clean)) as s:
+        df_clean = df_clean.dropna(subset=COLS_REQUIRED)
+        s.rows_out = len(df_clean)
+
+    return df_clean
 
-    df_clean = df[COLUMNS_TO_KEEP].copy()
 
-    df_clean = df_clean.rename(columns=RENAME_COLUMNS)
+def clean_raw_rows(df_raw: pd.DataFrame, include_branded: bool = False,
+                   compact: bool = False) -> pd.DataFrame:
+    """
+    Clean raw rows held in memory (e.g. new foods to add to the clusters).
 
+    Same row-wise steps as clean_food_data, then duplicate removal.
 
+    Parameters
+    ----------
+    df_raw : pandas.DataFrame
+        Raw rows (at least COLUMNS_TO_KEEP).
+    include_branded : bool
+        Keep the branded foods (see _clean_chunk).
+    compact : bool
+        Compact dtypes and hashed duplicate removal (see _clean_chunk).
 
-    # ---------------------------------------------------
-    # remove branded foods from the dataset 500k ->7k
-    # ---------------------------------------------------
-    df_clean = df_clean[df_clean["data_type"] != "branded_food"].reset_index(drop=True)
+    Returns
+    -------
+    pandas.DataFrame
+        Cleaned rows, indexed from 0 in the order of df_raw, still
+        including data_type and energy_kcal unless compact is True.
+    """
+    df_clean = _clean_chunk(df_raw, include_branded=include_branded, compact=compact)
+    return _drop_duplicates_hashed(df_clean) if compact else df_clean.drop_duplicates()
 
 
-    # ---------------------------------------------------
-    # add column with energy in kcal calculated
-    # ---------------------------------------------------
-    df_clean["energy_kcal_calculated"] = (
-        df_clean["fat_g"] * 9 +
-        df_clean["carbs_g"] * 4 +
-        df_clean["protein_g"] * 4
-    ).round(1)
+def iter_clean_chunks(file_path: str = PARQUET_PATH, include_branded: bool = False,
+                      compact: bool = False):
+    """
+    Stream the raw parquet file one row group at a time.
 
-    # ---------------------------------------------------
-    # replace NaN in sat fat column with 0 where likely 0
-    # ---------------------------------------------------
+    Only COLUMNS_TO_KEEP are read from disk, the branded foods are dropped
+    by the reader (see sources.iter_source) and every row group is cleaned
+    before the next one is loaded, so memory stays bounded by the largest
+    row group instead of the whole file.
 
-    df_clean["satfat_g"] = np.where(
-    (df_clean["fat_g"] < 3) &
-    (df_clean["satfat_g"].isna()),
-    0,
-    df_clean["satfat_g"]
-    )
+    Parameters
+    ----------
+    file_path : str or Path
+        Raw parquet file.
+    include_branded : bool
+        Keep the branded foods (see _clean_chunk).
+    compact : bool
+        Compact dtypes and hashed duplicate removal (see _clean_chunk).
+
+    Yields
+    ------
+    pandas.DataFrame
+        Cleaned chunk (see _clean_chunk), duplicates within the chunk removed.
+    """
 
-    # ---------------------------------------------------
-    # replace NaN in fiber column with 0 where likely 0
-    # ---------------------------------------------------
+    start = 0
+    chunks = iter_source(USDA_PARQUET, file_path, filtered=not include_branded)
+    for df_chunk in timed_iter("clean.read_parquet", chunks):
+        df_clean = _clean_canonical(df_chunk, start, compact)
+        with stage("clean.drop_duplicates_chunk", rows_in=len(df_clean)) as s:
+            df_clean = _drop_duplicates_hashed(df_clean) if compact else df_clean.drop_duplicates()
+            s.rows_out = len(df_clean)
+        yield df_clean
+        start += len(df_chunk)
 
-    df_clean["fiber_g"] = np.where(
-    (df_clean["carbs_g"] < 5) &
-    (df_clean["fiber_g"].isna()),
-    0,
-    df_clean["fiber_g"]
-    )
+# -------------------------------------------------------
+# Function for data cleaning
+# -------------------------------------------------------
 
+def clean_food_data(raw_folder: str = RAW_FOLDER,
+                    output_path: str = CLEANED_PATH,
+                    streaming: bool = True,
+                    include_branded: bool = False,
+                    compact: bool = False):
+    """
+    End-to-end function cleaning nutrition data.
 
+    Steps performed:
+    Load the raw parquet file.
+    Select only the relevant nutrient columns.
+    Rename the selected columns for consistency.
+    Remove branded foods, impute likely-zero NaNs, drop incomplete rows.
+    Remove duplicate rows.
+    Save the cleaned dataset to output_path.
 
-    # ---------------------------------------------------
-    # Drop duplicates and drop NaN
-    # ---------------------------------------------------
-    df_clean = df_clean.drop_duplicates()
+    Parameters
+    ----------
+    raw_folder : str or Path
+        Directory containing the raw parquet file (named like PARQUET_PATH,
+        data.parquet).
+    output_path : str or Path
+        File path where the processed dataset will be saved. The format
+        follows the suffix (.feather, .parquet, or .csv as a text export),
+        see artifacts.write_frame().
+    streaming : bool
+        If True (default), read only COLUMNS_TO_KEEP and clean the parquet
+        row group by row group (see iter_clean_chunks). If False, load the
+        whole file into memory first. Both give the same result.
+    include_branded : bool
+        Keep the branded foods (see _clean_chunk).
+    compact : bool
+        Memory-lean mode: float32 nutrients, Arrow-backed names, in-place
+        imputation and duplicates removed through a hash of the name and
+        nutrients (see _drop_duplicates_hashed). Rows that only differed in
+        the raw energy_kcal are then duplicates; otherwise the rows are
+        the same, at float32 precision.
+
+    Returns
+    -------
+    pandas.DataFrame
+       cleaned dataframe
+    """
 
-    """the cols_required are mandatory for modelling, in case they are NaN they are dropped
-    CAVE: there will reamain NaNs in fibre and saturated fats!"""
+    parquet_path = Path(raw_folder) / Path(PARQUET_PATH).name
 
-    cols_required = [
-    "food_item",
-    "energy_kcal_calculated",
-    "fat_g",
-    "carbs_g",
-    "protein_g",
-    "fiber_g",
-    "satfat_g"
-    ]
+    # ---------------------------------------------------
+    # Load parquet file and clean it
+    # ---------------------------------------------------
+    if streaming:
+        chunks = list(iter_clean_chunks(parquet_path, include_branded, compact))
+        with stage("clean.concat", rows_in=sum(len(c) for c in chunks)) as s:
+            df_clean = pd.concat(chunks) if chunks else _clean_chunk(
+                pd.DataFrame(columns=COLUMNS_TO_KEEP), compact=compact)
+            s.rows_out = len(df_clean)
+    else:
+        with stage("clean.read_parquet") as s:
+            df = read_source(USDA_PARQUET, parquet_path, filtered=not include_branded)
+            s.rows_out = len(df)
+        df_clean = _clean_canonical(df, compact=compact)
 
-    df_clean = df_clean.dropna(subset=cols_required)
+    # ---------------------------------------------------
+    # Drop duplicates
+    # ---------------------------------------------------
+    with stage("clean.drop_duplicates", rows_in=len(df_clean)) as s:
+        df_clean = _drop_duplicates_hashed(df_clean) if compact else df_clean.drop_duplicates()
+        s.rows_out = len(df_clean)
 
 
     # ---------------------------------------------------
     # Remove column data_type and energy_kcal
     # ---------------------------------------------------
-    df_clean = df_clean.drop(columns=["data_type", "energy_kcal"])
+    df_clean = df_clean.drop(columns=["data_type", "energy_kcal"], errors="ignore")
 
 
     # ---------------------------------------------------
     # Save output
     # ---------------------------------------------------
 
-    output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df_clean.to_csv(output_path, index=False)
+    with stage("clean.write", rows_in=len(df_clean)):
+        write_frame(df_clean, output_path)
 
     return df_clean
 
@@ -184,7 +407,8 @@ def scale_food_data(input_clean_path: str = CLEANED_PATH,
         This is the dataset that will be scaled.
 
     output_scaled_path : str or Path
-        File path where the scaled dataset will be saved.
+        File path where the scaled dataset will be saved (.feather,
+        .parquet or .csv, see artifacts.write_frame()).
 
     Returns
     -------
@@ -192,18 +416,21 @@ def scale_food_data(input_clean_path: str = CLEANED_PATH,
         A scaled version of the cleaned dataset.
     """
 
-    df_clean = pd.read_csv(input_clean_path)
+    with stage("scale.read") as s:
+        df_clean = read_frame(input_clean_path)
+        s.rows_out = len(df_clean)
 
     scaler = MinMaxScaler()
 
-    numeric_cols = df_clean.select_dtypes(include=["float64", "int64"]).columns
+    numeric_cols = df_clean.select_dtypes(include="number").columns
     feature_cols = [col for col in numeric_cols if col != "food_item"]
 
-    df_scaled = df_clean.copy()
-    df_scaled[feature_cols] = scaler.fit_transform(df_clean[feature_cols])
+    with stage("scale.fit_transform", rows_in=len(df_clean)) as s:
+        df_scaled = df_clean.copy()
+        df_scaled[feature_cols] = scaler.fit_transform(df_clean[feature_cols])
+        s.rows_out = len(df_scaled)
 
-    output_scaled_path = Path(output_scaled_path)
-    output_scaled_path.parent.mkdir(parents=True, exist_ok=True)
-    df_scaled.to_csv(output_scaled_path, index=False)
+    with stage("scale.write", rows_in=len(df_scaled)):
+        write_frame(df_scaled, output_scaled_path)
 
     return df_scaled
@@ -1,26 +1,83 @@
+from concurrent.futures import TimeoutError as FutureTimeout
+
 import streamlit as st
-import requests
+
+from nutrimap_app.api_client import NUTRIENT_COLS, NutriMapClient
 
  # Change this URL to the one of your API
 API_URL = "https://api-nutrimap-1002154750813.europe-west1.run.app/"
 
+# Seconds a rerun waits for the API before showing the last known result
+RESPONSE_WAIT = 0.5
+
+
+@st.cache_resource
+def get_client() -> NutriMapClient:
+    # One pooled session and prediction cache per Streamlit process,
+    # reused by every rerun and every browser session
+    return NutriMapClient(API_URL)
+
+
+def show_when_ready(client, foods, state_key):
+    """Results for foods: from the cache, from the API within RESPONSE_WAIT
+    seconds, or else the previous results of state_key (marked as stale)."""
+    results = client.cached(foods)
+    if results is None:
+        future = client.submit(foods)
+        try:
+            results = future.result(timeout=RESPONSE_WAIT)
+        except FutureTimeout:
+            st.caption("The API is slow to answer, showing the previous result; "
+                       "it will update on the next interaction.")
+        except Exception as e:
+            st.error(f"API error: {e}")
+
+    if results is not None:
+        st.session_state[state_key] = results
+    return st.session_state.get(state_key)
+
+
+client = get_client()
+
 st.title("NutriMap - Test")
 
 st.write("Nutrimap test - ignore errors, backend is not properly configured :)")
 
-sepal_length = st.slider('Select a value for Carbs', min_value=0, max_value=4, value=1, step=1)
-sepal_width = st.slider('Select a value for Protein',  min_value=0, max_value=4, value=1, step=1)
-petal_length = st.slider('Select a value for Total Fats',  min_value=0, max_value=4, value=1, step=1)
-petal_width = st.slider('Select a value for Unsaturated Fats',  min_value=0, max_value=4, value=1, step=1)
-
-url = f"{API_URL}/predict"
-params = {
-    'sepal_length': sepal_length,
-    'sepal_width': sepal_width,
-    'petal_length': petal_length,
-    'petal_width': petal_width,
+carbs_g = st.slider('Select a value for Carbs (g/100 g)', min_value=0, max_value=100, value=10, step=1)
+protein_g = st.slider('Select a value for Protein (g/100 g)',  min_value=0, max_value=100, value=10, step=1)
+fat_g = st.slider('Select a value for Total Fats (g/100 g)',  min_value=0, max_value=100, value=5, step=1)
+satfat_g = st.slider('Select a value for Saturated Fats (g/100 g)',  min_value=0, max_value=100, value=1, step=1)
+fiber_g = st.slider('Select a value for Fiber (g/100 g)',  min_value=0, max_value=100, value=2, step=1)
+
+food = {
+    'fat_g': fat_g,
+    'satfat_g': satfat_g,
+    'carbs_g': carbs_g,
+    'protein_g': protein_g,
+    'fiber_g': fiber_g,
 }
 
-response = requests.get(url, params=params).json()
+response = show_when_ready(client, [food], "last_prediction")
+if response is not None:
+    st.write(f"This food belongs to cluster {str(response[0]['prediction'])} "
+             f"({response[0]['food_group']})")
+
+# Several foods at once: one /predict/batch request for the whole table
+st.subheader("Compare several foods")
+foods = st.data_editor(
+    [
+        {'name': "lentils", 'fat_g': 0.4, 'satfat_g': 0.1, 'carbs_g': 20.1, 'protein_g': 9.0, 'fiber_g': 7.9},
+        {'name': "cheddar", 'fat_g': 33.0, 'satfat_g': 21.0, 'carbs_g': 1.3, 'protein_g': 25.0, 'fiber_g': 0.0},
+    ],
+    column_order=["name", *NUTRIENT_COLS],
+    num_rows="dynamic",
+)
 
-st.write(f"This flower belongs to category {str(response['prediction'])}")
+foods = [f for f in foods if all(f.get(col) is not None for col in NUTRIENT_COLS)]
+if foods:
+    results = show_when_ready(client, foods, "last_batch")
+    if results is not None and len(results) == len(foods):
+        st.dataframe([
+            {'name': f.get('name'), 'cluster': r['prediction'], 'food_group': r['food_group']}
+            for f, r in zip(foods, results)
+        ])
@@ -0,0 +1,29 @@
+"""Gunicorn settings for the production image.
+
+    gunicorn nutrimap_app.api_file:app -c nutrimap_app/gunicorn_conf.py
+
+- WEB_CONCURRENCY uvicorn workers (default: one per CPU), no reload watcher,
+- preload_app: the app module is imported once in the master, and with
+  NUTRIMAP_PRELOAD=1 it loads the model and lookup artifacts right then
+  (api_file.preload), so the forked workers share those pages copy-on-write
+  instead of each loading its own copy,
+- GET /ready answers 200 only once a worker has warmed up.
+"""
+
+import multiprocessing
+import os
+
+# Read by nutrimap_app.api_file when the master imports it
+os.environ.setdefault("NUTRIMAP_PRELOAD", "1")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+reload = False
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+errorlog = "-"
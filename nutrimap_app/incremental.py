@@ -0,0 +1,308 @@
+"""Add new foods to the clustered data without rerunning the pipeline.
+
+update_clusters() takes raw rows (same columns as the raw parquet file):
+- cleans them with the same row-wise steps as data_prep_marie,
+- scales them with the persisted MinMax parameters of the inference
+  bundle (the bounds are NOT refitted, so existing rows keep their scaled
+  values and labels),
+- assigns them to the existing centroids, and appends them to the pending
+  foods (PENDING_FOODS_PATH): its cost grows with the number of new foods,
+  not with the clustered data, of which only the names are read,
+- or, with refit=True, warm-starts a KMeans refit on all rows from those
+  centroids (labels keep their ids), writes all of them (pending foods
+  included) to the clustered data and publishes the refitted model as a
+  new version of the model store, derived from the served one and
+  promoted (see model_store.py); the API registry picks it up on its next
+  reload check.
+
+Rebuilding the indexes served from the clustered data (lookup table,
+similarity index, text index, meal scorer) takes time linear in all the
+foods, so it is a separate, deferred job: apply_updates() merges the
+pending foods into the clustered data and rebuilds the indexes, each file
+renamed into place so running API workers keep reading the old one:
+    python -m nutrimap_app.model --apply-updates
+Until then the endpoints serve the foods of the last rebuild.
+
+It also reports drift that the incremental path cannot absorb:
+- new rows outside the min/max the scaler was fitted on,
+- new rows much further from their centroid than the training rows were
+  (inertia per row vs bundle.inertia_per_row).
+When DriftReport.needs_rebuild is True, rerun the full pipeline
+(python -m nutrimap_app.model --force). New foods should also be added to
+the raw data, or the next full rebuild drops them.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from nutrimap_app.artifacts import artifact_format, read_frame, write_frame
+from nutrimap_app.data_prep_marie import clean_raw_rows
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.KMeanModel import (BEST_MODEL_PATH, BUNDLE_PATH, CLUSTERED_DATA_PATH, DATA_DIR,
+                                     _save_model)
+from nutrimap_app.lookup import FoodLookup, LOOKUP_DIR, lookup_files
+from nutrimap_app.meal_scoring import MealScorer, MEAL_SCORER_PATH
+from nutrimap_app.model_store import STORE_DIR, ModelStore, data_hash, replace_atomically
+from nutrimap_app.registry import ModelRegistry
+from nutrimap_app.similarity import FoodSimilarityIndex, SIMILARITY_INDEX_PATH
+from nutrimap_app.text_search import FoodTextIndex, TEXT_INDEX_PATH
+
+# New foods clustered by update_clusters, not yet merged by apply_updates
+PENDING_FOODS_PATH = DATA_DIR / "food_updates.parquet"
+
+# Share of new rows allowed outside the scaler's min/max before a rebuild
+MAX_OUT_OF_RANGE_SHARE = 0.05
+
+# Inertia per new row, relative to the training rows, before a rebuild
+MAX_INERTIA_RATIO = 1.5
+
+
+class DriftReport(NamedTuple):
+    n_rows: int
+    out_of_range_share: float
+    out_of_range_features: dict
+    inertia_ratio: float
+    needs_rebuild: bool
+    reasons: List[str]
+
+
+class IncrementalUpdate(NamedTuple):
+    new_foods: pd.DataFrame
+    drift: DriftReport
+    refitted: bool
+    relabelled: int
+
+
+def check_drift(bundle: InferenceBundle, X_scaled: np.ndarray, sq_distances: np.ndarray) -> DriftReport:
+    """
+    Drift of new scaled rows against the model they are assigned with.
+
+    Parameters
+    ----------
+    bundle : InferenceBundle
+        The served model.
+    X_scaled : numpy.ndarray
+        New rows scaled with bundle.transform.
+    sq_distances : numpy.ndarray
+        Squared distance of every new row to its centroid.
+    """
+    n_rows = len(X_scaled)
+    outside = (X_scaled < -1e-9) | (X_scaled > 1 + 1e-9)
+    out_of_range_share = float(outside.any(axis=1).mean()) if n_rows else 0.0
+    out_of_range_features = {
+        col: int(count) for col, count in zip(bundle.feature_cols, outside.sum(axis=0)) if count
+    }
+
+    inertia_ratio = float("nan")
+    if n_rows and bundle.inertia_per_row > 0:
+        inertia_ratio = float(sq_distances.mean() / bundle.inertia_per_row)
+
+    reasons = []
+    if out_of_range_share > MAX_OUT_OF_RANGE_SHARE:
+        reasons.append(f"{out_of_range_share:.1%} of the new rows are outside the scaler's "
+                       f"min/max ({out_of_range_features})")
+    if inertia_ratio > MAX_INERTIA_RATIO:
+        reasons.append(f"inertia per new row is {inertia_ratio:.2f}x the training rows")
+
+    return DriftReport(n_rows, out_of_range_share, out_of_range_features,
+                       inertia_ratio, bool(reasons), reasons)
+
+
+def _refit(bundle: InferenceBundle, X_scaled: np.ndarray, random_state: int = 42):
+    """KMeans on all rows, started from the current centroids: (bundle, KMeans model)."""
+    from sklearn.cluster import KMeans
+
+    model = KMeans(n_clusters=bundle.n_clusters, init=bundle.centroids, n_init=1,
+                   random_state=random_state).fit(X_scaled)
+    refitted = InferenceBundle(bundle.feature_cols, bundle.scale, bundle.min_,
+                               model.cluster_centers_, model.inertia_ / len(X_scaled))
+    return refitted, model
+
+
+def _write_frame_atomically(df: pd.DataFrame, path) -> None:
+    """write_frame() next to path, then renamed over it."""
+    replace_atomically(path, lambda tmp: write_frame(df, tmp, fmt=artifact_format(path)))
+
+
+def _read_pending(pending_path) -> Optional[pd.DataFrame]:
+    return read_frame(pending_path) if Path(pending_path).exists() else None
+
+
+def _publish_refit(store: ModelStore, model, bundle: InferenceBundle, features: pd.DataFrame,
+                   model_path, bundle_path) -> None:
+    """Serve a refitted model, published as a version derived from the served one."""
+    parent = store.current_version()
+    _save_model(
+        model, bundle, bundle.n_clusters,
+        seed=store.manifest(parent)["seed"] if parent is not None else None,
+        features_hash=data_hash(features[bundle.feature_cols]),
+        metrics={"n_rows": len(features), "inertia_per_row": float(bundle.inertia_per_row)},
+        promote=True, model_path=model_path, bundle_path=bundle_path, store=store, parent=parent,
+    )
+
+
+def _rebuild_indexes(df_clusters: pd.DataFrame, bundle: InferenceBundle, lookup_dir,
+                     similarity_path, text_index_path, meal_scorer_path) -> None:
+    """Rebuild the served indexes from the clustered data, one renamed file at a time."""
+    X_scaled = bundle.transform(df_clusters[bundle.feature_cols])
+    similarity = FoodSimilarityIndex.build(df_clusters["food_item"], X_scaled)
+    replace_atomically(similarity_path, similarity.save)
+    replace_atomically(text_index_path, FoodTextIndex.build(df_clusters).save)
+    replace_atomically(meal_scorer_path, MealScorer.from_frame(df_clusters).save)
+
+    lookup_dir = Path(lookup_dir)
+    lookup_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=lookup_dir.parent) as tmp:
+        FoodLookup.build(df_clusters).save(tmp)
+        for path in lookup_files(tmp):
+            os.chmod(path, 0o644)
+            os.replace(path, lookup_dir / path.name)
+
+
+def update_clusters(
+    new_raw: pd.DataFrame,
+    refit: bool = False,
+    include_branded: bool = False,
+    bundle_path=BUNDLE_PATH,
+    clustered_path=CLUSTERED_DATA_PATH,
+    save: bool = True,
+    store_dir=STORE_DIR,
+    model_path=BEST_MODEL_PATH,
+    pending_path=PENDING_FOODS_PATH,
+) -> IncrementalUpdate:
+    """
+    Clean, scale and cluster new foods against the persisted model.
+
+    Parameters
+    ----------
+    new_raw : pandas.DataFrame
+        Raw rows with data_prep_marie.COLUMNS_TO_KEEP.
+    refit : bool
+        Warm-start a KMeans refit on existing + new rows from the current
+        centroids, instead of only assigning the new rows.
+    include_branded : bool
+        Keep branded foods among the new rows. The default matches the
+        full-batch pipeline (data_prep_marie.clean_food_data), which drops
+        them.
+    bundle_path, clustered_path : str or Path
+        Persisted bundle and clustered data.
+    save : bool
+        Append the new foods to the pending foods; after a refit, write
+        the clustered data and save and serve the refitted model and
+        bundle. The indexes are rebuilt by apply_updates().
+    store_dir : str or Path
+        Model store. When one of its versions is served, new foods are
+        assigned with that version; a refitted model is published there.
+    model_path : str or Path
+        Where a refitted KMeans model is pickled (best_model.pkl).
+    pending_path : str or Path
+        Foods clustered since the last apply_updates().
+
+    Returns
+    -------
+    IncrementalUpdate
+        The cleaned new foods with their cluster, the drift report,
+        whether the model was refitted and how many existing foods changed
+        cluster.
+    """
+    # The served bundle: the promoted store version, or the file at bundle_path
+    store = ModelStore(store_dir)
+    bundle = ModelRegistry(bundle_path, store).current.bundle
+
+    # Same row-wise steps as the full cleaning, on the new rows only
+    new_foods = clean_raw_rows(new_raw, include_branded=include_branded)
+    new_foods = new_foods.drop(columns=["data_type", "energy_kcal"])
+
+    existing = pending = None
+    if save or refit:
+        pending = _read_pending(pending_path)
+        # all the columns for a refit, only the names otherwise
+        existing = read_frame(clustered_path, columns=None if refit else ["food_item"])
+        if pending is not None:
+            existing = pd.concat([existing, pending[existing.columns]], ignore_index=True)
+        # isin() against the few new names (fast) rather than all existing ones
+        known = existing["food_item"][existing["food_item"].isin(new_foods["food_item"])]
+        new_foods = new_foods[~new_foods["food_item"].isin(known)]
+
+    X_scaled = bundle.transform(new_foods[bundle.feature_cols])
+    labels, sq_distances = bundle.assign_scaled(X_scaled)
+    drift = check_drift(bundle, X_scaled, sq_distances)
+
+    relabelled = 0
+    if refit:
+        X_existing = bundle.transform(existing[bundle.feature_cols])
+        bundle, model = _refit(bundle, np.vstack([X_existing, X_scaled]))
+
+        existing_labels = bundle.predict_scaled(X_existing)
+        relabelled = int((existing_labels != existing["cluster"].to_numpy()).sum())
+        existing = existing.assign(cluster=existing_labels)
+        labels = bundle.predict_scaled(X_scaled)
+
+    new_foods = new_foods.assign(cluster=labels)
+
+    if save and refit:
+        # every row was relabelled: the pending foods are merged right away
+        combined = pd.concat([existing, new_foods], ignore_index=True)
+        _write_frame_atomically(combined, clustered_path)
+        Path(pending_path).unlink(missing_ok=True)
+        _publish_refit(store, model, bundle, combined, model_path, bundle_path)
+    elif save and len(new_foods):
+        _write_frame_atomically(pd.concat([pending, new_foods], ignore_index=True)
+                                if pending is not None else new_foods, pending_path)
+
+    return IncrementalUpdate(new_foods, drift, refit, relabelled)
+
+
+def apply_updates(
+    bundle_path=BUNDLE_PATH,
+    clustered_path=CLUSTERED_DATA_PATH,
+    store_dir=STORE_DIR,
+    pending_path=PENDING_FOODS_PATH,
+    lookup_dir=LOOKUP_DIR,
+    similarity_path=SIMILARITY_INDEX_PATH,
+    text_index_path=TEXT_INDEX_PATH,
+    meal_scorer_path=MEAL_SCORER_PATH,
+) -> int:
+    """
+    Merge the pending foods into the clustered data and rebuild the indexes.
+
+    The deferred part of update_clusters(): its time is linear in all the
+    foods. Every file is written next to the served one and renamed over
+    it, and the pending foods are only removed once merged, so the job can
+    be rerun after a failure.
+
+    Parameters
+    ----------
+    bundle_path, clustered_path, store_dir, pending_path : str or Path
+        See update_clusters().
+    lookup_dir, similarity_path, text_index_path, meal_scorer_path : str or Path
+        Indexes rebuilt from the clustered data.
+
+    Returns
+    -------
+    int
+        Number of pending foods merged.
+    """
+    bundle = ModelRegistry(bundle_path, ModelStore(store_dir)).current.bundle
+    df_clusters = read_frame(clustered_path)
+
+    pending = _read_pending(pending_path)
+    n_merged = 0
+    if pending is not None:
+        # a rerun after a failed unlink must not add the foods twice
+        pending = pending[~pending["food_item"].isin(df_clusters["food_item"])]
+        n_merged = len(pending)
+        df_clusters = pd.concat([df_clusters, pending[df_clusters.columns]], ignore_index=True)
+        _write_frame_atomically(df_clusters, clustered_path)
+        Path(pending_path).unlink()
+
+    _rebuild_indexes(df_clusters, bundle, lookup_dir, similarity_path, text_index_path,
+                     meal_scorer_path)
+    return n_merged
@@ -0,0 +1,97 @@
+"""Compact inference bundle: raw nutrients -> cluster label.
+
+The bundle holds only what serving needs, as plain arrays in one .npz file:
+- the feature column order the model was trained on,
+- the MinMaxScaler parameters (X_scaled = X * scale + min),
+- the KMeans centroids,
+- the mean squared distance of the training rows to their centroid
+  (inertia per row), the reference for drift checks (see incremental.py).
+
+Loading it needs NumPy only (no unpickling of sklearn objects), and
+predict() scales and assigns a whole matrix in one vectorized step.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Mapping
+
+import numpy as np
+
+
+class InferenceBundle:
+    """Feature order, MinMax scaling and KMeans centroids of a trained model."""
+
+    def __init__(self, feature_cols, scale, min_, centroids, inertia_per_row=np.nan):
+        self.feature_cols = [str(col) for col in feature_cols]
+        self.scale = np.asarray(scale, dtype="float64")
+        self.min_ = np.asarray(min_, dtype="float64")
+        self.centroids = np.asarray(centroids, dtype="float64")
+        self.inertia_per_row = float(inertia_per_row)
+        self._centroid_sq_norms = (self.centroids ** 2).sum(axis=1)
+
+    @classmethod
+    def from_fitted(cls, feature_cols, scaler, model, inertia_per_row=None) -> "InferenceBundle":
+        """Build a bundle from a fitted MinMaxScaler and KMeans model.
+
+        inertia_per_row defaults to model.inertia_ over the rows of the
+        last fit (NaN when the model does not keep its labels).
+        """
+        if inertia_per_row is None:
+            labels = getattr(model, "labels_", None)
+            inertia_per_row = (model.inertia_ / len(labels)) if labels is not None and len(labels) else np.nan
+        return cls(feature_cols, scaler.scale_, scaler.min_, model.cluster_centers_, inertia_per_row)
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.centroids)
+
+    def save(self, path) -> Path:
+        """Write the bundle to an uncompressed .npz file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            np.savez(
+                f,
+                feature_cols=np.array(self.feature_cols),
+                scale=self.scale,
+                min_=self.min_,
+                centroids=self.centroids,
+                inertia_per_row=np.float64(self.inertia_per_row),
+            )
+        return path
+
+    @classmethod
+    def load(cls, path) -> "InferenceBundle":
+        """Read a bundle written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            # bundles written before inertia_per_row was added have no reference
+            inertia = data["inertia_per_row"] if "inertia_per_row" in data.files else np.nan
+            return cls(data["feature_cols"], data["scale"], data["min_"], data["centroids"], inertia)
+
+    def transform(self, X) -> np.ndarray:
+        """Scale raw nutrient rows (columns in feature_cols order)."""
+        X = np.asarray(X, dtype="float64").reshape(-1, len(self.feature_cols))
+        return X * self.scale + self.min_
+
+    def predict_scaled(self, X_scaled) -> np.ndarray:
+        """Nearest centroid of already scaled rows."""
+        # ||x - c||² = ||x||² - 2 x·c + ||c||², ||x||² does not change the argmin
+        distances = self._centroid_sq_norms - 2 * X_scaled @ self.centroids.T
+        return distances.argmin(axis=1)
+
+    def assign_scaled(self, X_scaled):
+        """Nearest centroid of scaled rows and the squared distance to it."""
+        distances = self._centroid_sq_norms - 2 * X_scaled @ self.centroids.T
+        labels = distances.argmin(axis=1)
+        sq_distances = distances[np.arange(len(labels)), labels] + (X_scaled ** 2).sum(axis=1)
+        return labels, np.maximum(sq_distances, 0)
+
+    def predict(self, X) -> np.ndarray:
+        """Cluster labels of raw nutrient rows (columns in feature_cols order)."""
+        return self.predict_scaled(self.transform(X))
+
+    def predict_columns(self, columns: Mapping) -> np.ndarray:
+        """Cluster labels from a mapping (dict, DataFrame) of nutrient columns."""
+        X = np.column_stack([np.asarray(columns[col], dtype="float64") for col in self.feature_cols])
+        return self.predict(X)
@@ -0,0 +1,14 @@
+"""Helpers for the JSON written to files (reports, manifests) and API responses."""
+
+import math
+
+
+def json_safe(value):
+    """NaN and infinities as None (null), which JSON can represent."""
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
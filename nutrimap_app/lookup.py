@@ -0,0 +1,161 @@
+"""Precomputed answers for the known foods, served from memory-mapped arrays.
+
+The pipeline writes one uncompressed .npy file per column to
+models/food_lookup/:
+- name_hashes / name_rows: the 64-bit hash of every food name, sorted, and
+  the row it belongs to, so a name is found with one searchsorted,
+- names / name_offsets: the utf-8 names as one byte blob, to confirm a hit,
+- nutrients (float32), cluster (int16) and food_group_codes (int8), plus
+  the food group categories.
+
+The API opens the files with np.load(mmap_mode="r"): pages are read on
+first access and shared through the page cache by every worker process,
+instead of each worker holding its own copy of a dataframe.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MODELS_DIR = PROJECT_ROOT / "models"
+
+LOOKUP_DIR = MODELS_DIR / "food_lookup"
+
+NUTRIENT_COLS = [
+    "energy_kcal_calculated",
+    "fat_g",
+    "satfat_g",
+    "carbs_g",
+    "protein_g",
+    "fiber_g",
+]
+
+LOOKUP_ARRAYS = [
+    "name_hashes",
+    "name_rows",
+    "names",
+    "name_offsets",
+    "nutrients",
+    "nutrient_cols",
+    "cluster",
+    "food_group_codes",
+    "food_group_categories",
+]
+
+
+def lookup_files(lookup_dir=LOOKUP_DIR) -> List[Path]:
+    """Paths of the .npy files that make up a lookup table."""
+    return [Path(lookup_dir) / f"{name}.npy" for name in LOOKUP_ARRAYS]
+
+
+def hash_name(name: str) -> int:
+    """Stable 64-bit hash of a food name (unlike hash(), the same in every process)."""
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class FoodLookup:
+    """Known foods -> nutrients, cluster and food group, one row per food."""
+
+    def __init__(self, arrays: dict):
+        self.arrays = arrays
+        self.nutrient_cols = [str(c) for c in arrays["nutrient_cols"]]
+        self.food_group_categories = [str(c) for c in arrays["food_group_categories"]]
+
+    def __len__(self) -> int:
+        return len(self.arrays["name_offsets"]) - 1
+
+    @classmethod
+    def build(cls, df) -> "FoodLookup":
+        """
+        Build the table from the clustered foods.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Foods with `food_item`, NUTRIENT_COLS and `cluster`. Only the
+            first row of a duplicated food_item is kept.
+        """
+        from nutrimap_app.category_mapping import assign_food_groups
+
+        df = df.drop_duplicates(subset="food_item").reset_index(drop=True)
+        food_groups = assign_food_groups(df)
+
+        names = [str(name) for name in df["food_item"]]
+        encoded = [name.encode("utf-8") for name in names]
+        name_offsets = np.zeros(len(encoded) + 1, dtype="int64")
+        name_offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+        hashes = np.fromiter((hash_name(name) for name in names), dtype="uint64", count=len(names))
+        order = np.argsort(hashes, kind="stable")
+
+        arrays = {
+            "name_hashes": hashes[order],
+            "name_rows": order.astype("int32"),
+            "names": np.frombuffer(b"".join(encoded), dtype="uint8"),
+            "name_offsets": name_offsets,
+            "nutrients": df[NUTRIENT_COLS].to_numpy(dtype="float32"),
+            "nutrient_cols": np.array(NUTRIENT_COLS),
+            "cluster": df["cluster"].to_numpy(dtype="int16"),
+            "food_group_codes": np.asarray(food_groups.cat.codes, dtype="int8"),
+            "food_group_categories": np.array(list(food_groups.cat.categories)),
+        }
+        return cls(arrays)
+
+    def save(self, lookup_dir=LOOKUP_DIR) -> Path:
+        lookup_dir = Path(lookup_dir)
+        lookup_dir.mkdir(parents=True, exist_ok=True)
+        for name, path in zip(LOOKUP_ARRAYS, lookup_files(lookup_dir)):
+            np.save(path, self.arrays[name], allow_pickle=False)
+        return lookup_dir
+
+    @classmethod
+    def load(cls, lookup_dir=LOOKUP_DIR, mmap: bool = True) -> "FoodLookup":
+        mmap_mode = "r" if mmap else None
+        return cls({
+            name: np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+            for name, path in zip(LOOKUP_ARRAYS, lookup_files(lookup_dir))
+        })
+
+    def name(self, row: int) -> str:
+        start, end = self.arrays["name_offsets"][row:row + 2]
+        return self.arrays["names"][start:end].tobytes().decode("utf-8")
+
+    def row(self, food_item: str) -> Optional[int]:
+        """Row of a known food, or None."""
+        hashes = self.arrays["name_hashes"]
+        key = np.uint64(hash_name(food_item))
+        i = int(hashes.searchsorted(key))
+        # hash collisions are possible but rare: confirm on the stored name
+        while i < len(hashes) and hashes[i] == key:
+            row = int(self.arrays["name_rows"][i])
+            if self.name(row) == food_item:
+                return row
+            i += 1
+        return None
+
+    def get(self, food_item: str) -> dict:
+        """
+        Nutrients, cluster and food group of a known food.
+
+        Raises
+        ------
+        KeyError
+            If the food is not in the table.
+        """
+        row = self.row(food_item)
+        if row is None:
+            raise KeyError(f"Unknown food_item: {food_item}")
+
+        category = self.food_group_categories[self.arrays["food_group_codes"][row]]
+        return {
+            "food_item": food_item,
+            "cluster": int(self.arrays["cluster"][row]),
+            "food_group": category,
+            **{col: round(float(value), 2) for col, value in
+               zip(self.nutrient_cols, self.arrays["nutrients"][row])},
+        }
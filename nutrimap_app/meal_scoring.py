@@ -0,0 +1,187 @@
+"""Score plates/meals against the EFSA per-meal reference intakes.
+
+A MealScorer keeps the nutrients of all known foods as one float matrix
+(per 100 g) plus a name -> row index. Scoring a meal is then a lookup of
+row ids and a weighted sum of matrix rows; scoring many meals at once sums
+all items of all meals in one np.bincount per nutrient, so thousands of
+candidate meals are scored per call.
+
+The pipeline saves the scorer as one .npz of plain arrays (nutrients, food
+group and plate role codes, the utf-8 names as one byte blob), so the API
+loads it with NumPy only, without reading the clustered data with pandas.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from nutrimap_app.category_mapping import FOOD_GROUPS, food_group_codes
+from nutrimap_app.plate_role_mapping import PLATE_ROLES, plate_role_codes
+from nutrimap_app.reference_values import EFSA_RI
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MODELS_DIR = PROJECT_ROOT / "models"
+
+MEAL_SCORER_PATH = MODELS_DIR / "meal_scorer.npz"
+
+# EFSA_RI key -> column of the cleaned data. sugar_g is not in the cleaned
+# data, so it is not scored.
+RI_COLUMNS = {
+    "energy_kcal": "energy_kcal_calculated",
+    "protein_g": "protein_g",
+    "carbs_g": "carbs_g",
+    "fat_g": "fat_g",
+    "fiber_g": "fiber_g",
+}
+
+Meal = Sequence[Tuple[str, float]]
+
+
+class MealScorer:
+    """Nutrient matrix of the known foods, scored against EFSA_RI."""
+
+    def __init__(self, food_items, nutrients, group_codes, role_codes):
+        self.food_items = [str(name) for name in food_items]
+        self._rows = {name: i for i, name in enumerate(self.food_items)}
+        self.nutrients = np.ascontiguousarray(nutrients, dtype="float64")
+        # codes into category_mapping.FOOD_GROUPS and PLATE_ROLES
+        self.group_codes = np.asarray(group_codes, dtype="int8")
+        self.role_codes = np.asarray(role_codes, dtype="int8")
+
+        self.ri_keys = list(RI_COLUMNS)
+        self.ri = np.array([EFSA_RI[key] for key in self.ri_keys], dtype="float64")
+
+    @classmethod
+    def from_frame(cls, df) -> "MealScorer":
+        """Build the scorer from the cleaned (or clustered) foods."""
+        df = df.drop_duplicates(subset="food_item").reset_index(drop=True)
+        group_codes = food_group_codes(df)
+        return cls(
+            df["food_item"],
+            df[list(RI_COLUMNS.values())].to_numpy(dtype="float64"),
+            group_codes,
+            plate_role_codes(df, group_codes),
+        )
+
+    def save(self, path=MEAL_SCORER_PATH) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        encoded = [name.encode("utf-8") for name in self.food_items]
+        name_offsets = np.zeros(len(encoded) + 1, dtype="int64")
+        name_offsets[1:] = np.cumsum([len(b) for b in encoded])
+        with path.open("wb") as f:
+            np.savez(
+                f,
+                names=np.frombuffer(b"".join(encoded), dtype="uint8"),
+                name_offsets=name_offsets,
+                nutrients=self.nutrients,
+                nutrient_cols=np.array(list(RI_COLUMNS.values())),
+                group_codes=self.group_codes,
+                role_codes=self.role_codes,
+            )
+        return path
+
+    @classmethod
+    def load(cls, path=MEAL_SCORER_PATH) -> "MealScorer":
+        with np.load(path, allow_pickle=False) as data:
+            if data["nutrient_cols"].tolist() != list(RI_COLUMNS.values()):
+                raise ValueError(f"{path} was saved with nutrients {data['nutrient_cols'].tolist()}, "
+                                 f"expected {list(RI_COLUMNS.values())}; rebuild it")
+            blob, offsets = data["names"].tobytes(), data["name_offsets"].tolist()
+            names = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+            return cls(names, data["nutrients"], data["group_codes"], data["role_codes"])
+
+    def food_group(self, row: int) -> str:
+        return FOOD_GROUPS[self.group_codes[row]]
+
+    def plate_role(self, row: int) -> str:
+        return PLATE_ROLES[self.role_codes[row]]
+
+    def rows(self, food_items: Iterable[str]) -> np.ndarray:
+        """Row ids of food names in the nutrient matrix.
+
+        Raises
+        ------
+        KeyError
+            If a food is not known.
+        """
+        food_items = list(food_items)
+        rows = np.fromiter((self._rows.get(name, -1) for name in food_items), dtype="int64",
+                           count=len(food_items))
+        if (rows < 0).any():
+            unknown = [name for name, row in zip(food_items, rows) if row < 0]
+            raise KeyError(f"Unknown food_item(s): {unknown}")
+        return rows
+
+    def totals_many(self, meals: Sequence[Meal]) -> np.ndarray:
+        """
+        Nutrient totals of many meals in one vectorized pass.
+
+        Parameters
+        ----------
+        meals : sequence of meals
+            Each meal is a sequence of (food_item, grams) pairs.
+
+        Returns
+        -------
+        numpy.ndarray of shape (n_meals, len(RI_COLUMNS))
+            Totals in the order of RI_COLUMNS.
+        """
+        meal_ids = np.repeat(np.arange(len(meals)), [len(meal) for meal in meals])
+        names = [name for meal in meals for name, _ in meal]
+        grams = np.fromiter((g for meal in meals for _, g in meal), dtype="float64",
+                            count=len(names))
+        return self.totals_from_rows(meal_ids, self.rows(names), grams, len(meals))
+
+    def totals_from_rows(self, meal_ids, rows, grams, n_meals: int) -> np.ndarray:
+        """Nutrient totals from flat (meal id, row id, grams) arrays."""
+        contributions = self.nutrients[rows] * (np.asarray(grams, dtype="float64") / 100)[:, None]
+        return np.column_stack([
+            np.bincount(meal_ids, weights=contributions[:, j], minlength=n_meals)
+            for j in range(contributions.shape[1])
+        ])
+
+    def percent_ri(self, totals) -> np.ndarray:
+        """Percent of each EFSA reference intake covered by nutrient totals."""
+        return 100 * np.asarray(totals) / self.ri
+
+    def score_many(self, meals: Sequence[Meal]):
+        """Percent of EFSA_RI covered by each meal, one row per meal (pandas.DataFrame)."""
+        import pandas as pd
+
+        return pd.DataFrame(self.percent_ri(self.totals_many(meals)),
+                            columns=[f"{key}_pct_ri" for key in self.ri_keys])
+
+    def score(self, meal: Meal) -> dict:
+        """
+        Score a single meal.
+
+        Returns
+        -------
+        dict
+            totals and percent of EFSA_RI per nutrient, plus the food group
+            and plate role of every item.
+        """
+        totals = self.totals_many([meal])[0]
+        rows = self.rows(name for name, _ in meal)
+
+        items: List[dict] = [
+            {
+                "food_item": name,
+                "grams": grams,
+                "food_group": self.food_group(row),
+                "plate_role": self.plate_role(row),
+            }
+            for (name, grams), row in zip(meal, rows)
+        ]
+
+        return {
+            "totals": dict(zip(self.ri_keys, totals.round(1).tolist())),
+            "pct_ri": dict(zip(self.ri_keys, self.percent_ri(totals).round(1).tolist())),
+            "items": items,
+            "roles": {role: sum(item["plate_role"] == role for item in items)
+                      for role in PLATE_ROLES},
+        }
@@ -1,11 +1,198 @@
-from nutrimap_app.data_prep_marie import clean_food_data, scale_food_data
-from nutrimap_app.KMeanModel import kmeanModel
+import argparse
+import pickle
+
+from nutrimap_app import KMeanModel, artifacts, category_mapping, cluster_quality, data_prep_marie, inference, lookup, meal_scoring, model_store, plate_role_mapping, similarity, sources, text_search
+from nutrimap_app.artifacts import read_frame
+from nutrimap_app.cluster_quality import CLUSTER_QUALITY_PATH
+from nutrimap_app.data_prep_marie import clean_food_data, scale_food_data, CLEANED_PATH, SCALED_PATH
+from nutrimap_app.KMeanModel import kmeanModel, build_minibatch_kmeans_model, BEST_MODEL_PATH, BUNDLE_PATH, CLUSTERED_DATA_PATH
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.lookup import FoodLookup, LOOKUP_DIR, lookup_files
+from nutrimap_app.meal_scoring import MealScorer, MEAL_SCORER_PATH
+from nutrimap_app.profiling import profile_pipeline
+from nutrimap_app.similarity import FoodSimilarityIndex, SIMILARITY_INDEX_PATH
+from nutrimap_app.stage_cache import StageCache, code_version
+from nutrimap_app.text_search import FoodTextIndex, TEXT_INDEX_PATH
+
+def _load_model():
+    with open(BEST_MODEL_PATH, "rb") as f:
+        model = pickle.load(f)
+    return model, read_frame(CLUSTERED_DATA_PATH)
+
+def _build_similarity_index(df_clusters):
+    bundle = InferenceBundle.load(BUNDLE_PATH)
+    X_scaled = bundle.transform(df_clusters[bundle.feature_cols])
+    FoodSimilarityIndex.build(df_clusters["food_item"], X_scaled).save(SIMILARITY_INDEX_PATH)
+
+def _build_minibatch(k, promote):
+    # training streams the rows; the indexes built next need them all, so
+    # they are read back from the clustered data once the model is trained
+    model, df_clusters = build_minibatch_kmeans_model(k=k, promote=promote,
+                                                      return_frame=not promote)
+    return model, (read_frame(CLUSTERED_DATA_PATH) if promote else df_clusters)
+
+def _build_kmeans(cache, k, compact=False, promote=True):
+    prep_code = code_version(data_prep_marie, sources, artifacts)
+
+    df_clean = cache.run(
+        "clean_food_data",
+        compute=lambda: clean_food_data(compact=compact),
+        load=lambda: read_frame(CLEANED_PATH),
+        inputs=[data_prep_marie.PARQUET_PATH],
+        params={"columns": data_prep_marie.COLUMNS_TO_KEEP, "compact": compact},
+        outputs=[CLEANED_PATH],
+        code=prep_code,
+    )
+    df_scaled = cache.run(
+        "scale_food_data",
+        compute=scale_food_data,
+        load=lambda: read_frame(SCALED_PATH),
+        inputs=[CLEANED_PATH],
+        outputs=[SCALED_PATH],
+        code=prep_code,
+    )
+    model, df_clusters = cache.run(
+        "kmeans",
+        compute=lambda: kmeanModel(k=k, df_clean=df_clean, scaled_df=df_scaled, promote=promote),
+        load=_load_model,
+        inputs=[CLEANED_PATH, SCALED_PATH],
+        params={"random_state": 42, "k": k, "promote": promote},
+        outputs=[BEST_MODEL_PATH, BUNDLE_PATH, CLUSTERED_DATA_PATH, CLUSTER_QUALITY_PATH],
+        code=code_version(KMeanModel, artifacts, inference, cluster_quality, model_store),
+    )
+    return model, df_clusters
+
+def build_all(force: bool = False, k=3, engine: str = "kmeans", compact: bool = False,
+              promote: bool = True):
+    """Clean, scale and cluster the data, skipping stages that are up to date.
+
+    Every stage is cached on the hash of its input files, its parameters
+    and its code (see stage_cache.py). force=True rebuilds everything.
+    k=None selects k with a parallel sweep (see KMeanModel.sweep_kmeans), with
+    engine="kmeans" only.
+    engine="minibatch" trains out of core on all foods, branded included
+    (see KMeanModel.build_minibatch_kmeans_model).
+    compact=True cleans with float32 nutrients and Arrow-backed names
+    (see data_prep_marie.clean_food_data).
+    A rebuilt model is published as a new version of the model store and,
+    with promote=True, served by the API (see model_store.py). With
+    promote=False only that version is stored: the served model files,
+    clustered data and the indexes built from them are not rebuilt.
+    """
+    if engine == "minibatch" and k is None:
+        raise ValueError("Selecting k with a sweep is only available with engine='kmeans'")
+
+    cache = StageCache(force=force)
+
+    if engine == "minibatch":
+        model, df_clusters = cache.run(
+            "minibatch_kmeans",
+            compute=lambda: _build_minibatch(k, promote),
+            load=_load_model,
+            inputs=[data_prep_marie.PARQUET_PATH],
+            params={"random_state": 42, "k": k, "promote": promote},
+            outputs=[BEST_MODEL_PATH, BUNDLE_PATH, CLUSTERED_DATA_PATH, CLUSTER_QUALITY_PATH],
+            code=code_version(data_prep_marie, sources, KMeanModel, artifacts, inference, cluster_quality,
+                                model_store),
+        )
+    else:
+        model, df_clusters = _build_kmeans(cache, k, compact, promote)
+
+    if not promote:
+        return model, df_clusters
+
+    cache.run(
+        "similarity_index",
+        compute=lambda: _build_similarity_index(df_clusters),
+        load=lambda: None,
+        inputs=[CLUSTERED_DATA_PATH, BUNDLE_PATH],
+        outputs=[SIMILARITY_INDEX_PATH],
+        code=code_version(similarity, inference),
+    )
+    cache.run(
+        "text_index",
+        compute=lambda: FoodTextIndex.build(df_clusters).save(TEXT_INDEX_PATH),
+        load=lambda: None,
+        inputs=[CLUSTERED_DATA_PATH],
+        outputs=[TEXT_INDEX_PATH],
+        code=code_version(text_search, category_mapping),
+    )
+    cache.run(
+        "food_lookup",
+        compute=lambda: FoodLookup.build(df_clusters).save(LOOKUP_DIR),
+        load=lambda: None,
+        inputs=[CLUSTERED_DATA_PATH],
+        outputs=lookup_files(LOOKUP_DIR),
+        code=code_version(lookup, category_mapping),
+    )
+    cache.run(
+        "meal_scorer",
+        compute=lambda: MealScorer.from_frame(df_clusters).save(MEAL_SCORER_PATH),
+        load=lambda: None,
+        inputs=[CLUSTERED_DATA_PATH],
+        outputs=[MEAL_SCORER_PATH],
+        code=code_version(meal_scoring, category_mapping, plate_role_mapping),
+    )
 
-def build_all():
-    df_clean = clean_food_data()
-    df_scaled = scale_food_data()
-    model, df_clusters = kmeanModel()
     # optionally return or save extra artifacts
+    return model, df_clusters
 
 if __name__ == "__main__":
-    build_all()
+    parser = argparse.ArgumentParser(description="Build the NutriMap clustering model.")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild every stage, ignoring the stage cache")
+    parser.add_argument("--k", type=int, default=3,
+                        help="number of clusters (default: 3)")
+    parser.add_argument("--sweep", action="store_true",
+                        help="select k by silhouette over a parallel k/seed sweep")
+    parser.add_argument("--update", metavar="PATH",
+                        help="add the raw foods in PATH (.parquet/.feather/.csv) to the "
+                             "existing clusters instead of rebuilding (see incremental.py)")
+    parser.add_argument("--refit", action="store_true",
+                        help="with --update, warm-start a KMeans refit from the current centroids")
+    parser.add_argument("--apply-updates", action="store_true",
+                        help="merge the foods added with --update into the clustered data and "
+                             "rebuild the served indexes (deferred, linear in all foods)")
+    parser.add_argument("--engine", choices=["kmeans", "minibatch"], default="kmeans",
+                        help="full-batch KMeans on the generic foods, or out-of-core "
+                             "MiniBatchKMeans on all foods (default: kmeans)")
+    parser.add_argument("--compact", action="store_true",
+                        help="memory-lean cleaning: float32 nutrients, Arrow-backed names, "
+                             "hashed duplicate removal")
+    parser.add_argument("--no-promote", action="store_true",
+                        help="store the rebuilt model as a new version without serving it "
+                             "(python -m nutrimap_app.model_store promote VERSION)")
+    parser.add_argument("--profile", metavar="REPORT.json",
+                        help="write per-stage wall/CPU time, peak RSS and row counts "
+                             "of the build to REPORT.json (see profiling.py)")
+    parser.add_argument("--cpu-profile", choices=["cprofile", "pyinstrument"],
+                        help="with --profile, also dump a function-level profile next to the report")
+    args = parser.parse_args()
+    if args.sweep and args.engine == "minibatch":
+        parser.error("--sweep is only available with --engine kmeans")
+
+    if args.update:
+        from nutrimap_app.incremental import update_clusters
+
+        update = update_clusters(read_frame(args.update), refit=args.refit)
+        print(f"{len(update.new_foods)} new foods clustered"
+              f"{f', {update.relabelled} existing foods relabelled' if update.refitted else ''}")
+        for reason in update.drift.reasons:
+            print(f"drift: {reason}")
+        if update.drift.needs_rebuild:
+            print("A full rebuild is recommended: python -m nutrimap_app.model --force")
+        print("Serve them from the indexes with: python -m nutrimap_app.model --apply-updates")
+    elif args.apply_updates:
+        from nutrimap_app.incremental import apply_updates
+
+        print(f"{apply_updates()} pending foods merged, indexes rebuilt")
+    elif args.profile:
+        with profile_pipeline(args.profile, cpu_profile=args.cpu_profile) as profiler:
+            build_all(force=args.force, k=None if args.sweep else args.k, engine=args.engine,
+                      compact=args.compact, promote=not args.no_promote)
+        for row in profiler.report()["stages"]:
+            print(f"{row['stage']:<32} {row['wall_s']:>9.3f}s  {row['peak_rss_delta_mb']:>8.1f} MB")
+        print(f"Profile written to {args.profile}")
+    else:
+        build_all(force=args.force, k=None if args.sweep else args.k, engine=args.engine,
+                  compact=args.compact, promote=not args.no_promote)
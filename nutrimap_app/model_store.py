@@ -0,0 +1,318 @@
+"""Versioned store of the trained model artifacts, with promotion and rollback.
+
+Every build publishes its artifacts (best_model.pkl, inference_bundle.npz)
+to models/store as a new version:
+- objects/<sha256><suffix>: the artifact files, named by the hash of their
+  content, so identical files are stored once and never modified,
+- versions/<version>.json: the manifest of a version: its artifacts, the
+  metrics of the model (inertia per row, sampled silhouette, see
+  cluster_quality), the hash of the training data, k and the seed,
+- current.json: the pointer to the served version, with the history of
+  the versions served before it.
+
+Files are written next to their destination and renamed over it
+(os.replace), so a reader sees the old file or the new one, never half a
+file. Promoting a version only rewrites the pointer: every API worker
+checks it on its reload interval and swaps the new bundle in without a
+restart (see registry.py). A rollback is the same pointer swap, back to
+the last version of the history; rolling back again steps further back.
+
+    python -m nutrimap_app.model_store list
+    python -m nutrimap_app.model_store promote VERSION
+    python -m nutrimap_app.model_store rollback
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Mapping, Optional
+
+import numpy as np
+
+from nutrimap_app.json_utils import json_safe
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MODELS_DIR = PROJECT_ROOT / "models"
+STORE_DIR = MODELS_DIR / "store"
+
+# Artifact names in the manifests
+MODEL_ARTIFACT = "best_model"
+BUNDLE_ARTIFACT = "inference_bundle"
+
+# Hex digits of a version id
+VERSION_LENGTH = 12
+
+_CHUNK_BYTES = 1 << 20
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _temp_path(directory: Path, prefix: str) -> Path:
+    """A new, unique (per process and thread) empty file in directory."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=prefix, suffix=".tmp",
+                                     delete=False) as f:
+        # readable by the API workers once renamed (mkstemp creates it 0600)
+        os.chmod(f.name, 0o644)
+        return Path(f.name)
+
+
+def replace_atomically(path, write) -> Path:
+    """
+    Write a file next to `path`, then rename it over `path`.
+
+    Parameters
+    ----------
+    path : str or Path
+        Destination.
+    write : callable
+        Called with the temporary path; writes the content.
+    """
+    path = Path(path)
+    tmp = _temp_path(path.parent, f".{path.name}.")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return path
+
+
+def _write_json(path: Path, data: dict) -> Path:
+    # undefined metrics (NaN) as null, so the manifests stay valid JSON
+    text = json.dumps(json_safe(data), indent=2, allow_nan=False) + "\n"
+    return replace_atomically(path, lambda tmp: tmp.write_text(text))
+
+
+class DataHasher:
+    """data_hash() of a matrix whose rows arrive in chunks.
+
+    update() the chunks in order, then hexdigest().
+    """
+
+    def __init__(self):
+        self._digest = hashlib.sha256()
+        self._shape = None
+
+    def update(self, X) -> "DataHasher":
+        X = np.ascontiguousarray(X, dtype="float64")
+        self._shape = (X.shape if self._shape is None else
+                       (self._shape[0] + X.shape[0],) + X.shape[1:])
+        self._digest.update(X.data)
+        return self
+
+    def hexdigest(self) -> str:
+        # the shape goes last, it is only known once every chunk is seen
+        digest = self._digest.copy()
+        digest.update(str(self._shape).encode())
+        return digest.hexdigest()
+
+
+def data_hash(X) -> str:
+    """sha256 of a numeric matrix (float64 values and shape)."""
+    return DataHasher().update(X).hexdigest()
+
+
+class ModelStore:
+    """Content-addressed model artifacts, version manifests and the served pointer."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.versions_dir = self.root / "versions"
+        self.pointer_path = self.root / "current.json"
+
+    # ---------------------------------------------------
+    # Publishing
+    # ---------------------------------------------------
+
+    def _put_object(self, path: Path) -> dict:
+        """Copy a file into objects/, hashing it on the way."""
+        digest = hashlib.sha256()
+        tmp = _temp_path(self.objects_dir, ".incoming.")
+        try:
+            with open(path, "rb") as src, open(tmp, "wb") as dst:
+                while chunk := src.read(_CHUNK_BYTES):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            sha256 = digest.hexdigest()
+            target = self.objects_dir / f"{sha256}{path.suffix}"
+            if not target.exists():
+                os.replace(tmp, target)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return {"sha256": sha256, "object": target.name, "size": target.stat().st_size}
+
+    def publish(self, artifacts: Mapping[str, Path], k: Optional[int] = None,
+                seed: Optional[int] = None, data_hash: Optional[str] = None,
+                metrics: Optional[dict] = None, parent: Optional[str] = None) -> dict:
+        """
+        Store artifact files as a new version (without serving it).
+
+        Parameters
+        ----------
+        artifacts : mapping
+            Artifact name (MODEL_ARTIFACT, BUNDLE_ARTIFACT) -> file.
+        k, seed : int, optional
+            Clustering parameters.
+        data_hash : str, optional
+            Hash of the training features (see data_hash()).
+        metrics : dict, optional
+            Model metrics, e.g. {"inertia_per_row": ..., "silhouette": ...}.
+        parent : str, optional
+            Version this one was derived from (incremental refit).
+
+        Returns
+        -------
+        dict
+            The manifest. Its "version" is derived from the artifact hashes
+            and parameters: publishing the same model again returns the
+            existing manifest.
+        """
+        stored = {name: self._put_object(Path(path)) for name, path in sorted(artifacts.items())}
+        identity = {"artifacts": {name: a["sha256"] for name, a in stored.items()},
+                    "k": k, "seed": seed, "data_hash": data_hash}
+        version = hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+        version = version[:VERSION_LENGTH]
+
+        manifest_path = self.versions_dir / f"{version}.json"
+        if manifest_path.exists():
+            return self.manifest(version)
+
+        manifest = {
+            "version": version,
+            "created_at": _now(),
+            "k": k,
+            "seed": seed,
+            "data_hash": data_hash,
+            "metrics": metrics or {},
+            "parent": parent,
+            "artifacts": stored,
+        }
+        _write_json(manifest_path, manifest)
+        return manifest
+
+    # ---------------------------------------------------
+    # Reading
+    # ---------------------------------------------------
+
+    def manifest(self, version: str) -> dict:
+        path = self.versions_dir / f"{version}.json"
+        if not path.exists():
+            raise ValueError(f"Unknown model version '{version}' in {self.root}")
+        return json.loads(path.read_text())
+
+    def versions(self) -> List[dict]:
+        """Manifests of all versions, oldest first."""
+        if not self.versions_dir.exists():
+            return []
+        manifests = [json.loads(p.read_text()) for p in self.versions_dir.glob("*.json")]
+        return sorted(manifests, key=lambda m: (m["created_at"], m["version"]))
+
+    def resolve(self, version: str) -> str:
+        """Full version id from a unique prefix."""
+        matches = [m["version"] for m in self.versions() if m["version"].startswith(version)]
+        if len(matches) != 1:
+            raise ValueError(f"'{version}' matches {len(matches)} model versions, expected 1")
+        return matches[0]
+
+    def pointer(self) -> Optional[dict]:
+        """{"version", "history", "promoted_at"} of the served version, or None.
+
+        history lists the versions served before, the most recent last.
+        """
+        try:
+            return json.loads(self.pointer_path.read_text())
+        except FileNotFoundError:
+            return None
+
+    def current_version(self) -> Optional[str]:
+        pointer = self.pointer()
+        return None if pointer is None else pointer["version"]
+
+    def artifact_path(self, name: str, version: Optional[str] = None) -> Path:
+        """File of an artifact of a version (default: the served one)."""
+        version = version or self.current_version()
+        if version is None:
+            raise ValueError(f"No model version is promoted in {self.root}")
+        artifacts = self.manifest(version)["artifacts"]
+        if name not in artifacts:
+            raise ValueError(f"Model version '{version}' has no artifact '{name}'")
+        return self.objects_dir / artifacts[name]["object"]
+
+    # ---------------------------------------------------
+    # Serving
+    # ---------------------------------------------------
+
+    def _swap_pointer(self, version: str, history: List[str]) -> dict:
+        pointer = {"version": version, "history": history, "promoted_at": _now()}
+        _write_json(self.pointer_path, pointer)
+        return pointer
+
+    def promote(self, version: str) -> dict:
+        """Serve `version`: one atomic rewrite of the pointer."""
+        self.manifest(version)
+        pointer = self.pointer()
+        if pointer is None:
+            return self._swap_pointer(version, [])
+        if version == pointer["version"]:
+            return pointer
+        return self._swap_pointer(version, pointer["history"] + [pointer["version"]])
+
+    def rollback(self) -> dict:
+        """Serve the version served before the current one; repeat to go further back."""
+        pointer = self.pointer()
+        if pointer is None or not pointer["history"]:
+            raise ValueError(f"No previous model version to roll back to in {self.root}")
+        return self._swap_pointer(pointer["history"][-1], pointer["history"][:-1])
+
+
+def format_versions(store: ModelStore) -> List[str]:
+    current = store.current_version()
+    lines = [f"  {'version':<{VERSION_LENGTH}}  {'created (UTC)':<25} {'k':>3} {'seed':>5} "
+             f"{'silhouette':>10} {'inertia/row':>11}"]
+    for m in store.versions():
+        metrics = m["metrics"]
+        silhouette = metrics.get("silhouette")
+        inertia = metrics.get("inertia_per_row")
+        lines.append(
+            f"{'*' if m['version'] == current else ' '} {m['version']:<{VERSION_LENGTH}}  "
+            f"{m['created_at']:<25} {m['k'] if m['k'] is not None else '':>3} "
+            f"{m['seed'] if m['seed'] is not None else '':>5} "
+            f"{'' if silhouette is None else f'{silhouette:.3f}':>10} "
+            f"{'' if inertia is None else f'{inertia:.4f}':>11}"
+        )
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List, promote and roll back NutriMap model versions.")
+    parser.add_argument("--store", default=STORE_DIR, help="store directory (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="all versions, * marks the served one")
+    promote = commands.add_parser("promote", help="serve a version (a unique prefix is enough)")
+    promote.add_argument("version")
+    commands.add_parser("rollback", help="serve the version served before the current one")
+    args = parser.parse_args()
+
+    store = ModelStore(args.store)
+    try:
+        if args.command == "list":
+            print("\n".join(format_versions(store)))
+        elif args.command == "promote":
+            print("Serving model version", store.promote(store.resolve(args.version))["version"])
+        else:
+            print("Rolled back to model version", store.rollback()["version"])
+    except ValueError as e:
+        parser.error(str(e))
@@ -1,24 +1,33 @@
-import os
-import pickle
+from nutrimap_app.model_store import ModelStore
+from nutrimap_app.registry import ModelRegistry
 
-ROOT_PATH = os.path.dirname(os.path.dirname(__file__))
+# Loaded on first use and kept for the lifetime of the process
+_registry = ModelRegistry(store=ModelStore())
 
-def my_prediction_function(sepal_length, sepal_width, petal_length, petal_width):
+def my_prediction_function(fat_g, satfat_g, carbs_g, protein_g, fiber_g, energy_kcal_calculated):
     """Prediction function using a pretrained model loaded from disk
 
+    The inference bundle is loaded once and reused by later calls (see registry.py).
+
     Arguments:
-    - sepal_length
-    - sepal_width
-    - petal_length
-    - petal_width
+    - fat_g
+    - satfat_g
+    - carbs_g
+    - protein_g
+    - fiber_g
+    - energy_kcal_calculated
     """
-    # Load the model from the pickle file
-    model_path = os.path.join(ROOT_PATH, 'models', 'best_model.pkl')
-    with open(model_path, 'rb') as file:
-        model = pickle.load(file)
+    nutrients = {
+        "fat_g": fat_g,
+        "satfat_g": satfat_g,
+        "carbs_g": carbs_g,
+        "protein_g": protein_g,
+        "fiber_g": fiber_g,
+        "energy_kcal_calculated": energy_kcal_calculated,
+    }
 
     # Use the model to predict the given inputs
-    prediction = model.predict([[sepal_length, sepal_width, petal_length, petal_width]])
+    prediction = _registry.predict_columns(nutrients)
 
     return prediction
 
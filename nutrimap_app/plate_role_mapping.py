@@ -0,0 +1,115 @@
+
+import numpy as np
+
+# Roles shown on the plate (P/V/C); "fat" is kept internal so a swap never
+# replaces chicken with olive oil, "other" covers fruit and sweets
+PLATE_ROLES = ["protein", "carb", "veg", "fat", "other"]
+
+# Default role of every food group from category_mapping.FOOD_GROUPS.
+# None means "decide from the macro shares" (see assign_plate_roles).
+FOOD_GROUP_ROLES = {
+    "oils_fats": "fat",
+    "nuts_seeds": "fat",
+    "dairy_lean": "protein",
+    "dairy_fatty": None,
+    "legumes_pulses": "protein",
+    "eggs": "protein",
+    "fish_seafood": "protein",
+    "poultry": "protein",
+    "meat_red": "protein",
+    "sweets_snacks": "other",
+    "fruit_sweet": "other",
+    "nonstarchy_veg": "veg",
+    "starchy_veg": "carb",
+    "grain_starch": "carb",
+    "mixed/other": None,
+}
+
+# Macro share thresholds (share of kcal)
+PROTEIN_KCAL_SHARE = 0.35
+CARB_KCAL_SHARE = 0.55
+
+
+def plate_role_codes(columns, group_codes=None):
+    """
+    Plate role of every food, as codes into PLATE_ROLES.
+
+    The role comes from the food group when it is unambiguous. Otherwise
+    (fatty dairy, mixed/other) it is decided from the macros:
+      - Protein: protein share of kcal >= 0.35
+      - Carb: carb share of kcal >= 0.55
+      - fatty dairy otherwise counts as fat, mixed foods as other
+    Needs NumPy only.
+
+    Parameters
+    ----------
+    columns : pandas.DataFrame or mapping of str -> array-like
+        Foods with energy_kcal_calculated, protein_g and carbs_g.
+    group_codes : array-like of int, optional
+        Food group of every food, as codes into category_mapping.FOOD_GROUPS
+        (category_mapping.food_group_codes); computed when not given.
+
+    Returns
+    -------
+    numpy.ndarray of int8
+    """
+
+    from nutrimap_app.category_mapping import FOOD_GROUPS, food_group_codes
+
+    if group_codes is None:
+        group_codes = food_group_codes(columns)
+    group_codes = np.asarray(group_codes)
+
+    kcal = np.maximum(np.asarray(columns["energy_kcal_calculated"], dtype="float64"), 1e-6)
+    protein_share = 4 * np.asarray(columns["protein_g"], dtype="float64") / kcal
+    carb_share = 4 * np.asarray(columns["carbs_g"], dtype="float64") / kcal
+
+    # role code per food group, then one take over the codes
+    group_roles = np.array(
+        [PLATE_ROLES.index(FOOD_GROUP_ROLES[g]) if FOOD_GROUP_ROLES.get(g) else -1
+         for g in FOOD_GROUPS],
+        dtype="int8",
+    )
+    by_group = group_roles[group_codes]
+
+    is_fatty_dairy = group_codes == FOOD_GROUPS.index("dairy_fatty")
+    fallback = np.where(is_fatty_dairy, PLATE_ROLES.index("fat"), PLATE_ROLES.index("other"))
+
+    return np.select(
+        [by_group >= 0, protein_share >= PROTEIN_KCAL_SHARE, carb_share >= CARB_KCAL_SHARE],
+        [by_group, PLATE_ROLES.index("protein"), PLATE_ROLES.index("carb")],
+        default=fallback,
+    ).astype("int8")
+
+
+def assign_plate_roles(df, food_groups=None):
+    """
+    Assign a plate role (PLATE_ROLES) to every food (plate_role_codes as a
+    categorical Series).
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Foods with energy_kcal_calculated, protein_g and carbs_g.
+    food_groups : pandas.Series, optional
+        Food groups aligned with df (category_mapping.assign_food_groups);
+        computed when not given.
+
+    Returns
+    -------
+    pandas.Series
+        Categorical series (categories PLATE_ROLES) aligned on df.index.
+    """
+    import pandas as pd
+
+    from nutrimap_app.category_mapping import FOOD_GROUPS
+
+    group_codes = None
+    if food_groups is not None:
+        group_codes = pd.Categorical(food_groups, categories=FOOD_GROUPS).codes
+
+    return pd.Series(
+        pd.Categorical.from_codes(plate_role_codes(df, group_codes), categories=PLATE_ROLES),
+        index=df.index,
+        name="plate_role",
+    )
@@ -0,0 +1,258 @@
+"""Per-stage instrumentation of the pipeline.
+
+The pipeline functions (data_prep_marie, KMeanModel, model.build_all) wrap
+their steps in `with stage("clean.drop_duplicates", rows_in=len(df)) as s:`
+and set `s.rows_out`. Without an active profiler this is a no-op. Inside
+`profile_pipeline(...)` every stage records:
+- wall time and CPU time (process_time, all threads of this process),
+- peak RSS delta: how far the resident memory rose above its level at the
+  start of the stage (Linux: the peak is reset per stage through
+  /proc/self/clear_refs; elsewhere the process-lifetime ru_maxrss is used,
+  which only shows stages that set a new peak),
+- rows in and out.
+
+A stage that runs many times (e.g. once per parquet row group) is reported
+once, with its number of calls and summed times and rows. Stages can be
+nested; the report keeps them in the order they first started.
+
+    with profile_pipeline("profile.json", cpu_profile="cprofile"):
+        build_all(force=True)
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_STATUS = Path("/proc/self/status")
+_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+# Active profiler, set by profile_pipeline()
+_active: Optional["PipelineProfiler"] = None
+
+
+def _status_kb(field: str) -> Optional[int]:
+    try:
+        for line in _STATUS.read_text().splitlines():
+            if line.startswith(field):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak() -> bool:
+    """Reset the kernel's peak RSS (VmHWM) to the current RSS, Linux only."""
+    try:
+        _CLEAR_REFS.write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def _maxrss_kb() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class StageStats:
+    """Accumulated measurements of one named stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_rss_delta_mb = 0.0
+        self.rows_in: Optional[int] = None
+        self.rows_out: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "calls": self.calls,
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "peak_rss_delta_mb": round(self.peak_rss_delta_mb, 1),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+        }
+
+
+class _Call:
+    """One running stage; rows_out is set by the caller."""
+
+    def __init__(self, rows_in: Optional[int] = None):
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.peak_kb = 0
+        # set when the block turned out to do no work (end of an iterator)
+        self.discard = False
+
+
+def _add_rows(total: Optional[int], rows: Optional[int]) -> Optional[int]:
+    if rows is None:
+        return total
+    return rows if total is None else total + int(rows)
+
+
+class PipelineProfiler:
+    """Collects StageStats for the stages run while it is active."""
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {}
+        self._stack: List[_Call] = []
+        self._track_peak = _reset_peak() and _status_kb("VmHWM:") is not None
+        self.started = time.perf_counter()
+
+    def _peak_kb(self) -> int:
+        return _status_kb("VmHWM:") if self._track_peak else _maxrss_kb()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        call = _Call(rows_in)
+        rss_start = (_status_kb("VmRSS:") if self._track_peak else _maxrss_kb()) or 0
+        if self._track_peak:
+            # a parent keeps the highest peak seen by its children
+            if self._stack:
+                self._stack[-1].peak_kb = max(self._stack[-1].peak_kb, self._peak_kb())
+            _reset_peak()
+        self._stack.append(call)
+        # registered on entry, so a parent is listed before its children
+        stats = self.stages.setdefault(name, StageStats(name))
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield call
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._stack.pop()
+            call.peak_kb = max(call.peak_kb, self._peak_kb() or 0)
+            if self._stack:
+                self._stack[-1].peak_kb = max(self._stack[-1].peak_kb, call.peak_kb)
+
+            if call.discard:
+                if not stats.calls:
+                    del self.stages[name]
+                return
+            stats.calls += 1
+            stats.wall_s += wall
+            stats.cpu_s += cpu
+            stats.peak_rss_delta_mb = max(stats.peak_rss_delta_mb,
+                                          max(call.peak_kb - rss_start, 0) / 1024)
+            stats.rows_in = _add_rows(stats.rows_in, call.rows_in)
+            stats.rows_out = _add_rows(stats.rows_out, call.rows_out)
+
+    def report(self) -> dict:
+        return {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "peak_rss_per_stage": self._track_peak,
+            "total_wall_s": round(time.perf_counter() - self.started, 6),
+            "stages": [stats.to_dict() for stats in self.stages.values()],
+        }
+
+
+@contextmanager
+def stage(name: str, rows_in: Optional[int] = None):
+    """Measure a pipeline step when a profiler is active, else do nothing.
+
+    Yields an object whose `rows_out` attribute the caller may set.
+    """
+    if _active is None:
+        yield _Call(rows_in)
+        return
+    with _active.stage(name, rows_in) as call:
+        yield call
+
+
+def timed_iter(name: str, iterable):
+    """Yield from iterable, measuring the time spent producing each item
+    (e.g. reading a parquet row group) as stage `name`."""
+    iterator = iter(iterable)
+    while True:
+        with stage(name) as call:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                call.discard = True
+                return
+            call.rows_out = len(item) if hasattr(item, "__len__") else None
+        yield item
+
+
+@contextmanager
+def profile_pipeline(report_path=None, cpu_profile: Optional[str] = None,
+                     cpu_profile_path=None):
+    """
+    Profile the pipeline stages run inside the block.
+
+    Parameters
+    ----------
+    report_path : str or Path, optional
+        Where to write the JSON report (see PipelineProfiler.report).
+    cpu_profile : {"cprofile", "pyinstrument"}, optional
+        Also record a function-level profile of the whole block.
+    cpu_profile_path : str or Path, optional
+        Output of the function-level profile; defaults to the report path
+        with a .prof (cProfile, for pstats/snakeviz) or .html
+        (pyinstrument) suffix.
+
+    Yields
+    ------
+    PipelineProfiler
+    """
+    global _active
+
+    if cpu_profile not in (None, "cprofile", "pyinstrument"):
+        raise ValueError(f"Unknown cpu_profile '{cpu_profile}', use 'cprofile' or 'pyinstrument'")
+
+    if cpu_profile_path is None and cpu_profile is not None:
+        base = Path(report_path or "pipeline_profile.json")
+        cpu_profile_path = base.with_suffix(".prof" if cpu_profile == "cprofile" else ".html")
+
+    profiler = PipelineProfiler()
+    cpu_profiler = None
+    if cpu_profile == "cprofile":
+        import cProfile
+        cpu_profiler = cProfile.Profile()
+        cpu_profiler.enable()
+    elif cpu_profile == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise ImportError("cpu_profile='pyinstrument' needs `pip install pyinstrument`") from e
+        cpu_profiler = Profiler()
+        cpu_profiler.start()
+
+    previous, _active = _active, profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+
+        if cpu_profile == "cprofile":
+            cpu_profiler.disable()
+            Path(cpu_profile_path).parent.mkdir(parents=True, exist_ok=True)
+            cpu_profiler.dump_stats(str(cpu_profile_path))
+        elif cpu_profile == "pyinstrument":
+            cpu_profiler.stop()
+            Path(cpu_profile_path).parent.mkdir(parents=True, exist_ok=True)
+            Path(cpu_profile_path).write_text(cpu_profiler.output_html())
+
+        if report_path is not None:
+            report_path = Path(report_path)
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            report_path.write_text(json.dumps(profiler.report(), indent=2))
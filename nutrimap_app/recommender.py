@@ -0,0 +1,162 @@
+"""Suggest foods that close the gap between a plate and EFSA_RI.
+
+For a partial plate, the gap is what is still missing to each reference
+intake and the budget is the kcal left. Every candidate food gets the
+portion (in grams) that best closes the gap within the budget:
+
+    score(p) = sum_j min(p * n_j, gap_j) / RI_j  -  OVERSHOOT_PENALTY * sum_j max(p * n_j - gap_j, 0) / RI_j
+
+score(p) is piecewise linear and concave in p, so its maximum is at one of
+the breakpoints gap_j / n_j or at the largest allowed portion. All
+candidates and breakpoints are scored as one matrix and the top k are
+taken with argpartition.
+
+To keep requests fast on 500k foods, candidates are pruned to precomputed
+per-food-group shortlists: for every group and nutrient, the foods with the
+most of that nutrient per kcal.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from nutrimap_app.category_mapping import FOOD_GROUPS
+from nutrimap_app.meal_scoring import Meal, MealScorer
+
+# Largest portion of a single suggested food, in grams
+MAX_PORTION_G = 300.0
+
+# Weight of overshooting a reference intake, relative to closing the gap
+OVERSHOOT_PENALTY = 0.5
+
+# Foods kept per (food group, nutrient) in the shortlists
+SHORTLIST_SIZE = 500
+
+
+class MealRecommender:
+    """Gap-filling recommendations over a MealScorer's nutrient matrix."""
+
+    def __init__(self, scorer: MealScorer, shortlist_size: int = SHORTLIST_SIZE):
+        self.scorer = scorer
+        self.energy_col = scorer.ri_keys.index("energy_kcal")
+        self.gap_cols = [j for j in range(len(scorer.ri_keys)) if j != self.energy_col]
+        self.shortlists = self._build_shortlists(shortlist_size)
+
+    def _build_shortlists(self, shortlist_size: int) -> dict:
+        """Row ids per food group: the most nutrient-dense foods per kcal."""
+        nutrients = self.scorer.nutrients
+        kcal = np.maximum(nutrients[:, self.energy_col], 1.0)
+        codes = self.scorer.group_codes
+
+        shortlists = {}
+        for code, group in enumerate(FOOD_GROUPS):
+            rows = np.flatnonzero(codes == code)
+            if len(rows) == 0:
+                continue
+
+            selected = []
+            for j in self.gap_cols:
+                density = nutrients[rows, j] / kcal[rows]
+                n = min(shortlist_size, len(rows))
+                selected.append(rows[np.argpartition(-density, n - 1)[:n]])
+            shortlists[group] = np.unique(np.concatenate(selected))
+
+        return shortlists
+
+    def candidates(self, food_groups: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Shortlisted row ids, optionally restricted to some food groups."""
+        groups = self.shortlists if food_groups is None else list(food_groups)
+        lists = [self.shortlists[g] for g in groups if g in self.shortlists]
+        if not lists:
+            return np.array([], dtype="int64")
+        return np.unique(np.concatenate(lists))
+
+    def recommend(
+        self,
+        meal: Meal,
+        kcal_budget: Optional[float] = None,
+        food_groups: Optional[Iterable[str]] = None,
+        k: int = 5,
+    ) -> List[dict]:
+        """
+        Foods (and portions) that best close the gap to EFSA_RI.
+
+        Parameters
+        ----------
+        meal : sequence of (food_item, grams)
+            The partial plate, may be empty.
+        kcal_budget : float, optional
+            kcal allowed for the whole plate, defaults to the EFSA energy RI.
+        food_groups : iterable of str, optional
+            Only suggest foods from these groups (category_mapping.FOOD_GROUPS).
+        k : int
+            Number of suggestions.
+
+        Returns
+        -------
+        list of dict
+            food_item, grams, food_group, plate_role, score and the percent
+            of EFSA_RI of the plate with the suggestion added, best first.
+        """
+        scorer = self.scorer
+        ri = scorer.ri
+
+        if meal:
+            totals = scorer.totals_many([meal])[0]
+        else:
+            totals = np.zeros(len(ri))
+        if kcal_budget is None:
+            kcal_budget = ri[self.energy_col]
+        kcal_left = kcal_budget - totals[self.energy_col]
+        if kcal_left <= 0:
+            return []
+
+        rows = self.candidates(food_groups)
+        if meal:
+            rows = np.setdiff1d(rows, scorer.rows(name for name, _ in meal))
+        if len(rows) == 0:
+            return []
+
+        gap = np.maximum(ri - totals, 0)[self.gap_cols]
+        ri_gap = ri[self.gap_cols]
+
+        per_gram = scorer.nutrients[rows] / 100
+        n = per_gram[:, self.gap_cols]
+        kcal_per_gram = np.maximum(per_gram[:, self.energy_col], 1e-6)
+
+        # largest portion allowed by the budget, then the breakpoints below it
+        max_portion = np.minimum(MAX_PORTION_G, kcal_left / kcal_per_gram)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            breakpoints = np.where(n > 0, gap / n, np.inf)
+        portions = np.minimum(np.column_stack([breakpoints, max_portion]), max_portion[:, None])
+
+        # score every (candidate, portion) pair at once
+        amounts = portions[:, :, None] * n[:, None, :]
+        closed = np.minimum(amounts, gap) / ri_gap
+        overshoot = np.maximum(amounts - gap, 0) / ri_gap
+        scores = (closed - OVERSHOOT_PENALTY * overshoot).sum(axis=2)
+
+        best_portion = scores.argmax(axis=1)
+        best_score = scores[np.arange(len(rows)), best_portion]
+        grams = portions[np.arange(len(rows)), best_portion]
+
+        k = min(k, len(rows))
+        top = np.argpartition(-best_score, k - 1)[:k]
+        top = top[np.argsort(-best_score[top])]
+        top = top[best_score[top] > 0]
+
+        results = []
+        for i in top:
+            row = rows[i]
+            after = totals + scorer.nutrients[row] * grams[i] / 100
+            results.append({
+                "food_item": scorer.food_items[row],
+                "grams": round(float(grams[i]), 1),
+                "food_group": scorer.food_group(row),
+                "plate_role": scorer.plate_role(row),
+                "score": round(float(best_score[i]), 4),
+                "pct_ri_after": dict(zip(scorer.ri_keys, scorer.percent_ri(after).round(1).tolist())),
+            })
+        return results
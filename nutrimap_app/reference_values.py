@@ -3,7 +3,7 @@ EFSA_RI = {
     "energy_kcal": 666,
     "protein_g": 17,
     "carbs_g": 86,
-    "sugar_g": 30
+    "sugar_g": 30,
     "fat_g": 23,
     "fiber_g": 10
-}
\ No newline at end of file
+}
@@ -0,0 +1,137 @@
+"""In-process model registry for the API.
+
+The inference bundle (feature order, scaler parameters and KMeans
+centroids, see inference.py) is loaded once at app startup and shared by
+all requests. When the file on disk changes, reload_if_changed() loads the
+new bundle first and then swaps the reference in one assignment, so a
+request sees either the old or the new model, never a mix of both.
+
+With a model store (model_store.py), the served bundle is the one of the
+version its pointer names, and a change of the pointer (promotion or
+rollback) is what triggers the reload: every worker process follows it on
+its next check, without a restart. Without a store, or while no version is
+promoted yet, the bundle file at bundle_path is served.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.model_store import BUNDLE_ARTIFACT, ModelStore
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MODELS_DIR = PROJECT_ROOT / "models"
+
+BUNDLE_PATH = MODELS_DIR / "inference_bundle.npz"
+
+
+class LoadedModel(NamedTuple):
+    bundle: InferenceBundle
+    version: tuple
+
+
+def _file_version(path: Path) -> Optional[tuple]:
+    """(mtime_ns, size) of a file, or None when it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ModelRegistry:
+    """Holds the currently served model and reloads it when it changes on disk."""
+
+    def __init__(self, bundle_path: Path = BUNDLE_PATH, store: Optional[ModelStore] = None):
+        self.bundle_path = Path(bundle_path)
+        self.store = store
+        self._current: Optional[LoadedModel] = None
+        self._lock = threading.Lock()
+
+    def _source(self) -> Tuple[Path, Optional[tuple]]:
+        """File of the bundle to serve and its version."""
+        if self.store is not None:
+            model_version = self.store.current_version()
+            if model_version is not None:
+                return self.store.artifact_path(BUNDLE_ARTIFACT, model_version), ("store", model_version)
+        return self.bundle_path, _file_version(self.bundle_path)
+
+    def _load_file(self) -> LoadedModel:
+        path, version = self._source()
+        return LoadedModel(InferenceBundle.load(path), version)
+
+    def load(self) -> LoadedModel:
+        """Load the bundle from disk and make it the served one."""
+        with self._lock:
+            self._current = self._load_file()
+            return self._current
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._current is not None
+
+    @property
+    def model_version(self) -> Optional[str]:
+        """Model store version of the served bundle (None when not from the store)."""
+        if self._current is None or self._current.version is None or self._current.version[0] != "store":
+            return None
+        return self._current.version[1]
+
+    @property
+    def current(self) -> LoadedModel:
+        if self._current is None:
+            if not self.reload_if_changed():
+                raise RuntimeError(
+                    f"No inference bundle found at {self.bundle_path}; "
+                    "rebuild the model with nutrimap_app.model"
+                )
+        return self._current
+
+    def reload_if_changed(self) -> bool:
+        """Reload the bundle when the file on disk (or the promoted version) changed.
+
+        The old model keeps being served while the new one is loaded, and
+        also when loading fails (missing, half-written or corrupt file,
+        unknown version): the next check tries again.
+
+        Returns
+        -------
+        bool
+            True if a new model was swapped in.
+        """
+        try:
+            if self._current is not None and self._source()[1] == self._current.version:
+                return False
+        except Exception:
+            return False
+
+        with self._lock:
+            try:
+                if self._current is not None and self._source()[1] == self._current.version:
+                    return False
+                loaded = self._load_file()
+            except Exception:
+                # e.g. zipfile.BadZipFile from a truncated .npz
+                return False
+            self._current = loaded
+            return True
+
+    def predict(self, X) -> np.ndarray:
+        """Predict cluster labels for raw (unscaled) nutrient rows.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_rows, n_features)
+            Nutrient values in the order of the bundle's `feature_cols`.
+        """
+        return self.current.bundle.predict(X)
+
+    def predict_columns(self, columns: Mapping) -> np.ndarray:
+        """Predict cluster labels from a mapping of nutrient columns."""
+        return self.current.bundle.predict_columns(columns)
@@ -0,0 +1,185 @@
+"""Nearest-food search over the scaled nutrient vectors.
+
+A KD-tree is built once at pipeline time over the same MinMax-scaled
+features the KMeans model uses and saved as one .npz of plain arrays next
+to the inference bundle:
+- points: the scaled vectors, reordered so that every tree node covers a
+  contiguous slice [node_start, node_end) of them,
+- node_start / node_end / node_left / node_right: the nodes (the children
+  of a leaf are -1), node_lower / node_upper: their bounding boxes,
+- names / name_offsets: the utf-8 food names as one byte blob, in the
+  order of points.
+
+A top-k query visits the nodes closest box first and stops once the
+closest unvisited box is further than the k-th match, so it scans
+O(log n) leaves instead of every food. Building, saving and querying need
+NumPy only: the API loads the index without scikit-learn or pickle.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections import Counter
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MODELS_DIR = PROJECT_ROOT / "models"
+
+SIMILARITY_INDEX_PATH = MODELS_DIR / "similarity_index.npz"
+
+# Foods per leaf: larger leaves mean fewer nodes visited (one Python step
+# each) and more distances per NumPy call
+LEAF_SIZE = 128
+
+
+class FoodSimilarityIndex:
+    """KD-tree over scaled nutrient vectors, with the matching food names."""
+
+    def __init__(self, arrays: dict):
+        self.arrays = arrays
+        self.points = arrays["points"]
+        self.lower = arrays["node_lower"]
+        self.upper = arrays["node_upper"]
+        # plain lists: the query walks them one node at a time
+        self.node_start = arrays["node_start"].tolist()
+        self.node_end = arrays["node_end"].tolist()
+        self.node_left = arrays["node_left"].tolist()
+        self.node_right = arrays["node_right"].tolist()
+
+        blob, offsets = arrays["names"].tobytes(), arrays["name_offsets"].tolist()
+        self.food_items = [blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+                           for i in range(len(offsets) - 1)]
+        self._rows = {name: i for i, name in enumerate(self.food_items)}
+        # rows per name, when a name is used by several foods
+        self._duplicates = {name: n for name, n in Counter(self.food_items).items() if n > 1}
+
+    @classmethod
+    def build(cls, food_items, X_scaled, leaf_size: int = LEAF_SIZE) -> "FoodSimilarityIndex":
+        """
+        Build the index.
+
+        Parameters
+        ----------
+        food_items : array-like of str
+            Food names, one per row of X_scaled.
+        X_scaled : array-like of shape (n_foods, n_features)
+            Scaled nutrient vectors (e.g. InferenceBundle.transform output).
+        leaf_size : int
+            Maximum number of foods in a leaf.
+        """
+        X_scaled = np.ascontiguousarray(X_scaled, dtype="float64")
+        order = np.arange(len(X_scaled))
+
+        # node arrays, the root first; a node is split when popped
+        n_nodes = 1 if len(X_scaled) else 0
+        start, end = [0] * n_nodes, [len(X_scaled)] * n_nodes
+        left, right = [-1] * n_nodes, [-1] * n_nodes
+        lower, upper = [None] * n_nodes, [None] * n_nodes
+        todo = list(range(n_nodes))
+        while todo:
+            node = todo.pop()
+            s, e = start[node], end[node]
+            rows = order[s:e]
+            points = X_scaled[rows]
+            lower[node], upper[node] = points.min(axis=0), points.max(axis=0)
+            if e - s <= leaf_size:
+                continue
+
+            # median split on the widest feature
+            dim = int(np.argmax(upper[node] - lower[node]))
+            mid = (e - s) // 2
+            order[s:e] = rows[np.argpartition(points[:, dim], mid)]
+
+            left[node], right[node] = len(start), len(start) + 1
+            for child_start, child_end in ((s, s + mid), (s + mid, e)):
+                todo.append(len(start))
+                start.append(child_start), end.append(child_end)
+                left.append(-1), right.append(-1), lower.append(None), upper.append(None)
+
+        names = np.asarray(food_items, dtype=object)[order]
+        encoded = [str(name).encode("utf-8") for name in names]
+        name_offsets = np.zeros(len(encoded) + 1, dtype="int64")
+        name_offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+        n_features = X_scaled.shape[1] if X_scaled.ndim == 2 else 0
+        return cls({
+            "points": X_scaled[order],
+            "node_start": np.array(start, dtype="int64"),
+            "node_end": np.array(end, dtype="int64"),
+            "node_left": np.array(left, dtype="int64"),
+            "node_right": np.array(right, dtype="int64"),
+            "node_lower": np.array(lower, dtype="float64").reshape(-1, n_features),
+            "node_upper": np.array(upper, dtype="float64").reshape(-1, n_features),
+            "names": np.frombuffer(b"".join(encoded), dtype="uint8"),
+            "name_offsets": name_offsets,
+        })
+
+    def __len__(self) -> int:
+        return len(self.food_items)
+
+    def save(self, path=SIMILARITY_INDEX_PATH) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            np.savez(f, **self.arrays)
+        return path
+
+    @classmethod
+    def load(cls, path=SIMILARITY_INDEX_PATH) -> "FoodSimilarityIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def _box_distances(self, nodes, x: np.ndarray) -> List[float]:
+        """Squared distances from x to the bounding boxes of nodes."""
+        nodes = list(nodes)
+        gap = np.maximum(self.lower[nodes] - x, 0) + np.maximum(x - self.upper[nodes], 0)
+        return np.einsum("ij,ij->i", gap, gap).tolist()
+
+    def query(self, x_scaled, k: int = 5) -> List[Tuple[str, float]]:
+        """The k foods closest to a scaled nutrient vector, nearest first."""
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+        x = np.asarray(x_scaled, dtype="float64").ravel()
+
+        # k best squared distances so far, sorted, and their rows
+        best = np.full(k, np.inf)
+        best_rows = np.full(k, -1, dtype="int64")
+        heap = [(self._box_distances([0], x)[0], 0)]
+        while heap:
+            box_distance, node = heapq.heappop(heap)
+            if box_distance > best[-1]:
+                break
+
+            if self.node_left[node] < 0:
+                s, e = self.node_start[node], self.node_end[node]
+                diff = self.points[s:e] - x
+                distances = np.einsum("ij,ij->i", diff, diff)
+                candidates = np.concatenate([best, distances])
+                keep = np.argsort(candidates, kind="stable")[:k]
+                best = candidates[keep]
+                best_rows = np.concatenate([best_rows, np.arange(s, e)])[keep]
+                continue
+
+            children = (self.node_left[node], self.node_right[node])
+            for child, child_distance in zip(children, self._box_distances(children, x)):
+                if child_distance <= best[-1]:
+                    heapq.heappush(heap, (child_distance, child))
+
+        return [(self.food_items[row], float(np.sqrt(dist))) for row, dist in zip(best_rows, best)]
+
+    def query_food(self, food_item: str, k: int = 5) -> List[Tuple[str, float]]:
+        """The k foods closest to a known food, the food itself excluded.
+
+        Raises
+        ------
+        KeyError
+            If food_item is not in the index.
+        """
+        row = self._rows[food_item]
+        # every row of that name may be among the matches, then be dropped
+        matches = self.query(self.points[row], k + self._duplicates.get(food_item, 1))
+        return [(name, dist) for name, dist in matches if name != food_item][:k]
@@ -0,0 +1,242 @@
+"""Raw food-composition sources, described declaratively, and one reader.
+
+A SourceSchema says where a source lives, its format, which raw columns to
+keep and the canonical name of each, and which rows to filter out. The
+reader turns any source into the canonical nutrient table: the declared
+columns only, renamed, in declaration order, names as strings and
+nutrients as float64.
+
+The projection and the row filters are applied inside the reader, before
+rows are converted to pandas:
+- parquet (pyarrow): only the declared columns are read, one record batch
+  at a time with no read-ahead, and the filter runs on the Arrow batch, so
+  e.g. the ~98% branded foods of the USDA export never become Python
+  objects,
+- CSV: only the declared columns are parsed (usecols, explicit dtypes,
+  pyarrow engine), files are read on a thread pool and filtered right after
+  parsing.
+
+Adding a source is one more SourceSchema in SOURCES.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+RAW_DATA_DIR = PROJECT_ROOT / "raw_data"
+
+# pyarrow parses a CSV file on several threads and releases the GIL
+CSV_ENGINE = "pyarrow"
+
+# Canonical columns that hold text; every other declared column is a float
+TEXT_COLUMNS = {"food_item", "data_type"}
+
+# Rows per record batch when streaming a parquet source
+BATCH_SIZE = 500_000
+
+
+class SourceSchema(NamedTuple):
+    """
+    Declarative description of a raw source.
+
+    Attributes
+    ----------
+    name : str
+        Short identifier, the key in SOURCES.
+    format : {"parquet", "csv"}
+        Storage format.
+    path : Path
+        Parquet file, or folder whose *.csv files form the source.
+    columns : dict
+        Raw column name -> canonical column name, in output order.
+    exclude : dict
+        Raw column name -> values; rows with one of these values are
+        dropped when the source is read with filtered=True.
+    """
+    name: str
+    format: str
+    path: Path
+    columns: Dict[str, str]
+    exclude: Dict[str, Tuple[str, ...]] = {}
+
+    @property
+    def raw_columns(self) -> List[str]:
+        return list(self.columns)
+
+    @property
+    def renames(self) -> Dict[str, str]:
+        """Raw -> canonical for the columns whose name changes."""
+        return {raw: canonical for raw, canonical in self.columns.items() if raw != canonical}
+
+    def dtypes(self) -> Dict[str, str]:
+        """Raw column -> dtype to parse it with."""
+        return {raw: "str" if canonical in TEXT_COLUMNS else "float64"
+                for raw, canonical in self.columns.items()}
+
+
+# USDA FoodData Central export (data_prep_marie)
+USDA_PARQUET = SourceSchema(
+    name="usda",
+    format="parquet",
+    path=RAW_DATA_DIR / "data.parquet",
+    columns={
+        "food_item": "food_item",
+        "Energy": "energy_kcal",
+        "data_type": "data_type",
+        "Total lipid (fat)": "fat_g",
+        "Fatty acids, total saturated": "satfat_g",
+        "Carbohydrate, by difference": "carbs_g",
+        "Protein": "protein_g",
+        "Fiber, total dietary": "fiber_g",
+    },
+    exclude={"data_type": ("branded_food",)},
+)
+
+# Food-composition CSV exports, one file per food group (data_prep)
+FOOD_CSV = SourceSchema(
+    name="food_csv",
+    format="csv",
+    path=RAW_DATA_DIR,
+    columns={
+        "food": "food_item",
+        "Caloric Value": "energy_kcal",
+        "Fat": "fat_g",
+        "Saturated Fats": "satfat_g",
+        "Carbohydrates": "carbs_g",
+        "Sugars": "sugars_g",
+        "Protein": "protein_g",
+        "Dietary Fiber": "fiber_g",
+    },
+)
+
+SOURCES = {source.name: source for source in (USDA_PARQUET, FOOD_CSV)}
+
+
+# -------------------------------------------------------
+# Canonical table from raw frames
+# -------------------------------------------------------
+
+def _exclude_mask(df: pd.DataFrame, exclude: Dict[str, Tuple[str, ...]]) -> np.ndarray:
+    """True for the rows to drop; `df` has the raw column names."""
+    mask = np.zeros(len(df), dtype=bool)
+    for col, values in exclude.items():
+        mask |= df[col].isin(values).to_numpy()
+    return mask
+
+
+def to_canonical(df: pd.DataFrame, source: SourceSchema, filtered: bool = True) -> pd.DataFrame:
+    """
+    Canonical table from an in-memory raw frame (e.g. new foods to add).
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Rows with the raw column names of `source`.
+    filtered : bool
+        Drop the rows excluded by the source.
+    """
+    if filtered and source.exclude:
+        df = df[~_exclude_mask(df, source.exclude)]
+    return df[source.raw_columns].rename(columns=source.renames)
+
+
+# -------------------------------------------------------
+# Readers
+# -------------------------------------------------------
+
+def _csv_files(folder: Path) -> List[Path]:
+    files = sorted(f for f in os.listdir(folder) if f.endswith(".csv"))
+    if not files:
+        raise ValueError(f"No CSV files found in folder: {folder}")
+    return [folder / f for f in files]
+
+
+def _read_csv(file_path: Path, source: SourceSchema, filtered: bool) -> pd.DataFrame:
+    df = pd.read_csv(file_path, usecols=source.raw_columns, dtype=source.dtypes(),
+                     engine=CSV_ENGINE)
+    return to_canonical(df, source, filtered)
+
+
+def _iter_parquet(path: Path, source: SourceSchema, filtered: bool) -> Iterator[pd.DataFrame]:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    exclude = source.exclude if filtered else {}
+    # iter_batches decodes the next batch only when asked for it, and
+    # without pre_buffer the column chunks of the later row groups are not
+    # fetched ahead either, so memory is bounded by one batch of the
+    # declared columns
+    parquet_file = pq.ParquetFile(path, pre_buffer=False)
+    for batch in parquet_file.iter_batches(batch_size=BATCH_SIZE, columns=source.raw_columns):
+        for col, values in exclude.items():
+            # is_in is False for nulls, so rows without a value are kept
+            batch = batch.filter(pc.invert(pc.is_in(batch.column(col),
+                                                    value_set=pa.array(values))))
+        # at most BATCH_SIZE rows, possibly none left after the filter
+        df = batch.to_pandas()[source.raw_columns].rename(columns=source.renames)
+        df = df.astype({col: "float64" for col in df.columns if col not in TEXT_COLUMNS})
+        yield df
+
+
+def iter_source(source: SourceSchema, path=None, filtered: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Stream a source as canonical chunks, so memory is bounded by a chunk.
+
+    Parameters
+    ----------
+    source : SourceSchema
+        What to read.
+    path : str or Path, optional
+        Overrides source.path.
+    filtered : bool
+        Drop the rows excluded by the source (pushed down to the reader).
+
+    Yields
+    ------
+    pandas.DataFrame
+        One canonical chunk per parquet record batch (at most BATCH_SIZE
+        rows) or per CSV file, with a fresh RangeIndex.
+    """
+    path = Path(path if path is not None else source.path)
+    if source.format == "parquet":
+        yield from _iter_parquet(path, source, filtered)
+    elif source.format == "csv":
+        for file_path in _csv_files(path):
+            yield _read_csv(file_path, source, filtered)
+    else:
+        raise ValueError(f"Unknown source format '{source.format}' of source '{source.name}'")
+
+
+def read_source(source: SourceSchema, path=None, filtered: bool = True,
+                max_workers=None) -> pd.DataFrame:
+    """
+    Read a whole source into one canonical table.
+
+    CSV files are read concurrently on a thread pool (max_workers files at
+    a time) and get a categorical `source_file` column; all chunks are
+    concatenated once. See iter_source for the other parameters.
+    """
+    path = Path(path if path is not None else source.path)
+    if source.format != "csv":
+        chunks = list(iter_source(source, path, filtered))
+        return pd.concat(chunks, ignore_index=True) if chunks else to_canonical(
+            pd.DataFrame(columns=source.raw_columns), source)
+
+    files = _csv_files(path)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = list(executor.map(lambda f: _read_csv(f, source, filtered), files))
+
+    df = pd.concat(frames, ignore_index=True)
+    df["source_file"] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(files)), [len(frame) for frame in frames]),
+        categories=[f.name for f in files],
+    )
+    return df
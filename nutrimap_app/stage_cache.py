@@ -0,0 +1,156 @@
+"""Content-hashed cache for the pipeline stages in model.build_all().
+
+Each stage gets a key made of
+- the sha256 of its input files,
+- its parameters,
+- the source code of the modules that implement it.
+
+After a stage runs, its key and the digests of the files it wrote are
+stored in a small JSON manifest. On the next build, a stage whose key still
+matches and whose output files are unchanged is loaded from those files
+instead of being recomputed.
+
+Hashing a large raw file takes a while, so file digests are remembered per
+(size, mtime) and only recomputed when the file is touched.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from nutrimap_app.profiling import stage
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = PROJECT_ROOT / "data/cache"
+
+_DIGESTS_FILE = "file_digests.json"
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def code_version(*modules) -> str:
+    """sha256 of the source files of the given modules."""
+    h = hashlib.sha256()
+    for module in modules:
+        h.update(Path(inspect.getsourcefile(module)).read_bytes())
+    return h.hexdigest()
+
+
+class StageCache:
+    """Skips pipeline stages whose inputs, parameters and code did not change.
+
+    Parameters
+    ----------
+    cache_dir : str or Path
+        Directory for the stage manifests.
+    force : bool
+        Recompute every stage (the manifests are still refreshed).
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, force: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.force = force
+        self._digests = self._read_json(self.cache_dir / _DIGESTS_FILE)
+
+    @staticmethod
+    def _read_json(path: Path) -> dict:
+        try:
+            return json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_json(self, path: Path, data: dict):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True))
+        tmp_path.replace(path)
+
+    def file_digest(self, path) -> Optional[str]:
+        """sha256 of a file (None if it does not exist), memoized on size and mtime."""
+        path = Path(path).resolve()
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        entry = self._digests.get(str(path))
+        if entry is not None and entry["stamp"] == stamp:
+            return entry["sha256"]
+
+        digest = _sha256_file(path)
+        self._digests[str(path)] = {"stamp": stamp, "sha256": digest}
+        self._write_json(self.cache_dir / _DIGESTS_FILE, self._digests)
+        return digest
+
+    def stage_key(self, name: str, inputs: Iterable = (), params: Optional[dict] = None,
+                  code: str = "") -> str:
+        """Cache key of a stage from its input files, parameters and code version."""
+        payload = {
+            "stage": name,
+            "inputs": [self.file_digest(p) for p in inputs],
+            "params": params or {},
+            "code": code,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def run(self, name: str, compute: Callable, load: Callable,
+            inputs: Iterable = (), params: Optional[dict] = None,
+            outputs: Iterable = (), code: str = ""):
+        """
+        Run a stage, or load its result when the cached outputs are valid.
+
+        Parameters
+        ----------
+        name : str
+            Stage name, also the manifest file name.
+        compute : callable
+            Runs the stage and writes the files listed in `outputs`.
+        load : callable
+            Rebuilds the stage result from the files in `outputs`.
+        inputs : iterable of str or Path
+            Files the stage reads.
+        params : dict, optional
+            Parameters that change the stage result.
+        outputs : iterable of str or Path
+            Files the stage writes.
+        code : str
+            Code version, see code_version().
+
+        Returns
+        -------
+        Whatever `compute` (or `load`) returns.
+        """
+
+        outputs = [Path(p) for p in outputs]
+        manifest_path = self.cache_dir / f"{name}.json"
+        key = self.stage_key(name, inputs, params, code)
+
+        manifest = self._read_json(manifest_path)
+        if (not self.force
+                and manifest.get("key") == key
+                and all(manifest["outputs"].get(str(p.resolve())) == self.file_digest(p)
+                        for p in outputs)):
+            print(f"[cache] {name}: up to date, loading {len(outputs)} cached file(s)")
+            with stage(f"build.{name}.load"):
+                return load()
+
+        print(f"[cache] {name}: running")
+        with stage(f"build.{name}"):
+            result = compute()
+
+        self._write_json(manifest_path, {
+            "key": key,
+            "outputs": {str(p.resolve()): self.file_digest(p) for p in outputs},
+        })
+        return result
@@ -0,0 +1,278 @@
+"""Typeahead search over food names.
+
+The index is built once from the clustered foods and saved as one .npz:
+- every name is normalized (lowercase, no accents or punctuation) and split
+  into tokens,
+- an inverted index maps each token of the sorted vocabulary to the foods
+  that contain it (CSR arrays: offsets + food ids),
+- a trigram index maps each trigram to the vocabulary tokens containing it,
+  for typo-tolerant matches,
+- the nutrients, cluster and food group of every food are stored as arrays
+  so a match can be returned without touching the dataframe.
+
+A query token matches vocabulary tokens exactly, by prefix (the last token,
+while the user is still typing) or by trigram similarity. Foods are scored
+by the idf-weighted best match of every query token, so foods matching all
+tokens rank first.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MODELS_DIR = PROJECT_ROOT / "models"
+
+TEXT_INDEX_PATH = MODELS_DIR / "text_index.npz"
+
+NUTRIENT_COLS = [
+    "energy_kcal_calculated",
+    "fat_g",
+    "satfat_g",
+    "carbs_g",
+    "protein_g",
+    "fiber_g",
+]
+
+# Match weights, relative to an exact token match
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.7
+MIN_TRIGRAM_SIMILARITY = 0.4
+MAX_EXPANSIONS = 50
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercase, strip accents and punctuation, and split into tokens."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return [token for token in _NON_ALNUM.split(text) if token]
+
+
+def _trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _csr(groups: List[List[int]]):
+    """Offsets and flat values of a list of integer lists."""
+    offsets = np.zeros(len(groups) + 1, dtype="int64")
+    offsets[1:] = np.cumsum([len(g) for g in groups])
+    values = np.fromiter((v for g in groups for v in g), dtype="int32", count=offsets[-1])
+    return offsets, values
+
+
+class FoodTextIndex:
+    """Inverted token index, trigram index and per-food payload arrays."""
+
+    def __init__(self, arrays: dict):
+        self.arrays = arrays
+
+        self.vocab = arrays["vocab"].item().split("\n") if arrays["vocab"].item() else []
+        self.trigram_ids = {tri: i for i, tri in enumerate(arrays["trigrams"].item().split("\n"))
+                            if tri}
+        self.n_foods = len(arrays["name_offsets"]) - 1
+
+        doc_freq = np.diff(arrays["posting_offsets"])
+        self.idf = np.log1p(self.n_foods / np.maximum(doc_freq, 1))
+        self.trigram_counts = arrays["token_trigram_counts"]
+
+    # ---------------------------------------------------
+    # Build, save, load
+    # ---------------------------------------------------
+
+    @classmethod
+    def build(cls, df, food_groups=None) -> "FoodTextIndex":
+        """
+        Build the index from a cleaned (or clustered) food dataframe.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Foods with `food_item`, NUTRIENT_COLS and optionally `cluster`.
+        food_groups : pandas.Series, optional
+            Categorical food groups aligned with df (assign_food_groups);
+            computed when not given.
+        """
+        from nutrimap_app.category_mapping import assign_food_groups
+
+        if food_groups is None:
+            food_groups = assign_food_groups(df)
+
+        names = [str(name).replace("\n", " ") for name in df["food_item"]]
+
+        token_docs = {}
+        for doc_id, name in enumerate(names):
+            for token in set(normalize(name)):
+                token_docs.setdefault(token, []).append(doc_id)
+
+        vocab = sorted(token_docs)
+        posting_offsets, postings = _csr([token_docs[t] for t in vocab])
+
+        trigram_tokens = {}
+        token_trigram_counts = np.zeros(len(vocab), dtype="int32")
+        for token_id, token in enumerate(vocab):
+            grams = _trigrams(token)
+            token_trigram_counts[token_id] = len(grams)
+            for gram in grams:
+                trigram_tokens.setdefault(gram, []).append(token_id)
+        trigrams = sorted(trigram_tokens)
+        trigram_offsets, trigram_postings = _csr([trigram_tokens[g] for g in trigrams])
+
+        encoded = [name.encode("utf-8") for name in names]
+        name_offsets = np.zeros(len(encoded) + 1, dtype="int64")
+        name_offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+        cluster = (df["cluster"].to_numpy(dtype="int16") if "cluster" in df
+                   else np.full(len(df), -1, dtype="int16"))
+
+        arrays = {
+            "vocab": np.array("\n".join(vocab)),
+            "posting_offsets": posting_offsets,
+            "postings": postings,
+            "trigrams": np.array("\n".join(trigrams)),
+            "trigram_offsets": trigram_offsets,
+            "trigram_postings": trigram_postings,
+            "token_trigram_counts": token_trigram_counts,
+            "names": np.frombuffer(b"".join(encoded), dtype="uint8"),
+            "name_offsets": name_offsets,
+            "name_lengths": np.array([len(normalize(n)) for n in names], dtype="int16"),
+            "nutrients": df[NUTRIENT_COLS].to_numpy(dtype="float32"),
+            "cluster": cluster,
+            "food_group_codes": np.asarray(food_groups.cat.codes, dtype="int8"),
+            "food_group_categories": np.array(list(food_groups.cat.categories)),
+        }
+        return cls(arrays)
+
+    def save(self, path=TEXT_INDEX_PATH) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            np.savez(f, **self.arrays)
+        return path
+
+    @classmethod
+    def load(cls, path=TEXT_INDEX_PATH) -> "FoodTextIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    # ---------------------------------------------------
+    # Query
+    # ---------------------------------------------------
+
+    def name(self, food_id: int) -> str:
+        start, end = self.arrays["name_offsets"][food_id:food_id + 2]
+        return self.arrays["names"][start:end].tobytes().decode("utf-8")
+
+    def _prefix_matches(self, token: str) -> range:
+        start = bisect_left(self.vocab, token)
+        end = bisect_left(self.vocab, token + "\x7f")
+        return range(start, min(end, start + MAX_EXPANSIONS))
+
+    def _fuzzy_matches(self, token: str):
+        gram_ids = [self.trigram_ids[g] for g in _trigrams(token) if g in self.trigram_ids]
+        if not gram_ids:
+            return np.array([], dtype="int64"), np.array([], dtype="float64")
+
+        offsets = self.arrays["trigram_offsets"]
+        postings = self.arrays["trigram_postings"]
+        candidates = np.concatenate([postings[offsets[g]:offsets[g + 1]] for g in gram_ids])
+        shared = np.bincount(candidates, minlength=len(self.vocab))
+
+        token_ids = np.flatnonzero(shared)
+        union = len(_trigrams(token)) + self.trigram_counts[token_ids] - shared[token_ids]
+        similarity = shared[token_ids] / union
+
+        keep = similarity >= MIN_TRIGRAM_SIMILARITY
+        token_ids, similarity = token_ids[keep], similarity[keep]
+        best = np.argsort(-similarity)[:MAX_EXPANSIONS]
+        return token_ids[best], similarity[best]
+
+    def _token_matches(self, token: str, is_last: bool):
+        """Vocabulary token ids matching a query token, with their weights."""
+        i = bisect_left(self.vocab, token)
+        exact = i < len(self.vocab) and self.vocab[i] == token
+
+        token_ids, weights = [], []
+        if exact:
+            token_ids.append(i)
+            weights.append(1.0)
+        if is_last:
+            for j in self._prefix_matches(token):
+                if j != i or not exact:
+                    token_ids.append(j)
+                    weights.append(PREFIX_WEIGHT)
+        if not token_ids:
+            fuzzy_ids, similarity = self._fuzzy_matches(token)
+            token_ids.extend(fuzzy_ids.tolist())
+            weights.extend((FUZZY_WEIGHT * similarity).tolist())
+
+        return np.asarray(token_ids, dtype="int64"), np.asarray(weights, dtype="float64")
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Ranked foods matching a free-text query.
+
+        Parameters
+        ----------
+        query : str
+            What the user typed so far, e.g. "greek yog".
+        limit : int
+            Maximum number of results.
+
+        Returns
+        -------
+        list of dict
+            food_item, score, cluster, food_group and the nutrients of the
+            best matches, best first.
+        """
+        tokens = normalize(query)
+        if not tokens or self.n_foods == 0:
+            return []
+
+        offsets = self.arrays["posting_offsets"]
+        postings = self.arrays["postings"]
+        scores = np.zeros(self.n_foods, dtype="float64")
+
+        for position, token in enumerate(tokens):
+            token_ids, weights = self._token_matches(token, is_last=position == len(tokens) - 1)
+            if len(token_ids) == 0:
+                continue
+
+            # best match of this query token in every food
+            token_scores = np.zeros(self.n_foods, dtype="float64")
+            for token_id, weight in zip(token_ids, weights * self.idf[token_ids]):
+                docs = postings[offsets[token_id]:offsets[token_id + 1]]
+                np.maximum.at(token_scores, docs, weight)
+            scores += token_scores
+
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return []
+
+        # small bonus for shorter names ("yogurt" before "yogurt, greek, ...")
+        ranked = scores[matched] - 1e-3 * self.arrays["name_lengths"][matched]
+        if len(matched) > limit:
+            best = np.argpartition(-ranked, limit - 1)[:limit]
+            matched, ranked = matched[best], ranked[best]
+        top = matched[np.argsort(-ranked, kind="stable")]
+
+        categories = self.arrays["food_group_categories"]
+        return [
+            {
+                "food_item": self.name(food_id),
+                "score": round(float(scores[food_id]), 4),
+                "cluster": int(self.arrays["cluster"][food_id]),
+                "food_group": str(categories[self.arrays["food_group_codes"][food_id]]),
+                **{col: round(float(value), 2) for col, value in
+                   zip(NUTRIENT_COLS, self.arrays["nutrients"][food_id])},
+            }
+            for food_id in top
+        ]
@@ -0,0 +1,35 @@
+"""Test data shared by the test modules.
+
+Foods come from benchmarks/synthetic.py, the generator the benchmarks use,
+and the model features are KMeanModel.FEATURE_COLS.
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_nutrients
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.KMeanModel import FEATURE_COLS
+
+
+@pytest.fixture(scope="session")
+def foods():
+    """2,000 cleaned foods ("food 0" ... "food 1999" and FEATURE_COLS), not to be modified."""
+    return synthetic_nutrients(2_000)
+
+
+def _save_bundle(path, shift=0.0):
+    n = len(FEATURE_COLS)
+    centroids = np.array([np.full(n, 0.2 + shift), np.full(n, 0.8 - shift)])
+    InferenceBundle(FEATURE_COLS, np.full(n, 0.01), np.zeros(n), centroids, 0.1).save(path)
+    return path
+
+
+@pytest.fixture
+def save_bundle():
+    """save_bundle(path, shift=0.0) writes a 2-cluster bundle and returns path.
+
+    shift moves the centroids, so every shift is another model; with
+    shift > 0.5 the two clusters swap.
+    """
+    return _save_bundle
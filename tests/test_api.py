@@ -0,0 +1,164 @@
+"""API endpoints on small synthetic artifacts."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import MinMaxScaler
+
+from nutrimap_app import api_file
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.KMeanModel import FEATURE_COLS
+from nutrimap_app.lookup import FoodLookup
+from nutrimap_app.meal_scoring import MealScorer
+from nutrimap_app.similarity import FoodSimilarityIndex
+from nutrimap_app.text_search import FoodTextIndex
+
+
+@pytest.fixture(scope="module")
+def client(foods, tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("artifacts")
+    scaler = MinMaxScaler().fit(foods[FEATURE_COLS])
+    X_scaled = scaler.transform(foods[FEATURE_COLS])
+    model = KMeans(n_clusters=3, n_init=3, random_state=42).fit(X_scaled)
+    clustered = foods.assign(cluster=model.labels_)
+
+    paths = {
+        "bundle_path": tmp / "inference_bundle.npz",
+        "lookup_dir": tmp / "food_lookup",
+        "similarity_path": tmp / "similarity_index.npz",
+        "meal_scorer_path": tmp / "meal_scorer.npz",
+        "text_index_path": tmp / "text_index.npz",
+        "store_dir": tmp / "store",
+    }
+    InferenceBundle.from_fitted(FEATURE_COLS, scaler, model).save(paths["bundle_path"])
+    FoodLookup.build(clustered).save(paths["lookup_dir"])
+    FoodSimilarityIndex.build(clustered["food_item"], X_scaled).save(paths["similarity_path"])
+    MealScorer.from_frame(clustered).save(paths["meal_scorer_path"])
+    FoodTextIndex.build(clustered).save(paths["text_index_path"])
+
+    api_file.preload(**paths)
+    try:
+        with TestClient(api_file.app) as client:
+            client.model = model
+            client.scaler = scaler
+            yield client
+    finally:
+        api_file._preloaded = None
+
+
+def _expected_clusters(client, rows):
+    return client.model.predict(client.scaler.transform(rows[FEATURE_COLS])).tolist()
+
+
+def test_ready(client):
+    body = client.get("/ready").json()
+    assert body["ready"] and body["model"] and body["lookup"] and body["meal_scorer"]
+
+
+def test_predict_matches_the_model(client, foods):
+    rows = foods.head(20)
+    predictions = [client.get("/predict", params=row).json()["prediction"]
+                   for row in rows[FEATURE_COLS].to_dict(orient="records")]
+    assert predictions == _expected_clusters(client, rows)
+
+
+def test_predict_computes_missing_energy(client, foods):
+    row = foods[FEATURE_COLS].iloc[0].to_dict()
+    without_energy = {k: v for k, v in row.items() if k != "energy_kcal_calculated"}
+    assert (client.get("/predict", params=without_energy).json()
+            == client.get("/predict", params=row).json())
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf"])
+def test_predict_rejects_non_finite_values(client, value):
+    params = {"fat_g": value, "satfat_g": 1, "carbs_g": 1, "protein_g": 1, "fiber_g": 1}
+    response = client.get("/predict", params=params)
+    assert response.status_code == 422
+
+
+def test_predict_batch_matches_the_model(client, foods):
+    rows = foods.head(500)
+    response = client.post("/predict/batch", json=rows[FEATURE_COLS].to_dict(orient="list"))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["prediction"] == _expected_clusters(client, rows)
+    assert len(body["food_group"]) == len(rows)
+
+
+def test_predict_batch_rejects_bad_batches(client, foods):
+    payload = foods[FEATURE_COLS].head(3).to_dict(orient="list")
+    payload["fiber_g"] = payload["fiber_g"][:2]
+    assert client.post("/predict/batch", json=payload).status_code == 422
+
+    too_large = {col: [1.0] * (api_file.MAX_BATCH_SIZE + 1) for col in FEATURE_COLS}
+    assert client.post("/predict/batch", json=too_large).status_code == 413
+
+    non_finite = ('{"fat_g": [1, NaN], "satfat_g": [1, 1], "carbs_g": [1, 1], '
+                  '"protein_g": [1, 1], "fiber_g": [1, Infinity]}')
+    response = client.post("/predict/batch", content=non_finite,
+                           headers={"content-type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_lookup(client, foods):
+    body = client.get("/lookup", params={"food_item": "food 7"}).json()
+    assert body["cluster"] == _expected_clusters(client, foods.iloc[[7]])[0]
+    assert client.get("/lookup", params={"food_item": "unknown"}).status_code == 404
+
+
+def test_similar(client):
+    body = client.get("/similar", params={"food_item": "food 7", "k": 3}).json()
+    assert len(body["similar"]) == 3
+    assert "food 7" not in [match["food_item"] for match in body["similar"]]
+    assert client.get("/similar", params={"food_item": "unknown"}).status_code == 404
+    assert client.get("/similar", params={"food_item": "food 7", "k": 0}).status_code == 422
+
+
+def test_search(client):
+    body = client.get("/search", params={"q": "food 12", "limit": 5}).json()
+    assert body["results"][0]["food_item"] == "food 12"
+
+
+def test_meal_score(client, foods):
+    items = [{"food_item": "food 1", "grams": 150}, {"food_item": "food 2", "grams": 50}]
+    body = client.post("/meal/score", json={"items": items}).json()
+    expected = 1.5 * foods.loc[1, "protein_g"] + 0.5 * foods.loc[2, "protein_g"]
+    assert body["totals"]["protein_g"] == pytest.approx(expected, abs=0.05)
+    assert [item["food_item"] for item in body["items"]] == ["food 1", "food 2"]
+
+    unknown = {"items": [{"food_item": "unknown", "grams": 100}]}
+    assert client.post("/meal/score", json=unknown).status_code == 404
+
+
+@pytest.mark.parametrize("grams", ["0", "-10", "NaN", "Infinity"])
+def test_meal_score_rejects_invalid_grams(client, grams):
+    payload = '{"items": [{"food_item": "food 1", "grams": %s}]}' % grams
+    response = client.post("/meal/score", content=payload,
+                           headers={"content-type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_meal_recommend(client):
+    body = {"items": [{"food_item": "food 1", "grams": 100}], "k": 3,
+            "food_groups": ["grain_starch", "legumes_pulses"]}
+    suggestions = client.post("/meal/recommend", json=body).json()["suggestions"]
+    assert 0 < len(suggestions) <= 3
+    assert {s["food_group"] for s in suggestions} <= {"grain_starch", "legumes_pulses"}
+    assert "food 1" not in [s["food_item"] for s in suggestions]
+    scores = [s["score"] for s in suggestions]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_meal_recommend_rejects_bad_requests(client):
+    unknown_group = {"items": [], "food_groups": ["vegetables"]}
+    response = client.post("/meal/recommend", json=unknown_group)
+    assert response.status_code == 422
+    assert "vegetables" in response.json()["detail"]
+
+    assert client.post("/meal/recommend", json={"items": [], "k": 0}).status_code == 422
+    # NaN and Infinity are valid in Python's JSON, not as a budget
+    for budget in ("NaN", "Infinity", "-5"):
+        body = f'{{"items": [], "kcal_budget": {budget}}}'
+        response = client.post("/meal/recommend", content=body,
+                               headers={"Content-Type": "application/json"})
+        assert response.status_code == 422, budget
@@ -0,0 +1,37 @@
+"""NutriMapClient batching and caching, against a fake /predict/batch."""
+
+from unittest import mock
+
+from nutrimap_app import api_client
+from nutrimap_app.api_client import NUTRIENT_COLS, NutriMapClient
+
+
+def _fake_post(url, json, timeout):
+    response = mock.Mock()
+    response.json.return_value = {"prediction": [int(v) % 3 for v in json["fat_g"]],
+                                  "food_group": ["mixed"] * len(json["fat_g"])}
+    return response
+
+
+def _foods(n_foods):
+    return [{col: float(i) for col in NUTRIENT_COLS} for i in range(n_foods)]
+
+
+def test_predict_many_splits_large_batches(monkeypatch):
+    monkeypatch.setattr(api_client, "MAX_BATCH_SIZE", 4)
+    client = NutriMapClient("http://api")
+    client.session.post = mock.Mock(side_effect=_fake_post)
+
+    results = client.predict_many(_foods(10))
+    assert [r["prediction"] for r in results] == [i % 3 for i in range(10)]
+    assert [len(call.kwargs["json"]["fat_g"]) for call in client.session.post.call_args_list] == [4, 4, 2]
+
+
+def test_predict_many_only_sends_uncached_foods():
+    client = NutriMapClient("http://api")
+    client.session.post = mock.Mock(side_effect=_fake_post)
+
+    client.predict_many(_foods(3))
+    results = client.predict_many(_foods(5) + _foods(5))
+    assert [r["prediction"] for r in results] == [i % 3 for i in range(5)] * 2
+    assert client.session.post.call_args_list[-1].kwargs["json"]["fat_g"] == [3.0, 4.0]
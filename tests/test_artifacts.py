@@ -0,0 +1,94 @@
+"""write_frame / read_frame / FrameWriter round trips, per file suffix."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nutrimap_app.artifacts import FrameWriter, artifact_format, read_frame, write_frame
+
+COLUMNAR = [".feather", ".arrow", ".parquet"]
+
+
+@pytest.fixture
+def frame():
+    """All the dtypes the stages hand each other, with a non-default index."""
+    rng = np.random.default_rng(0)
+    n = 50
+    df = pd.DataFrame({
+        "food_item": [f"food {i}" for i in range(n)],
+        "protein_g": rng.random(n) * 100,
+        "fat_g": (rng.random(n) * 100).astype("float32"),
+        "cluster": rng.integers(0, 5, n).astype("int32"),
+        "n_rows": np.arange(n, dtype="int64"),
+        "branded": rng.random(n) < 0.5,
+        "category": pd.Categorical(rng.choice(["Dairy", "Fruits", "Meat"], n)),
+    })
+    df.loc[3, "protein_g"] = np.nan
+    df.index = np.arange(n) * 2 + 7
+    return df
+
+
+@pytest.mark.parametrize("suffix", COLUMNAR)
+def test_columnar_formats_keep_dtypes_and_values(tmp_path, frame, suffix):
+    path = write_frame(frame, tmp_path / f"frame{suffix}")
+    df = read_frame(path)
+
+    # the index is not stored: rows come back indexed from 0
+    pd.testing.assert_frame_equal(df, frame.reset_index(drop=True))
+
+
+def test_csv_keeps_values_but_not_every_dtype(tmp_path, frame):
+    path = write_frame(frame, tmp_path / "frame.csv")
+    df = read_frame(path)
+
+    expected = frame.reset_index(drop=True)
+    assert list(df.columns) == list(expected.columns)
+    assert df.index.equals(pd.RangeIndex(len(expected)))
+    assert df["food_item"].tolist() == expected["food_item"].tolist()
+    assert df["category"].tolist() == expected["category"].tolist()
+    assert df["branded"].tolist() == expected["branded"].tolist()
+    assert df["n_rows"].dtype == "int64"
+    np.testing.assert_allclose(df["protein_g"], expected["protein_g"], rtol=1e-15)
+    # narrow dtypes are widened on the way back
+    assert df["fat_g"].dtype == "float64"
+    assert df["cluster"].dtype == "int64"
+
+
+@pytest.mark.parametrize("suffix", COLUMNAR)
+def test_read_frame_selects_columns(tmp_path, frame, suffix):
+    path = write_frame(frame, tmp_path / f"frame{suffix}")
+    df = read_frame(path, columns=["food_item", "cluster"])
+    pd.testing.assert_frame_equal(df, frame.reset_index(drop=True)[["food_item", "cluster"]])
+
+
+def test_fmt_overrides_the_suffix(tmp_path, frame):
+    path = write_frame(frame, tmp_path / "frame.tmp", fmt="parquet")
+    renamed = path.rename(tmp_path / "frame.parquet")
+    pd.testing.assert_frame_equal(read_frame(renamed), frame.reset_index(drop=True))
+
+
+def test_unknown_suffix_is_rejected(tmp_path, frame):
+    with pytest.raises(ValueError, match="Unsupported artifact format"):
+        write_frame(frame, tmp_path / "frame.xlsx")
+    assert artifact_format("FRAME.PARQUET") == "parquet"
+
+
+@pytest.mark.parametrize("suffix", COLUMNAR + [".csv"])
+def test_chunks_written_as_the_whole_frame(tmp_path, frame, suffix):
+    with FrameWriter(tmp_path / f"chunks{suffix}") as writer:
+        for start in range(0, len(frame), 15):
+            writer.write(frame.iloc[start:start + 15])
+    whole = write_frame(frame, tmp_path / f"whole{suffix}")
+
+    assert writer.n_rows == len(frame)
+    pd.testing.assert_frame_equal(read_frame(writer.path), read_frame(whole))
+
+
+@pytest.mark.parametrize("suffix", COLUMNAR + [".csv"])
+def test_only_empty_chunks_give_an_empty_file(tmp_path, frame, suffix):
+    with FrameWriter(tmp_path / f"empty{suffix}") as writer:
+        writer.write(frame.head(0))
+
+    df = read_frame(writer.path)
+    assert len(df) == 0
+    assert list(df.columns) == list(frame.columns)
@@ -0,0 +1,100 @@
+"""assign_food_groups (vectorized) against the row-wise assign_food_group."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nutrimap_app.category_mapping import (
+    FOOD_GROUPS,
+    NUTRIENT_COLUMNS,
+    assign_food_group,
+    assign_food_groups,
+    food_group_codes,
+)
+
+# Every absolute threshold of the rule cascade (per 100 g)
+THRESHOLDS = [0, 1, 1.5, 2, 3, 4, 5, 6, 8, 9, 10, 12, 15, 20, 25, 30, 40, 60, 80,
+              100, 120, 130, 150, 180, 200, 250]
+
+# Share-of-kcal thresholds (fat, protein, carbs)
+SHARES = [0.2, 0.3, 0.35, 0.4, 0.5, 0.55, 0.6, 0.7, 0.85]
+
+
+def _row_wise(df):
+    return df.apply(assign_food_group, axis=1)
+
+
+def _assert_same(df):
+    expected = _row_wise(df)
+    result = assign_food_groups(df)
+    assert list(result.cat.categories) == FOOD_GROUPS
+    assert result.index.equals(df.index)
+    assert result.astype(object).tolist() == expected.tolist()
+
+
+def _boundary_frame(n_rows=20_000, seed=0):
+    """Random combinations of the thresholds and the values just around them."""
+    rng = np.random.default_rng(seed)
+    t = np.array(THRESHOLDS, dtype="float64")
+    values = np.unique(np.concatenate([t, t - 1e-9, t + 1e-9, t - 0.5, t + 0.5]))
+    return pd.DataFrame({col: rng.choice(values, n_rows) for col in NUTRIENT_COLUMNS})
+
+
+def _random_frame(n_rows=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "fat_g": rng.uniform(0, 100, n_rows),
+        "protein_g": rng.uniform(0, 40, n_rows),
+        "carbs_g": rng.uniform(0, 90, n_rows),
+        "fiber_g": rng.uniform(0, 15, n_rows),
+    })
+    df["satfat_g"] = df["fat_g"] * rng.uniform(0, 0.7, n_rows)
+    df["energy_kcal_calculated"] = 9 * df["fat_g"] + 4 * df["carbs_g"] + 4 * df["protein_g"]
+    return df
+
+
+def test_matches_row_wise_on_random_foods():
+    _assert_same(_random_frame())
+
+
+def test_matches_row_wise_on_threshold_boundaries():
+    _assert_same(_boundary_frame())
+
+
+@pytest.mark.parametrize("column,factor", [("fat_g", 9), ("protein_g", 4), ("carbs_g", 4)])
+def test_matches_row_wise_on_kcal_share_boundaries(column, factor):
+    df = _boundary_frame(n_rows=5_000, seed=1)
+    shares = np.random.default_rng(2).choice(SHARES, len(df))
+    # kcal such that factor * nutrient / kcal is exactly on a share threshold
+    df["energy_kcal_calculated"] = factor * df[column] / shares
+    _assert_same(df)
+
+
+def test_nan_rows():
+    df = _random_frame(n_rows=5_000)
+    rng = np.random.default_rng(3)
+    for col in NUTRIENT_COLUMNS:
+        df.loc[rng.random(len(df)) < 0.2, col] = np.nan
+    df.loc[df.index[:10], NUTRIENT_COLUMNS] = np.nan
+    _assert_same(df)
+
+
+@pytest.mark.parametrize("column", NUTRIENT_COLUMNS)
+def test_missing_column_counts_as_zero(column):
+    _assert_same(_boundary_frame(n_rows=5_000).drop(columns=column))
+
+
+def test_float32_input():
+    _assert_same(_boundary_frame(n_rows=5_000).astype("float32"))
+    _assert_same(_random_frame(n_rows=5_000).astype("float32"))
+
+
+def test_codes_from_a_mapping_of_arrays():
+    df = _random_frame(n_rows=1_000)
+    columns = {col: df[col].to_numpy() for col in NUTRIENT_COLUMNS}
+    np.testing.assert_array_equal(food_group_codes(columns), food_group_codes(df))
+
+
+def test_empty_frame():
+    df = pd.DataFrame({col: pd.Series([], dtype="float64") for col in NUTRIENT_COLUMNS})
+    assert len(assign_food_groups(df)) == 0
@@ -0,0 +1,72 @@
+"""cluster_quality metrics against the exact sklearn scores on small data."""
+
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.datasets import make_blobs
+from sklearn.metrics import calinski_harabasz_score, silhouette_score
+from sklearn.preprocessing import MinMaxScaler
+
+from nutrimap_app.cluster_quality import (
+    QualityReport,
+    SilhouetteSampler,
+    cluster_statistics,
+    sampled_silhouette,
+)
+
+
+@pytest.fixture(scope="module")
+def clustered():
+    """2,000 scaled rows of 5 overlapping blobs, clustered with k=4."""
+    X, _ = make_blobs(n_samples=2_000, centers=5, n_features=6, cluster_std=1.5,
+                      random_state=0)
+    X = MinMaxScaler().fit_transform(X)
+    model = KMeans(n_clusters=4, random_state=0, n_init=1).fit(X)
+    return X, model.labels_, model.cluster_centers_
+
+
+@pytest.mark.parametrize("chunk_rows", [2_000, 300])
+def test_calinski_harabasz_matches_sklearn(clustered, chunk_rows):
+    X, labels, centroids = clustered
+    statistics = cluster_statistics(X, labels, centroids, chunk_rows=chunk_rows)
+
+    assert statistics["calinski_harabasz"] == pytest.approx(calinski_harabasz_score(X, labels),
+                                                            rel=1e-9)
+    inertia = ((X - centroids[labels]) ** 2).sum()
+    assert statistics["inertia_per_row"] == pytest.approx(inertia / len(X), rel=1e-9)
+    assert [c["size"] for c in statistics["clusters"]] == np.bincount(labels).tolist()
+
+
+def test_silhouette_on_all_rows_is_the_exact_score(clustered):
+    X, labels, _ = clustered
+    exact = silhouette_score(X, labels)
+
+    summary = sampled_silhouette(X, labels, sample_size=len(X))
+    assert summary["n_repeats"] == 1
+    assert summary["estimate"] == pytest.approx(exact, rel=1e-9)
+    assert summary["ci_low"] == summary["ci_high"] == summary["estimate"]
+
+    sampler = SilhouetteSampler(sample_size=len(X))
+    for start in range(0, len(X), 300):
+        sampler.update(X[start:start + 300], labels[start:start + 300])
+    assert sampler.result()["estimate"] == pytest.approx(exact, rel=1e-9)
+
+
+def test_sampled_silhouette_is_close_to_the_exact_score(clustered):
+    X, labels, _ = clustered
+    exact = silhouette_score(X, labels)
+
+    summary = sampled_silhouette(X, labels, sample_size=500, n_repeats=10)
+    assert summary["ci_low"] < summary["estimate"] < summary["ci_high"]
+    assert summary["estimate"] == pytest.approx(exact, abs=0.02)
+
+    report = QualityReport(np.zeros((4, X.shape[1])), range(X.shape[1]), sample_size=500,
+                           n_repeats=10)
+    for start in range(0, len(X), 300):
+        report.update(X[start:start + 300], labels[start:start + 300])
+    assert report.result()["silhouette"]["estimate"] == pytest.approx(exact, abs=0.02)
+
+
+def test_single_cluster_has_no_silhouette(clustered):
+    X, _, _ = clustered
+    assert np.isnan(sampled_silhouette(X, np.zeros(len(X), dtype="int64"))["estimate"])
@@ -0,0 +1,44 @@
+"""data_prep CSV loading: threaded pyarrow reader vs the "c" engine, cleaned output."""
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_synthetic_csvs
+from nutrimap_app import sources
+from nutrimap_app.data_prep import FOOD_COLUMN, clean_food_data, load_raw_csvs
+from nutrimap_app.sources import FOOD_CSV
+
+
+@pytest.fixture(scope="module")
+def raw_folder(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("raw_csv")
+    paths = write_synthetic_csvs(folder, n_files=4, rows_per_file=500)
+    # a few empty cells, parsed as NaN by both engines
+    df = pd.read_csv(paths[0])
+    df.loc[[2, 7], "Fat"] = None
+    df.to_csv(paths[0], index=False)
+    return folder
+
+
+def test_threaded_pyarrow_reader_matches_the_c_engine(raw_folder, monkeypatch):
+    assert sources.CSV_ENGINE == "pyarrow"
+    threaded = load_raw_csvs(raw_folder, max_workers=4)
+    monkeypatch.setattr(sources, "CSV_ENGINE", "c")
+    sequential = load_raw_csvs(raw_folder, max_workers=1)
+
+    pd.testing.assert_frame_equal(threaded, sequential)
+    assert len(threaded) == 4 * 500
+    assert list(threaded.columns) == list(FOOD_CSV.columns.values()) + ["source_file"]
+    assert threaded["source_file"].cat.categories.tolist() == [
+        f"FOOD-DATA-GROUP{i}.csv" for i in range(1, 5)]
+    assert threaded["fat_g"].isna().sum() == 2
+
+
+def test_cleaned_data_keeps_the_food_column(raw_folder, tmp_path):
+    df_clean = clean_food_data(raw_folder, tmp_path / "foods_cleaned.parquet")
+
+    expected = load_raw_csvs(raw_folder).drop(columns="source_file").drop_duplicates()
+    assert list(df_clean.columns) == [FOOD_COLUMN] + list(expected.columns[1:])
+    assert df_clean["food"].tolist() == expected["food_item"].tolist()
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "foods_cleaned.parquet"),
+                                  df_clean.reset_index(drop=True))
@@ -0,0 +1,82 @@
+"""data_prep_marie cleaning: streamed and in-memory paths, reader edge cases."""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from benchmarks.synthetic import synthetic_raw
+from nutrimap_app import data_prep_marie, sources
+from nutrimap_app.data_prep_marie import (
+    _clean_chunk,
+    _drop_duplicates_hashed,
+    clean_food_data,
+    iter_clean_chunks,
+)
+
+
+@pytest.fixture
+def raw():
+    """Raw USDA-like rows, about half of them branded."""
+    return synthetic_raw(20_000, branded_share=0.5, seed=3)
+
+
+@pytest.mark.parametrize("include_branded", [False, True])
+@pytest.mark.parametrize("compact", [False, True])
+def test_streaming_matches_in_memory(raw, tmp_path, monkeypatch, include_branded, compact):
+    # repeated rows across row groups, so the final drop_duplicates matters
+    raw = pd.concat([raw, raw.sample(frac=0.2, random_state=0)], ignore_index=True)
+    raw.to_parquet(tmp_path / "data.parquet", row_group_size=5_000)
+    monkeypatch.setattr(sources, "BATCH_SIZE", 4_000)
+
+    def clean(streaming):
+        return clean_food_data(tmp_path, tmp_path / f"clean_{streaming}.feather",
+                               streaming=streaming, include_branded=include_branded,
+                               compact=compact)
+
+    streamed, in_memory = clean(True), clean(False)
+    assert len(streamed) > 0
+    pd.testing.assert_frame_equal(streamed, in_memory)
+
+
+def test_names_of_pyarrow_written_files_are_kept(raw, tmp_path, monkeypatch):
+    # dictionary-encoded names over several row groups and record batches,
+    # as pyarrow writes them (fastparquet used to read many back as null)
+    path = tmp_path / "data.parquet"
+    pq.write_table(pa.Table.from_pandas(raw, preserve_index=False), path, row_group_size=3_000)
+    monkeypatch.setattr(sources, "BATCH_SIZE", 2_000)
+
+    chunks = list(sources.iter_source(sources.USDA_PARQUET, path, filtered=False))
+    names = pd.concat(chunks)["food_item"]
+    assert names.notna().all()
+    assert names.tolist() == raw["food_item"].tolist()
+
+    cleaned = pd.concat(iter_clean_chunks(path, include_branded=False))
+    assert cleaned["food_item"].notna().all()
+    assert set(cleaned["food_item"]) <= set(raw.loc[raw["data_type"] != "branded_food", "food_item"])
+
+
+@pytest.fixture
+def compact_with_duplicates(raw):
+    """Compact cleaned rows, 20% of them repeated, some with -0.0 nutrients."""
+    df = _clean_chunk(raw, include_branded=True, compact=True)
+    df = pd.concat([df, df.sample(frac=0.2, random_state=0)], ignore_index=True)
+    zero_fiber = df.index[df["fiber_g"] == 0][:50]
+    df.loc[zero_fiber[:25], "fiber_g"] = np.float32(-0.0)
+    return df
+
+
+def test_hashed_dedupe_matches_drop_duplicates(compact_with_duplicates):
+    df = compact_with_duplicates
+    expected = df.drop_duplicates()
+    assert len(expected) < len(df)
+    pd.testing.assert_frame_equal(_drop_duplicates_hashed(df), expected)
+
+
+def test_hash_collisions_keep_distinct_rows(compact_with_duplicates, monkeypatch):
+    # every row collides: only the exact comparison decides
+    monkeypatch.setattr(data_prep_marie, "_row_hashes",
+                        lambda df: np.zeros(len(df), dtype="uint64"))
+    df = compact_with_duplicates
+    pd.testing.assert_frame_equal(_drop_duplicates_hashed(df), df.drop_duplicates())
@@ -0,0 +1,129 @@
+"""update_clusters and apply_updates: new foods reach the clustered data, the served
+indexes and the model store."""
+
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import MinMaxScaler
+
+from benchmarks.synthetic import synthetic_raw
+from nutrimap_app.artifacts import read_frame, write_frame
+from nutrimap_app.data_prep_marie import clean_raw_rows
+from nutrimap_app.incremental import apply_updates, update_clusters
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.KMeanModel import FEATURE_COLS
+from nutrimap_app.lookup import FoodLookup
+from nutrimap_app.meal_scoring import MealScorer
+from nutrimap_app.model_store import BUNDLE_ARTIFACT, MODEL_ARTIFACT, ModelStore
+from nutrimap_app.similarity import FoodSimilarityIndex
+from nutrimap_app.text_search import FoodTextIndex
+
+
+@pytest.fixture
+def paths(tmp_path):
+    """A served model (promoted in a store) built from 2,000 raw foods."""
+    df = clean_raw_rows(synthetic_raw(2_000), include_branded=True)
+    df = df.drop(columns=["data_type", "energy_kcal"])
+    scaler = MinMaxScaler().fit(df[FEATURE_COLS])
+    model = KMeans(n_clusters=3, n_init=3, random_state=42).fit(scaler.transform(df[FEATURE_COLS]))
+
+    paths = {
+        "bundle_path": tmp_path / "inference_bundle.npz",
+        "clustered_path": tmp_path / "food_with_clusters.parquet",
+        "store_dir": tmp_path / "store",
+        "model_path": tmp_path / "best_model.pkl",
+        "pending_path": tmp_path / "food_updates.parquet",
+    }
+    InferenceBundle.from_fitted(FEATURE_COLS, scaler, model).save(paths["bundle_path"])
+    paths["model_path"].write_bytes(pickle.dumps(model))
+    write_frame(df.assign(cluster=model.labels_), paths["clustered_path"])
+
+    store = ModelStore(paths["store_dir"])
+    version = store.publish({MODEL_ARTIFACT: paths["model_path"],
+                             BUNDLE_ARTIFACT: paths["bundle_path"]}, k=3, seed=42)["version"]
+    store.promote(version)
+    return paths
+
+
+@pytest.fixture
+def index_paths(tmp_path):
+    return {
+        "lookup_dir": tmp_path / "food_lookup",
+        "similarity_path": tmp_path / "similarity_index.npz",
+        "text_index_path": tmp_path / "text_index.npz",
+        "meal_scorer_path": tmp_path / "meal_scorer.npz",
+    }
+
+
+def _apply_updates(paths, index_paths):
+    kwargs = {name: paths[name]
+              for name in ("bundle_path", "clustered_path", "store_dir", "pending_path")}
+    return apply_updates(**kwargs, **index_paths)
+
+
+def test_branded_foods_are_dropped_by_default(paths):
+    raw = synthetic_raw(200, offset=10_000, branded_share=0.5, seed=1)
+    update = update_clusters(raw, save=False, **paths)
+    with_branded = update_clusters(raw, include_branded=True, save=False, **paths)
+    assert 0 < len(update.new_foods) < len(with_branded.new_foods)
+    assert len(with_branded.new_foods) == len(clean_raw_rows(raw, include_branded=True))
+
+
+def test_saved_update_is_pending_until_applied(paths, index_paths):
+    n_foods = len(read_frame(paths["clustered_path"]))
+    raw = synthetic_raw(50, offset=10_000, seed=1)
+    update = update_clusters(raw, **paths)
+    n_new = len(update.new_foods)
+    assert n_new > 0
+
+    # the clustered data is untouched, the new foods wait in the pending file
+    assert len(read_frame(paths["clustered_path"])) == n_foods
+    assert len(read_frame(paths["pending_path"])) == n_new
+    # known foods, pending ones included, are not added twice
+    assert len(update_clusters(raw, **paths).new_foods) == 0
+    more = update_clusters(synthetic_raw(20, offset=20_000, seed=2), **paths)
+    n_new += len(more.new_foods)
+
+    assert _apply_updates(paths, index_paths) == n_new
+    assert not paths["pending_path"].exists()
+    assert len(read_frame(paths["clustered_path"])) == n_foods + n_new
+
+    last = more.new_foods.iloc[-1]
+    lookup = FoodLookup.load(index_paths["lookup_dir"])
+    assert lookup.get(last["food_item"])["cluster"] == last["cluster"]
+    assert last["food_item"] in FoodSimilarityIndex.load(index_paths["similarity_path"])._rows
+    assert MealScorer.load(index_paths["meal_scorer_path"]).rows([last["food_item"]]).tolist()
+    assert FoodTextIndex.load(index_paths["text_index_path"]).n_foods == n_foods + n_new
+
+    # nothing pending: only the indexes are rebuilt
+    assert _apply_updates(paths, index_paths) == 0
+    assert len(read_frame(paths["clustered_path"])) == n_foods + n_new
+
+
+def test_refit_publishes_the_model_and_the_bundle(paths):
+    store = ModelStore(paths["store_dir"])
+    parent = store.current_version()
+    n_foods = len(read_frame(paths["clustered_path"]))
+
+    pending = update_clusters(synthetic_raw(30, offset=20_000, seed=3), **paths)
+    update = update_clusters(synthetic_raw(100, offset=10_000, seed=2), refit=True, **paths)
+    assert update.refitted
+
+    # the refit relabels every row: pending foods are merged with the new ones
+    assert not paths["pending_path"].exists()
+    assert (len(read_frame(paths["clustered_path"]))
+            == n_foods + len(pending.new_foods) + len(update.new_foods))
+
+    manifest = store.manifest(store.current_version())
+    assert manifest["parent"] == parent
+    assert set(manifest["artifacts"]) == {MODEL_ARTIFACT, BUNDLE_ARTIFACT}
+
+    with store.artifact_path(MODEL_ARTIFACT).open("rb") as f:
+        model = pickle.load(f)
+    bundle = InferenceBundle.load(store.artifact_path(BUNDLE_ARTIFACT))
+    np.testing.assert_array_equal(model.cluster_centers_, bundle.centroids)
+    assert paths["model_path"].read_bytes() == store.artifact_path(MODEL_ARTIFACT).read_bytes()
+
+    assert store.rollback()["version"] == parent
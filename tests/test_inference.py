@@ -0,0 +1,71 @@
+"""InferenceBundle against the scikit-learn scaler and KMeans model it was built from."""
+
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import MinMaxScaler
+
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.KMeanModel import FEATURE_COLS
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 100, (5_000, len(FEATURE_COLS)))
+    scaler = MinMaxScaler().fit(X)
+    model = KMeans(n_clusters=5, n_init=3, random_state=42).fit(scaler.transform(X))
+    return X, scaler, model, InferenceBundle.from_fitted(FEATURE_COLS, scaler, model)
+
+
+def test_transform_matches_the_scaler(fitted):
+    X, scaler, _, bundle = fitted
+    np.testing.assert_allclose(bundle.transform(X), scaler.transform(X), rtol=0, atol=1e-12)
+
+
+def test_predict_matches_kmeans(fitted):
+    X, scaler, model, bundle = fitted
+    # new rows, some outside the fitted min/max
+    X_new = np.random.default_rng(1).uniform(-20, 120, (20_000, len(FEATURE_COLS)))
+    for rows in (X, X_new, X_new[:1]):
+        np.testing.assert_array_equal(bundle.predict(rows), model.predict(scaler.transform(rows)))
+
+
+def test_predict_float32_input(fitted):
+    X, scaler, model, bundle = fitted
+    X32 = X.astype("float32")
+    np.testing.assert_array_equal(bundle.predict(X32),
+                                  model.predict(scaler.transform(X32.astype("float64"))))
+
+
+def test_predict_columns_uses_the_feature_order(fitted):
+    X, _, _, bundle = fitted
+    columns = {col: X[:, i] for i, col in reversed(list(enumerate(FEATURE_COLS)))}
+    np.testing.assert_array_equal(bundle.predict_columns(columns), bundle.predict(X))
+
+
+def test_assign_scaled_distances(fitted):
+    X, _, model, bundle = fitted
+    X_scaled = bundle.transform(X)
+    labels, sq_distances = bundle.assign_scaled(X_scaled)
+    np.testing.assert_array_equal(labels, model.labels_)
+    expected = ((X_scaled - model.cluster_centers_[labels]) ** 2).sum(axis=1)
+    np.testing.assert_allclose(sq_distances, expected, atol=1e-12)
+    assert bundle.inertia_per_row == pytest.approx(model.inertia_ / len(X))
+
+
+def test_save_load_round_trip(fitted, tmp_path):
+    X, _, _, bundle = fitted
+    loaded = InferenceBundle.load(bundle.save(tmp_path / "bundle.npz"))
+    assert loaded.feature_cols == FEATURE_COLS
+    assert loaded.n_clusters == 5
+    assert loaded.inertia_per_row == bundle.inertia_per_row
+    np.testing.assert_array_equal(loaded.predict(X), bundle.predict(X))
+
+
+def test_load_a_bundle_without_inertia(fitted, tmp_path):
+    _, _, _, bundle = fitted
+    path = tmp_path / "old.npz"
+    np.savez(path, feature_cols=np.array(FEATURE_COLS), scale=bundle.scale, min_=bundle.min_,
+             centroids=bundle.centroids)
+    assert np.isnan(InferenceBundle.load(path).inertia_per_row)
@@ -0,0 +1,30 @@
+"""MealScorer arrays: saved and loaded without pandas, same scores as built from the frame."""
+
+import numpy as np
+import pytest
+
+from nutrimap_app.category_mapping import assign_food_groups
+from nutrimap_app.meal_scoring import MealScorer
+from nutrimap_app.plate_role_mapping import assign_plate_roles
+
+
+def test_codes_match_the_categorical_mappings(foods):
+    scorer = MealScorer.from_frame(foods)
+    groups = assign_food_groups(foods)
+    assert [scorer.food_group(row) for row in range(len(foods))] == groups.astype(str).tolist()
+    assert ([scorer.plate_role(row) for row in range(len(foods))]
+            == assign_plate_roles(foods, groups).astype(str).tolist())
+
+
+def test_save_load_round_trip(foods, tmp_path):
+    scorer = MealScorer.from_frame(foods)
+    loaded = MealScorer.load(scorer.save(tmp_path / "meal_scorer.npz"))
+
+    meal = [("food 1", 120.0), ("food 20", 35.5), ("food 300", 80.0)]
+    assert loaded.score(meal) == scorer.score(meal)
+    np.testing.assert_array_equal(loaded.nutrients, scorer.nutrients)
+
+
+def test_unknown_food(foods):
+    with pytest.raises(KeyError, match="unknown"):
+        MealScorer.from_frame(foods).rows(["food 1", "unknown"])
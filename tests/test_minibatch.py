@@ -0,0 +1,58 @@
+"""build_minibatch_kmeans_model: streamed label pass, clustered data and report."""
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import write_synthetic_parquet
+from nutrimap_app import KMeanModel
+from nutrimap_app.artifacts import read_frame
+from nutrimap_app.cluster_quality import cluster_quality_report
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.KMeanModel import FEATURE_COLS, build_minibatch_kmeans_model
+from nutrimap_app.model_store import ModelStore, data_hash
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    """Raw parquet in 5 row groups; the model files and the store go to tmp_path."""
+    raw = tmp_path / "raw.parquet"
+    write_synthetic_parquet(raw, 10_000, branded_share=0.5, row_group_size=2_000)
+    store = ModelStore(tmp_path / "store")
+    for name in ("BEST_MODEL_PATH", "BUNDLE_PATH", "CLUSTERED_DATA_PATH", "CLUSTER_QUALITY_PATH"):
+        monkeypatch.setattr(KMeanModel, name, tmp_path / getattr(KMeanModel, name).name)
+    monkeypatch.setattr(KMeanModel, "ModelStore", lambda: store)
+    return raw, store
+
+
+def test_saved_outputs_match_the_returned_frame(served):
+    raw, store = served
+    model, df = build_minibatch_kmeans_model(k=3, file_path=raw, return_frame=True)
+
+    written = read_frame(KMeanModel.CLUSTERED_DATA_PATH)
+    assert written.equals(df.reset_index(drop=True))
+    assert not list(KMeanModel.CLUSTERED_DATA_PATH.parent.glob("*.tmp"))
+
+    bundle = InferenceBundle.load(KMeanModel.BUNDLE_PATH)
+    np.testing.assert_array_equal(df["cluster"], bundle.predict(df[FEATURE_COLS].to_numpy()))
+
+    manifest = store.manifest(store.current_version())
+    assert manifest["data_hash"] == data_hash(df[FEATURE_COLS])
+    assert manifest["metrics"]["n_rows"] == len(df)
+
+    # statistics as computed on the whole frame, the silhouette on other samples
+    nutrients = df[FEATURE_COLS].to_numpy(dtype="float64")
+    expected = cluster_quality_report(bundle.transform(nutrients), df["cluster"].to_numpy(),
+                                      bundle.centroids, FEATURE_COLS, nutrients, FEATURE_COLS)
+    assert manifest["metrics"]["inertia_per_row"] == pytest.approx(expected["inertia_per_row"])
+    assert manifest["metrics"]["calinski_harabasz"] == pytest.approx(
+        expected["calinski_harabasz"])
+    assert manifest["metrics"]["silhouette"] == pytest.approx(
+        expected["silhouette"]["estimate"], abs=0.05)
+
+
+def test_frame_is_only_returned_on_request(served):
+    raw, _ = served
+    model, df = build_minibatch_kmeans_model(k=3, file_path=raw, save_model=False,
+                                             save_data=False)
+    assert df is None
+    assert not KMeanModel.CLUSTERED_DATA_PATH.exists()
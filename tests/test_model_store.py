@@ -0,0 +1,148 @@
+"""ModelStore publishing, promotion and rollback, and the registry following the pointer."""
+
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from nutrimap_app.inference import InferenceBundle
+from nutrimap_app.KMeanModel import FEATURE_COLS
+from nutrimap_app.model_store import BUNDLE_ARTIFACT, DataHasher, ModelStore, data_hash
+from nutrimap_app.registry import ModelRegistry
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ModelStore(tmp_path / "store")
+
+
+@pytest.fixture
+def publish(store, tmp_path, save_bundle):
+    """publish(shift, **kwargs): publish the bundle of that shift, return its version."""
+    def publish(shift, **kwargs):
+        path = save_bundle(tmp_path / f"bundle_{shift}.npz", shift)
+        return store.publish({BUNDLE_ARTIFACT: path}, k=2, seed=42, **kwargs)["version"]
+    return publish
+
+
+def test_publish_is_content_addressed(store, tmp_path, publish):
+    v1 = publish(0.0)
+    assert publish(0.0) == v1
+    v2 = publish(0.1)
+    assert v2 != v1
+    assert [m["version"] for m in store.versions()] == [v1, v2]
+    assert store.current_version() is None
+
+    stored = store.artifact_path(BUNDLE_ARTIFACT, v1)
+    assert stored.read_bytes() == (tmp_path / "bundle_0.0.npz").read_bytes()
+    assert stored.stat().st_mode & 0o044 == 0o044
+    assert not list(store.objects_dir.glob("*.tmp"))
+
+
+def test_undefined_metrics_are_written_as_null(store, publish):
+    version = publish(0.0, metrics={"silhouette": float("nan"), "inertia_per_row": 0.5})
+    text = (store.versions_dir / f"{version}.json").read_text()
+    assert "NaN" not in text
+    assert json.loads(text)["metrics"] == {"silhouette": None, "inertia_per_row": 0.5}
+
+
+def test_promote_and_roll_back_through_the_history(store, publish):
+    v1, v2, v3 = (publish(shift) for shift in (0.0, 0.1, 0.2))
+
+    store.promote(v1)
+    store.promote(v2)
+    store.promote(v2)
+    store.promote(v3)
+    assert store.pointer()["history"] == [v1, v2]
+
+    assert store.rollback()["version"] == v2
+    assert store.rollback()["version"] == v1
+    with pytest.raises(ValueError, match="No previous model version"):
+        store.rollback()
+    assert store.current_version() == v1
+
+
+def test_promote_unknown_version(store, publish):
+    publish(0.0)
+    with pytest.raises(ValueError, match="Unknown model version"):
+        store.promote("0" * 12)
+
+
+def test_rollback_without_a_pointer(store):
+    with pytest.raises(ValueError):
+        store.rollback()
+
+
+def test_resolve_a_version_prefix(store, publish):
+    v1 = publish(0.0)
+    assert store.resolve(v1[:6]) == v1
+    with pytest.raises(ValueError):
+        store.resolve("zzz")
+
+
+def test_concurrent_publishes(store, tmp_path, save_bundle):
+    paths = [save_bundle(tmp_path / f"b{i}.npz", i / 100) for i in range(16)]
+    with ThreadPoolExecutor(8) as pool:
+        versions = list(pool.map(lambda p: store.publish({BUNDLE_ARTIFACT: p}, k=2)["version"],
+                                 paths * 2))
+    assert versions[:16] == versions[16:]
+    assert len(store.versions()) == 16
+    assert not list(store.objects_dir.glob("*.tmp"))
+
+
+def test_registry_follows_promotion_and_rollback(store, tmp_path, publish, save_bundle):
+    fallback = save_bundle(tmp_path / "served.npz", 0.05)
+    v1, v2 = (publish(shift) for shift in (0.0, 0.1))
+    registry = ModelRegistry(fallback, store)
+
+    # nothing promoted yet: the bundle file is served
+    assert registry.reload_if_changed()
+    assert registry.model_version is None
+
+    store.promote(v1)
+    assert registry.reload_if_changed()
+    assert registry.model_version == v1
+    assert not registry.reload_if_changed()
+
+    store.promote(v2)
+    assert registry.reload_if_changed()
+    assert math.isclose(registry.current.bundle.centroids[0, 0], 0.3)
+
+    store.rollback()
+    assert registry.reload_if_changed()
+    assert registry.model_version == v1
+
+
+def test_data_hash_depends_on_values_and_shape():
+    X = np.arange(12, dtype="float64").reshape(3, 4)
+    assert data_hash(X) == data_hash(X.astype("float32"))
+    assert data_hash(X) != data_hash(X.reshape(4, 3))
+    assert data_hash(X) != data_hash(X + 1)
+    assert DataHasher().update(X[:1]).update(X[1:]).hexdigest() == data_hash(X)
+
+
+def test_save_model_without_promote_leaves_the_served_files(tmp_path, monkeypatch, save_bundle):
+    from nutrimap_app import KMeanModel
+
+    served_model, served_bundle = tmp_path / "best_model.pkl", tmp_path / "inference_bundle.npz"
+    store = ModelStore(tmp_path / "store")
+    monkeypatch.setattr(KMeanModel, "BEST_MODEL_PATH", served_model)
+    monkeypatch.setattr(KMeanModel, "BUNDLE_PATH", served_bundle)
+    monkeypatch.setattr(KMeanModel, "ModelStore", lambda: store)
+
+    bundle = InferenceBundle.load(save_bundle(tmp_path / "new.npz"))
+    nan = float("nan")
+    metrics = {"n_rows": 3, "inertia_per_row": 0.1, "silhouette": nan}
+    args = ({"model": "stand-in"}, bundle, 2, 42, data_hash(np.zeros((3, len(FEATURE_COLS)))),
+            metrics)
+
+    stored = KMeanModel._save_model(*args, promote=False)
+    assert not served_model.exists() and not served_bundle.exists()
+    assert store.current_version() is None
+
+    promoted = KMeanModel._save_model(*args, promote=True)
+    assert promoted["version"] == stored["version"]
+    assert store.current_version() == stored["version"]
+    assert served_bundle.read_bytes() == store.artifact_path(BUNDLE_ARTIFACT).read_bytes()
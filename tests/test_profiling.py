@@ -0,0 +1,76 @@
+"""profile_pipeline / stage: the per-stage report."""
+
+import json
+import pstats
+import time
+
+import numpy as np
+import pytest
+
+from nutrimap_app import profiling
+from nutrimap_app.profiling import profile_pipeline, stage, timed_iter
+
+
+def test_stage_without_a_profiler_is_a_no_op():
+    with stage("noop", rows_in=3) as call:
+        call.rows_out = 2
+    assert profiling._active is None
+
+
+def test_report_lists_stages_with_calls_rows_and_times(tmp_path):
+    report_path = tmp_path / "profile.json"
+    with profile_pipeline(report_path) as profiler:
+        with stage("build", rows_in=100) as build:
+            for _ in range(3):
+                with stage("build.chunk", rows_in=10) as call:
+                    time.sleep(0.01)
+                    call.rows_out = 8
+            build.rows_out = 24
+        chunks = list(timed_iter("read", [np.zeros(5), np.zeros(7)]))
+
+    assert profiling._active is None
+    assert len(chunks) == 2
+    report = json.loads(report_path.read_text())
+    assert report["stages"] == profiler.report()["stages"]
+
+    stages = {s["stage"]: s for s in report["stages"]}
+    # parents before their children, in the order they first started
+    assert [s["stage"] for s in report["stages"]] == ["build", "build.chunk", "read"]
+    assert stages["build"]["calls"] == 1
+    assert (stages["build"]["rows_in"], stages["build"]["rows_out"]) == (100, 24)
+    assert stages["build.chunk"]["calls"] == 3
+    assert (stages["build.chunk"]["rows_in"], stages["build.chunk"]["rows_out"]) == (30, 24)
+    assert stages["build.chunk"]["wall_s"] >= 0.03
+    assert stages["build"]["wall_s"] >= stages["build.chunk"]["wall_s"]
+    # the exhausted iterator does not count as a call
+    assert stages["read"]["calls"] == 2
+    assert stages["read"]["rows_out"] == 12
+
+
+@pytest.mark.skipif(not profiling._reset_peak(), reason="per-stage peak RSS needs Linux")
+def test_peak_rss_is_measured_per_stage():
+    with profile_pipeline() as profiler:
+        with stage("allocate"):
+            block = np.ones(64 * 1024 * 1024 // 8)
+            del block
+        with stage("small"):
+            pass
+
+    stages = {s["stage"]: s for s in profiler.report()["stages"]}
+    assert profiler.report()["peak_rss_per_stage"]
+    assert stages["allocate"]["peak_rss_delta_mb"] >= 50
+    # the peak was reset: the next stage does not inherit it
+    assert stages["small"]["peak_rss_delta_mb"] < 10
+
+
+def test_cprofile_output(tmp_path):
+    with profile_pipeline(tmp_path / "profile.json", cpu_profile="cprofile"):
+        with stage("work"):
+            sum(range(1000))
+    assert pstats.Stats(str(tmp_path / "profile.prof")).total_calls > 0
+
+
+def test_unknown_cpu_profiler_is_rejected():
+    with pytest.raises(ValueError, match="Unknown cpu_profile"):
+        with profile_pipeline(cpu_profile="perf"):
+            pass
@@ -0,0 +1,55 @@
+"""ModelRegistry hot reload: a bad file on disk never replaces the served model."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from nutrimap_app import api_file
+from nutrimap_app.KMeanModel import FEATURE_COLS
+from nutrimap_app.registry import ModelRegistry
+
+
+def test_truncated_bundle_keeps_the_old_model(tmp_path, save_bundle):
+    path = save_bundle(tmp_path / "inference_bundle.npz")
+    registry = ModelRegistry(path)
+    registry.load()
+    X = np.full((1, len(FEATURE_COLS)), 10.0)  # scaled to 0.1, closest to cluster 0
+    assert registry.predict(X).tolist() == [0]
+
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+    assert not registry.reload_if_changed()
+    assert registry.predict(X).tolist() == [0]
+
+    save_bundle(path, 0.6)
+    assert registry.reload_if_changed()
+    assert registry.predict(X).tolist() == [1]
+
+
+def test_truncated_bundle_at_startup(tmp_path):
+    path = tmp_path / "inference_bundle.npz"
+    path.write_bytes(b"PK\x03\x04 truncated")
+    registry = ModelRegistry(path)
+    assert not registry.reload_if_changed()
+    assert not registry.is_loaded
+    with pytest.raises(RuntimeError, match="No inference bundle"):
+        registry.current
+
+
+def test_watcher_survives_errors():
+    class FailingRegistry:
+        calls = 0
+
+        def reload_if_changed(self):
+            FailingRegistry.calls += 1
+            raise RuntimeError("disk on fire")
+
+    async def watch_briefly():
+        watcher = asyncio.create_task(api_file._watch_model(FailingRegistry(), interval=0.01))
+        await asyncio.sleep(0.2)
+        assert not watcher.done()
+        watcher.cancel()
+
+    asyncio.run(watch_briefly())
+    assert FailingRegistry.calls > 1
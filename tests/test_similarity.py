@@ -0,0 +1,78 @@
+"""FoodSimilarityIndex (NumPy KD-tree) against a brute-force scan."""
+
+import numpy as np
+import pytest
+
+from nutrimap_app.KMeanModel import FEATURE_COLS
+from nutrimap_app.similarity import FoodSimilarityIndex
+
+N_FEATURES = len(FEATURE_COLS)
+
+
+def _brute_force(X, x, k):
+    distances = np.sqrt(((X - x) ** 2).sum(axis=1))
+    return np.sort(distances)[:k]
+
+
+@pytest.mark.parametrize("n_rows,leaf_size", [(1, 4), (5, 4), (1_000, 4), (20_000, 128)])
+def test_query_matches_brute_force(n_rows, leaf_size):
+    rng = np.random.default_rng(n_rows)
+    X = rng.random((n_rows, N_FEATURES))
+    index = FoodSimilarityIndex.build([f"food {i}" for i in range(n_rows)], X, leaf_size=leaf_size)
+
+    for x in rng.random((50, N_FEATURES)):
+        matches = index.query(x, 10)
+        assert len(matches) == min(10, n_rows)
+        np.testing.assert_allclose([dist for _, dist in matches], _brute_force(X, x, 10))
+        for name, dist in matches:
+            row = int(name.split()[1])
+            assert np.sqrt(((X[row] - x) ** 2).sum()) == pytest.approx(dist)
+
+
+def test_query_food_excludes_the_food_itself():
+    rng = np.random.default_rng(0)
+    X = rng.random((500, N_FEATURES))
+    names = [f"food {i}" for i in range(500)]
+    index = FoodSimilarityIndex.build(names, X, leaf_size=8)
+
+    matches = index.query_food("food 3", 5)
+    assert "food 3" not in [name for name, _ in matches]
+    np.testing.assert_allclose([dist for _, dist in matches], _brute_force(X, X[3], 6)[1:])
+    with pytest.raises(KeyError):
+        index.query_food("unknown")
+
+
+def test_query_food_with_a_duplicated_name_returns_k_foods():
+    rng = np.random.default_rng(1)
+    X = rng.random((500, N_FEATURES))
+    names = [f"food {i}" for i in range(500)]
+    # the same name on three nearly identical rows
+    X[[10, 11, 12]] = X[3] + rng.normal(0, 1e-6, (3, N_FEATURES))
+    names[10] = names[11] = names[12] = "food 3"
+    index = FoodSimilarityIndex.build(names, X, leaf_size=8)
+
+    matches = index.query_food("food 3", 5)
+    assert len(matches) == 5
+    assert "food 3" not in [name for name, _ in matches]
+
+
+def test_duplicate_points():
+    X = np.zeros((300, N_FEATURES))
+    index = FoodSimilarityIndex.build([f"food {i}" for i in range(300)], X, leaf_size=8)
+    assert [dist for _, dist in index.query_food("food 0", 5)] == [0.0] * 5
+
+
+def test_save_load_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    X = rng.random((2_000, N_FEATURES))
+    names = [f"café {i}" for i in range(2_000)]
+    index = FoodSimilarityIndex.build(names, X)
+    loaded = FoodSimilarityIndex.load(index.save(tmp_path / "similarity_index.npz"))
+    assert sorted(loaded.food_items) == sorted(names)
+    assert loaded.query_food("café 42", 5) == index.query_food("café 42", 5)
+
+
+def test_empty_index():
+    index = FoodSimilarityIndex.build([], np.empty((0, N_FEATURES)))
+    assert len(index) == 0
+    assert index.query(np.zeros(N_FEATURES), 5) == []
@@ -0,0 +1,107 @@
+"""StageCache: stages rerun exactly when their inputs, parameters, code or outputs change."""
+
+import os
+
+import pytest
+
+from nutrimap_app.stage_cache import StageCache
+
+
+class Stage:
+    """A stage reading `src` and writing `dst`, counting its runs."""
+
+    def __init__(self, tmp_path):
+        self.src = tmp_path / "input.txt"
+        self.dst = tmp_path / "output.txt"
+        self.src.write_text("raw")
+        self.runs = 0
+        self.loads = 0
+
+    def compute(self):
+        self.runs += 1
+        self.dst.write_text(self.src.read_text().upper())
+        return self.dst.read_text()
+
+    def load(self):
+        self.loads += 1
+        return self.dst.read_text()
+
+    def run(self, cache, params=None, code="v1"):
+        return cache.run("stage", compute=self.compute, load=self.load, inputs=[self.src],
+                         params=params, outputs=[self.dst], code=code)
+
+
+@pytest.fixture
+def stage(tmp_path):
+    return Stage(tmp_path)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / "cache"
+
+
+def test_second_run_loads_the_cached_outputs(stage, cache_dir):
+    assert stage.run(StageCache(cache_dir)) == "RAW"
+    assert stage.run(StageCache(cache_dir)) == "RAW"
+    assert (stage.runs, stage.loads) == (1, 1)
+
+
+def test_changed_input_reruns(stage, cache_dir):
+    stage.run(StageCache(cache_dir))
+    stage.src.write_text("new raw")
+    assert stage.run(StageCache(cache_dir)) == "NEW RAW"
+    assert stage.runs == 2
+
+
+def test_touched_but_identical_input_is_still_cached(stage, cache_dir):
+    stage.run(StageCache(cache_dir))
+    stat = stage.src.stat()
+    os.utime(stage.src, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    stage.run(StageCache(cache_dir))
+    assert stage.runs == 1
+
+
+def test_changed_params_or_code_reruns(stage, cache_dir):
+    stage.run(StageCache(cache_dir), params={"k": 3})
+    stage.run(StageCache(cache_dir), params={"k": 4})
+    stage.run(StageCache(cache_dir), params={"k": 4}, code="v2")
+    assert stage.runs == 3
+    stage.run(StageCache(cache_dir), params={"k": 4}, code="v2")
+    assert stage.runs == 3
+
+
+def test_modified_or_missing_output_reruns(stage, cache_dir):
+    stage.run(StageCache(cache_dir))
+    stage.dst.write_text("edited by hand")
+    assert stage.run(StageCache(cache_dir)) == "RAW"
+    stage.dst.unlink()
+    assert stage.run(StageCache(cache_dir)) == "RAW"
+    assert stage.runs == 3
+
+
+def test_force_reruns(stage, cache_dir):
+    stage.run(StageCache(cache_dir))
+    stage.run(StageCache(cache_dir, force=True))
+    assert stage.runs == 2
+    # the forced run refreshed the manifest
+    stage.run(StageCache(cache_dir))
+    assert stage.runs == 2
+
+
+def test_corrupt_manifest_reruns(stage, cache_dir):
+    stage.run(StageCache(cache_dir))
+    (cache_dir / "stage.json").write_text("{not json")
+    stage.run(StageCache(cache_dir))
+    assert stage.runs == 2
+
+
+def test_file_digest_of_a_missing_file(cache_dir, tmp_path):
+    assert StageCache(cache_dir).file_digest(tmp_path / "missing") is None
+
+
+def test_build_all_rejects_a_k_sweep_with_the_minibatch_engine():
+    from nutrimap_app.model import build_all
+
+    with pytest.raises(ValueError, match="sweep"):
+        build_all(k=None, engine="minibatch")
@@ -0,0 +1,23 @@
+"""sweep_kmeans / select_best_k on small, well-separated data."""
+
+import numpy as np
+from sklearn.datasets import make_blobs
+
+from nutrimap_app.KMeanModel import select_best_k, sweep_kmeans
+
+
+def test_sweep_in_worker_processes_selects_the_true_k():
+    X, _ = make_blobs(n_samples=600, centers=4, n_features=5, cluster_std=0.3,
+                      random_state=0)
+    k_values, seeds = [2, 3, 4, 5, 6], [0, 1]
+
+    metrics = sweep_kmeans(X, k_values=k_values, seeds=seeds, silhouette_sample_size=300,
+                           n_jobs=2)
+
+    # one row per (k, seed), in task order
+    assert metrics[["k", "seed"]].values.tolist() == [[k, s] for k in k_values for s in seeds]
+    assert np.isfinite(metrics[["inertia", "silhouette", "calinski_harabasz",
+                                "davies_bouldin"]].to_numpy()).all()
+    k, seed = select_best_k(metrics)
+    assert k == 4
+    assert seed in seeds